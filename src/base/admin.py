@@ -1,7 +1,33 @@
 from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Uses the PostgreSQL planner estimate instead of `COUNT(*)` for unfiltered changelists of big tables.
+    """
+    estimate_threshold = 10000
+
+    @cached_property
+    def count(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is not None and not query.where:
+            connection = connections[self.object_list.db]
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s',
+                                   [self.object_list.model._meta.db_table])
+                    row = cursor.fetchone()
+                if row and row[0] > self.estimate_threshold:
+                    return int(row[0])
+        return super(EstimatedCountPaginator, self).count
 
 
 class BaseModelAdmin(admin.ModelAdmin):
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
     def get_readonly_fields(self, request, obj=None):
         return self.readonly_fields + ('created_at', 'updated_at')
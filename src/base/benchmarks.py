@@ -0,0 +1,186 @@
+"""
+Micro-benchmarks of the code a request runs around its queries: serializers, JSON rendering and filter
+backends. They run on unsaved instances and compile the filtered querysets without executing them, so
+the database is left out. `manage.py benchmark` runs them and compares the results with a JSON baseline.
+"""
+import json
+import platform
+import timeit
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework.filters import SearchFilter
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from base.filters import IsOwnerFilterBackend
+from lists.models import POSITION_GAP, List, Item
+from lists.serializers import ListSerializer, ItemSerializer
+from products.models import Category, CatalogProduct, Product
+from products.serializers import ProductSerializer
+from products.views import ProductViewSet
+from users.models import User
+
+# Number of objects serialized and rendered by the benchmarks of a serializer.
+SIZES = (10, 100, 1000)
+
+# Relative slowdown over the baseline reported as a regression.
+THRESHOLD = 0.2
+
+_benchmarks = OrderedDict()
+
+
+def benchmark(name, sizes=None):
+    """
+    Registers a benchmark. The decorated function does the setup, which is not timed, and returns the
+    function to time; with `sizes` it is registered once per size, as `name.format(size)`.
+    """
+    def register(setup):
+        for size in sizes or (None, ):
+            _benchmarks[name.format(size)] = (setup, () if size is None else (size, ))
+        return setup
+    return register
+
+
+def _get_owner():
+    return User(id=1, username='benchmark')
+
+
+def _get_products(size):
+    now = timezone.now()
+    owner = _get_owner()
+    category = Category(id=1, owner=owner, title='Dairy', created_at=now, updated_at=now)
+    catalog_product = CatalogProduct(id=1, gtin='07891000100103', name='Whole milk', brand='Golist', unit_price=3.5)
+    # Half of the products come from the catalog and read its name.
+    return [Product(id=i + 1, owner=owner, category=category, catalog_product=catalog_product if i % 2 else None,
+                    name=None if i % 2 else 'Product {}'.format(i), unit_price=1.0 + i % 50, created_at=now,
+                    updated_at=now) for i in range(size)]
+
+
+def _get_lists(size):
+    now = timezone.now()
+    owner = _get_owner()
+    return [List(id=i + 1, owner=owner, name='List {}'.format(i), valid_at=now + timedelta(days=i % 3 - 1),
+                 remaining_items=i % 20, checked_items=i % 7, remaining_value=10.5 * (i % 20),
+                 checked_value=3.25 * (i % 7), created_at=now, updated_at=now) for i in range(size)]
+
+
+def _get_items(size):
+    now = timezone.now()
+    items_list = _get_lists(1)[0]
+    return [Item(id=i + 1, list=items_list, product=product, quantity=1 + i % 4, purchased=bool(i % 3),
+                 purchased_at=now if i % 3 else None, position=(i + 1) * POSITION_GAP, created_at=now, updated_at=now)
+            for i, product in enumerate(_get_products(size))]
+
+
+def _get_request(**params):
+    request = Request(APIRequestFactory().get('/', params))
+    request.user = _get_owner()
+    return request
+
+
+def _compile(queryset):
+    return queryset.query.get_compiler(DEFAULT_DB_ALIAS).as_sql()
+
+
+@benchmark('serializer.list.{}', SIZES)
+def serialize_lists(size):
+    lists = _get_lists(size)
+    return lambda: ListSerializer(lists, many=True).data
+
+
+@benchmark('serializer.item.{}', SIZES)
+def serialize_items(size):
+    items = _get_items(size)
+    return lambda: ItemSerializer(items, many=True).data
+
+
+@benchmark('serializer.product.{}', SIZES)
+def serialize_products(size):
+    products = _get_products(size)
+    return lambda: ProductSerializer(products, many=True).data
+
+
+@benchmark('renderer.json.{}', SIZES)
+def render_json(size):
+    data = {'count': size, 'next': None, 'previous': None, 'page_size': size,
+            'results': ProductSerializer(_get_products(size), many=True).data}
+    renderer = JSONRenderer()
+    return lambda: renderer.render(data, 'application/json')
+
+
+@benchmark('filter.product_filter')
+def filter_products():
+    request = _get_request(category='Dairy', gtin='7891000100103')
+    view = ProductViewSet(request=request, action='list')
+    return lambda: _compile(DjangoFilterBackend().filter_queryset(request, Product.objects.all(), view))
+
+
+@benchmark('filter.search')
+def search_products():
+    request = _get_request(search='whole milk')
+    view = ProductViewSet(request=request, action='list')
+    return lambda: _compile(SearchFilter().filter_queryset(request, Product.objects.all(), view))
+
+
+@benchmark('filter.is_owner')
+def filter_owner():
+    request = _get_request()
+    view = ProductViewSet(request=request, action='list')
+    return lambda: _compile(IsOwnerFilterBackend().filter_queryset(request, Product.objects.all(), view))
+
+
+def get_names(pattern=None):
+    return [name for name in _benchmarks if not pattern or pattern in name]
+
+
+def get_benchmark(name):
+    """
+    Runs the setup of the benchmark, returns the function to time.
+    """
+    setup, args = _benchmarks[name]
+    return setup(*args)
+
+
+def measure(name, repeat=5):
+    """
+    Returns the best time of a call of the benchmark, in seconds, out of `repeat` runs of about 0.2s.
+    """
+    timer = timeit.Timer(get_benchmark(name))
+    number, elapsed = timer.autorange()
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+
+def load_baseline(path):
+    with open(path) as baseline:
+        return json.load(baseline)['results']
+
+
+def save_baseline(path, results):
+    with open(path, 'w') as baseline:
+        json.dump({
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'created_at': timezone.now().isoformat(),
+            'results': results,
+        }, baseline, indent=2, sort_keys=True)
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """
+    Returns `(name, seconds, baseline seconds, change)` for each result, the change is relative and
+    None for benchmarks missing from the baseline; and the names of the regressions over `threshold`.
+    """
+    rows = []
+    regressions = []
+    for name, seconds in results.items():
+        previous = baseline.get(name)
+        change = seconds / previous - 1 if previous else None
+        if change is not None and change > threshold:
+            regressions.append(name)
+        rows.append((name, seconds, previous, change))
+    return rows, regressions
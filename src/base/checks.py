@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.checks import Tags, Warning, register
+
+# Cache backends private to each process.
+LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def check_replica_pin_cache(app_configs, **kwargs):
+    """
+    The read-your-writes pins of `ReplicaRoutingMiddleware` are kept in the cache: with a cache of each
+    process, a read served by another worker ignores the pin and may hit a lagging replica.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if getattr(settings, 'REPLICA_DATABASES', None) and backend in LOCAL_CACHES:
+        return [Warning(
+            'Read replicas are configured with a cache private to each process ({}).'.format(backend),
+            hint='Set CACHE_URL to a cache shared by every worker, e.g. redis:// or memcache://, or clients may '
+                 'not read their own writes.',
+            id='base.W001',
+        )]
+    return []
+
+
+@register(Tags.caches)
+def check_shard_directory_cache(app_configs, **kwargs):
+    """
+    `sharding.shard_for` caches the shard directory and `sharding.forget` only clears the cache of the process
+    moving a user: with a cache of each process, the other workers keep using the previous shard, and the rows
+    they write there are left behind by the move.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if len(getattr(settings, 'SHARDS', [])) > 1 and backend in LOCAL_CACHES:
+        return [Warning(
+            'Shards are configured with a cache private to each process ({}).'.format(backend),
+            hint='Set CACHE_URL to a cache shared by every worker, e.g. redis:// or memcache://, or the users moved '
+                 'by rebalance_shards may keep writing to their previous shard.',
+            id='base.W002',
+        )]
+    return []
@@ -0,0 +1,115 @@
+import random
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from base import sharding
+
+_state = threading.local()
+
+
+def start_request(read_from_replica):
+    _state.read_from_replica = read_from_replica
+    _state.wrote = False
+
+
+def finish_request():
+    """
+    Leaves the request context, returns whether the request wrote to the primary.
+    """
+    wrote = getattr(_state, 'wrote', False)
+    _state.read_from_replica = False
+    _state.wrote = False
+    return wrote
+
+
+class ReplicaRouter(object):
+    """
+    Sends the reads of safe requests to a healthy replica among `REPLICA_DATABASES`.
+    Everything else, including any read made after a write in the same request, goes to the primary.
+    """
+
+    def __init__(self):
+        self._health = {}
+
+    def _is_healthy(self, alias):
+        healthy, checked_at = self._health.get(alias, (True, None))
+        now = time.monotonic()
+        if checked_at is None or now - checked_at > getattr(settings, 'REPLICA_HEALTH_CHECK_INTERVAL', 30):
+            try:
+                with connections[alias].cursor() as cursor:
+                    cursor.execute('SELECT 1')
+                healthy = True
+            except Exception:
+                healthy = False
+            self._health[alias] = (healthy, now)
+        return healthy
+
+    def get_replicas(self):
+        return [alias for alias in getattr(settings, 'REPLICA_DATABASES', []) if self._is_healthy(alias)]
+
+    def db_for_read(self, model, **hints):
+        if not getattr(_state, 'read_from_replica', False):
+            return None
+        replicas = self.get_replicas()
+        return random.choice(replicas) if replicas else None
+
+    def db_for_write(self, model, **hints):
+        _state.read_from_replica = False
+        _state.wrote = True
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in getattr(settings, 'REPLICA_DATABASES', []):
+            return False
+        return None
+
+
+class ShardRouter(object):
+    """
+    Sends the owner scoped models (`sharding.SHARDED_MODELS`) to the shard of their owner: the shard
+    of an instance hint, or of its owner, else the current shard (the request user's, or `sharding.use_shard`).
+    The replicated models are read from the current shard. Rows of the `default` shard are left to the next
+    routers.
+    """
+
+    def _route(self, model, hints, write=False):
+        shards = sharding.get_shards()
+        if len(shards) == 1:
+            return None
+        instance = hints.get('instance')
+        if sharding.is_replicated(model):
+            # Every shard has a copy, read the one next to the rows being joined.
+            alias = instance._state.db if instance is not None and instance._state.db in shards else None
+            alias = alias or sharding.current_shard(write)
+            return None if alias == DEFAULT_DB_ALIAS else alias
+        if not sharding.is_sharded(model):
+            # Related lookups from the rows of a shard, e.g. `item_list.owner`, read the directory database.
+            if instance is not None and instance._state.db in shards and sharding.is_sharded(type(instance)):
+                return DEFAULT_DB_ALIAS
+            return None
+        alias = None
+        if instance is not None:
+            if sharding.is_sharded(type(instance)) and instance._state.db in shards:
+                alias = instance._state.db
+            else:
+                owner_id = sharding.get_owner_id(instance)
+                alias = sharding.shard_for(owner_id, write) if owner_id else None
+        alias = alias or sharding.current_shard(write)
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_read(self, model, **hints):
+        return self._route(model, hints)
+
+    def db_for_write(self, model, **hints):
+        return self._route(model, hints, write=True)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if sharding.is_sharded(type(obj1)) and sharding.is_sharded(type(obj2)):
+            return obj1._state.db == obj2._state.db
+        return None
@@ -0,0 +1,254 @@
+import json
+import logging
+import select
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from queue import Queue, Empty, Full
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.http import StreamingHttpResponse
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.renderers import BaseRenderer
+
+from base import sharding
+
+logger = logging.getLogger(__name__)
+
+
+class EventStreamRenderer(BaseRenderer):
+    """
+    Lets content negotiation accept `text/event-stream`; the stream itself is written by `EventStream`.
+    """
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return 'event: error\ndata: {}\n\n'.format(json.dumps(data, cls=DjangoJSONEncoder)).encode('utf-8')
+
+
+class TooManyStreams(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = 'Too many open event streams, try again later.'
+    wait = 5
+
+
+class Subscription(object):
+
+    def __init__(self, owner_id, backlog, max_queued):
+        self.owner_id = owner_id
+        self.backlog = backlog
+        self.queue = Queue(maxsize=max_queued)
+
+
+class MemoryBroker(object):
+    """
+    In-process pub/sub of the events of each owner. The last events are kept so that reconnecting clients
+    can resume from their `Last-Event-ID`, for the `max_owners` owners with the most recent events and for
+    `buffer_ttl` seconds after their last event.
+    """
+
+    def __init__(self, buffer_size=100, max_queued=1000, max_owners=10000, buffer_ttl=3600):
+        self.buffer_size = buffer_size
+        self.max_queued = max_queued
+        self.max_owners = max_owners
+        self.buffer_ttl = buffer_ttl
+        self._lock = threading.Lock()
+        self._last_id = 0
+        self._subscriptions = defaultdict(set)
+        # Least recently published to first, with the time of their last event.
+        self._buffers = OrderedDict()
+        self._buffered_at = {}
+
+    def _next_id(self):
+        with self._lock:
+            self._last_id = max(self._last_id + 1, int(time.time() * 1000000))
+            return self._last_id
+
+    def publish(self, owner_id, event_type, data):
+        self.deliver(owner_id, {'id': self._next_id(), 'type': event_type, 'data': data})
+
+    def _buffer(self, owner_id, event):
+        now = time.monotonic()
+        buffer = self._buffers.pop(owner_id, None)
+        if buffer is None:
+            buffer = deque(maxlen=self.buffer_size)
+        buffer.append(event)
+        self._buffers[owner_id] = buffer
+        self._buffered_at[owner_id] = now
+        while self._buffers:
+            oldest = next(iter(self._buffers))
+            if len(self._buffers) <= self.max_owners and now - self._buffered_at[oldest] <= self.buffer_ttl:
+                break
+            del self._buffers[oldest]
+            del self._buffered_at[oldest]
+
+    def deliver(self, owner_id, event):
+        with self._lock:
+            self._buffer(owner_id, event)
+            subscriptions = list(self._subscriptions.get(owner_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.queue.put_nowait(event)
+            except Full:
+                logger.warning('Dropping event %s for a slow subscriber of owner %s', event['id'], owner_id)
+
+    def subscribe(self, owner_id, last_event_id=None):
+        with self._lock:
+            backlog = [] if last_event_id is None else [
+                event for event in self._buffers.get(owner_id, ()) if event['id'] > last_event_id]
+            subscription = Subscription(owner_id, backlog, self.max_queued)
+            self._subscriptions[owner_id].add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.owner_id].discard(subscription)
+            if not self._subscriptions[subscription.owner_id]:
+                del self._subscriptions[subscription.owner_id]
+
+    def clear(self):
+        with self._lock:
+            self._buffers.clear()
+            self._buffered_at.clear()
+
+
+class PostgresBroker(MemoryBroker):
+    """
+    Publishes with `NOTIFY` so that every worker receives the events; each worker runs one thread
+    that `LISTEN`s and delivers them to its local subscribers.
+    """
+    channel = 'golist_events'
+
+    def __init__(self, *args, **kwargs):
+        super(PostgresBroker, self).__init__(*args, **kwargs)
+        self._listener = None
+
+    def publish(self, owner_id, event_type, data):
+        payload = json.dumps({'owner': owner_id, 'event': {'id': self._next_id(), 'type': event_type, 'data': data}},
+                             cls=DjangoJSONEncoder)
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_notify(%s, %s)', [self.channel, payload])
+
+    def subscribe(self, owner_id, last_event_id=None):
+        with self._lock:
+            if self._listener is None:
+                self._listener = threading.Thread(target=self._listen, name='events-listener', daemon=True)
+                self._listener.start()
+        return super(PostgresBroker, self).subscribe(owner_id, last_event_id)
+
+    def _listen(self):
+        import psycopg2
+
+        while True:
+            try:
+                listen_connection = psycopg2.connect(**connection.get_connection_params())
+                listen_connection.autocommit = True
+                with listen_connection.cursor() as cursor:
+                    cursor.execute('LISTEN {}'.format(self.channel))
+                while True:
+                    if select.select([listen_connection], [], [], 60) == ([], [], []):
+                        continue
+                    listen_connection.poll()
+                    while listen_connection.notifies:
+                        message = json.loads(listen_connection.notifies.pop(0).payload)
+                        self.deliver(message['owner'], message['event'])
+            except Exception:
+                logger.exception('Events listener failed, reconnecting')
+                time.sleep(1)
+
+
+class EventStream(object):
+    """
+    Server-Sent Events iterator of a subscription: the backlog, then live events and heartbeats until
+    `max_duration` (clients reconnect with `Last-Event-ID`). Closing it releases the subscription and
+    the connection slot.
+    """
+
+    def __init__(self, subscription, accept=None, heartbeat=15, max_duration=300, on_close=None):
+        self.subscription = subscription
+        self.accept = accept or (lambda event: True)
+        self.heartbeat = heartbeat
+        self.max_duration = max_duration
+        self.on_close = on_close
+        self.closed = False
+
+    def _format(self, event):
+        data = json.dumps(event['data'], cls=DjangoJSONEncoder)
+        return 'id: {}\nevent: {}\ndata: {}\n\n'.format(event['id'], event['type'], data).encode('utf-8')
+
+    def __iter__(self):
+        yield b'retry: 3000\n\n'
+        for event in self.subscription.backlog:
+            if self.accept(event):
+                yield self._format(event)
+        deadline = time.monotonic() + self.max_duration
+        while not self.closed:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                event = self.subscription.queue.get(timeout=min(self.heartbeat, remaining))
+            except Empty:
+                yield b': heartbeat\n\n'
+                continue
+            if self.accept(event):
+                yield self._format(event)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            broker.unsubscribe(self.subscription)
+            if self.on_close:
+                self.on_close()
+
+
+def _get_broker():
+    options = {
+        'buffer_size': getattr(settings, 'EVENTS_BUFFER_SIZE', 100),
+        'max_owners': getattr(settings, 'EVENTS_BUFFER_OWNERS', 10000),
+        'buffer_ttl': getattr(settings, 'EVENTS_BUFFER_TTL', 3600),
+    }
+    if getattr(settings, 'EVENTS_BACKEND', 'memory') == 'postgresql':
+        return PostgresBroker(**options)
+    return MemoryBroker(**options)
+
+
+broker = _get_broker()
+
+connection_slots = threading.BoundedSemaphore(getattr(settings, 'SSE_MAX_CONNECTIONS', 50))
+
+
+def publish_on_commit(owner_id, event_type, data):
+    transaction.on_commit(lambda: broker.publish(owner_id, event_type, data), using=sharding.shard_for(owner_id))
+
+
+def stream_response(request, accept=None):
+    """
+    Streams the events of the request user, `accept` selects the events sent to this client.
+    """
+    if not connection_slots.acquire(blocking=False):
+        raise TooManyStreams()
+    last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    try:
+        stream = EventStream(broker.subscribe(request.user.pk, last_event_id), accept,
+                             heartbeat=getattr(settings, 'SSE_HEARTBEAT_SECONDS', 15),
+                             max_duration=getattr(settings, 'SSE_MAX_DURATION', 300),
+                             on_close=connection_slots.release)
+    except BaseException:
+        # The stream never started, its `close` will not release the slot.
+        connection_slots.release()
+        raise
+    response = StreamingHttpResponse(stream, content_type=EventStreamRenderer.media_type)
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,114 @@
+"""
+Safe retries of writes: the first response to a request with an `Idempotency-Key` header is stored, and
+retries of the same request with the same key get it again instead of running the write twice.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+from uuid import uuid4
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.response import Response
+
+HEADER = 'HTTP_IDEMPOTENCY_KEY'
+METHODS = ('POST', 'PUT', 'PATCH')
+
+
+class IdempotencyKeyInUse(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = 'A request with this Idempotency-Key is still running.'
+
+
+class IdempotencyKeyReused(APIException):
+    status_code = 422
+    default_detail = 'This Idempotency-Key was used for a different request.'
+
+
+def _get_expiry():
+    return timezone.now() - timedelta(hours=getattr(settings, 'IDEMPOTENCY_KEY_TTL_HOURS', 24))
+
+
+def _request_hash(request):
+    body = json.dumps(request.data, cls=DjangoJSONEncoder, sort_keys=True, default=str)
+    return hashlib.sha256('{} {}\n{}'.format(request.method, request.path, body).encode('utf-8')).hexdigest()
+
+
+def _reserve(user, key, request_hash):
+    """
+    Returns `(record, created)`, the unique `(user, key)` lets a single request create the record.
+    """
+    from users.models import IdempotencyKey
+
+    keys = IdempotencyKey.objects.using(DEFAULT_DB_ALIAS)
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return keys.create(user=user, key=key, request_hash=request_hash), True
+    except IntegrityError:
+        pass
+    # The key expired, or the request holding it died before finishing: its lease of `IDEMPOTENCY_LOCK_SECONDS`
+    # ran out. The conditional UPDATE lets a single request take it over.
+    now = timezone.now()
+    lease = now - timedelta(seconds=getattr(settings, 'IDEMPOTENCY_LOCK_SECONDS', 60))
+    stale = Q(created_at__lt=_get_expiry()) | Q(status_code__isnull=True, updated_at__lt=lease)
+    if keys.filter(stale, user=user, key=key).update(request_hash=request_hash, status_code=None, response='',
+                                                     lease_id=uuid4(), created_at=now, updated_at=now):
+        return keys.get(user=user, key=key), True
+    record = keys.filter(user=user, key=key).first()
+    if record is not None:
+        return record, False
+    # Released by a failed request in the meantime.
+    try:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            return keys.create(user=user, key=key, request_hash=request_hash), True
+    except IntegrityError:
+        raise IdempotencyKeyInUse()
+
+
+def idempotent(handler, request, key):
+    """
+    Wraps a view handler so it runs once per `key`, returning the stored response to retries.
+    Failed requests (exceptions and 5xx responses) are not stored, so retrying them runs them again.
+    A request whose key was taken over leaves the record to the request holding it now.
+    """
+
+    @wraps(handler)
+    def wrapper(*args, **kwargs):
+        request_hash = _request_hash(request)
+        record, created = _reserve(request.user, key, request_hash)
+        if not created:
+            if record.request_hash != request_hash:
+                raise IdempotencyKeyReused()
+            if record.status_code is None:
+                raise IdempotencyKeyInUse()
+            response = Response(json.loads(record.response) if record.response else None, status=record.status_code)
+            response['Idempotent-Replayed'] = 'true'
+            return response
+        lease = type(record).objects.using(DEFAULT_DB_ALIAS).filter(pk=record.pk, lease_id=record.lease_id)
+        try:
+            response = handler(*args, **kwargs)
+        except Exception:
+            lease.delete()
+            raise
+        if response.status_code >= 500:
+            lease.delete()
+        else:
+            lease.update(status_code=response.status_code, updated_at=timezone.now(),
+                         response=json.dumps(response.data, cls=DjangoJSONEncoder) if response.data is not None else '')
+        return response
+    return wrapper
+
+
+def purge_expired_keys():
+    """
+    Deletes the keys older than `IDEMPOTENCY_KEY_TTL_HOURS`, returns how many were deleted.
+    """
+    from users.models import IdempotencyKey
+
+    return IdempotencyKey.objects.using(DEFAULT_DB_ALIAS).filter(created_at__lt=_get_expiry()).delete()[0]
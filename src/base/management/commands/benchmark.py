@@ -0,0 +1,55 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from base import benchmarks
+
+
+def _format_time(seconds):
+    if seconds is None:
+        return '-'
+    if seconds < 1e-3:
+        return '{:.1f} us'.format(seconds * 1e6)
+    return '{:.2f} ms'.format(seconds * 1e3)
+
+
+class Command(BaseCommand):
+    help = 'Runs the micro-benchmarks of serializers, rendering and filter backends and compares the results ' \
+           'with the baseline, see `base.benchmarks`.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('pattern', nargs='?', help='Only run the benchmarks with this text in their name.')
+        parser.add_argument('--baseline', default=os.path.join(settings.BASE_DIR, 'benchmarks.json'),
+                            help='JSON file of the baseline.')
+        parser.add_argument('--save', action='store_true', help='Store the results as the new baseline.')
+        parser.add_argument('--threshold', type=float, default=benchmarks.THRESHOLD,
+                            help='Slowdown over the baseline reported as a regression, 0.2 is 20%%.')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs of each benchmark, the best one counts.')
+
+    def handle(self, *args, **options):
+        names = benchmarks.get_names(options['pattern'])
+        if not names:
+            raise CommandError('No benchmark matches {}.'.format(options['pattern']))
+        baseline = {}
+        if os.path.exists(options['baseline']):
+            baseline = benchmarks.load_baseline(options['baseline'])
+        results = {name: benchmarks.measure(name, options['repeat']) for name in names}
+        rows, regressions = benchmarks.compare(results, baseline, options['threshold'])
+
+        self.stdout.write('{:<28}{:>12}{:>12}{:>9}'.format('Benchmark', 'Time', 'Baseline', 'Change'))
+        for name, seconds, previous, change in rows:
+            line = '{:<28}{:>12}{:>12}{:>9}'.format(name, _format_time(seconds), _format_time(previous),
+                                                    '-' if change is None else '{:+.0%}'.format(change))
+            self.stdout.write(self.style.ERROR(line) if name in regressions else line)
+
+        if options['save']:
+            # Keeps the baseline of the benchmarks not run this time.
+            baseline.update(results)
+            benchmarks.save_baseline(options['baseline'], baseline)
+            self.stdout.write(self.style.SUCCESS('Baseline saved to {}.'.format(options['baseline'])))
+        elif regressions:
+            raise CommandError('{} benchmarks are more than {:.0%} slower than the baseline: {}.'.format(
+                len(regressions), options['threshold'], ', '.join(regressions)))
+        else:
+            self.stdout.write(self.style.SUCCESS('{} benchmarks run, no regression.'.format(len(results))))
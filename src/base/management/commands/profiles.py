@@ -0,0 +1,53 @@
+import io
+import os
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from base import profiling
+
+
+class Command(BaseCommand):
+    help = 'Lists the request profiles taken by ProfilingMiddleware, or summarizes one of them.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('profile_id', nargs='?', help='Summarize this profile, or the last one with "last".')
+        parser.add_argument('--sort', default='cumulative', choices=('cumulative', 'tottime', 'calls'),
+                            help='Order of the functions in the summary.')
+        parser.add_argument('--limit', type=int, default=25, help='Number of functions and lines listed.')
+        parser.add_argument('--path', help='Only list the profiles of paths containing this text.')
+
+    def handle(self, *args, **options):
+        reports = profiling.list_profiles()
+        if options['path']:
+            reports = [report for report in reports if options['path'] in report['path']]
+        if options['profile_id']:
+            self._summarize(reports, options)
+        else:
+            self._list(reports)
+
+    def _list(self, reports):
+        self.stdout.write('{:<58}{:>7}{:>10}{:>12}  {}'.format('Profile', 'Status', 'Seconds', 'Peak KiB', 'Path'))
+        for report in reports:
+            peak = '{:.0f}'.format(report['memory_peak'] / 1024) if report['memory_peak'] is not None else '-'
+            self.stdout.write('{:<58}{:>7}{:>10.3f}{:>12}  {} {}'.format(
+                report['id'], report['status'], report['duration'], peak, report['method'], report['path']))
+        self.stdout.write(self.style.SUCCESS('{} profiles in {}.'.format(len(reports), profiling.get_directory())))
+
+    def _summarize(self, reports, options):
+        if options['profile_id'] == 'last':
+            report = reports[0] if reports else None
+        else:
+            report = next((report for report in reports if report['id'] == options['profile_id']), None)
+        if report is None:
+            raise CommandError('Profile {} not found.'.format(options['profile_id']))
+        self.stdout.write('{} {} answered {} in {:.3f}s.'.format(report['method'], report['path'], report['status'],
+                                                                report['duration']))
+        output = io.StringIO()
+        stats = pstats.Stats(os.path.join(profiling.get_directory(), report['id'] + '.prof'), stream=output)
+        stats.strip_dirs().sort_stats(options['sort']).print_stats(options['limit'])
+        self.stdout.write(output.getvalue())
+        if report['allocations']:
+            self.stdout.write('Peak traced memory {:.0f} KiB. Allocated by line:'.format(report['memory_peak'] / 1024))
+            for line, size, count in report['allocations'][:options['limit']]:
+                self.stdout.write('{:>10.1f} KiB {:>8} blocks  {}'.format(size / 1024, count, line))
@@ -0,0 +1,49 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = 'Starts the application in a fresh interpreter and reports the import time by module and the time ' \
+           'until the first request is served.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/lists/', help='Path of the first request.')
+        parser.add_argument('--limit', type=int, default=25, help='Number of modules listed.')
+        parser.add_argument('--warm-up', action='store_true', help='Run the warm-up hook before the first request.')
+
+    def _get_host(self):
+        hosts = [host.lstrip('.') for host in settings.ALLOWED_HOSTS if host != '*']
+        return hosts[0] if hosts else 'localhost'
+
+    def handle(self, *args, **options):
+        command = [sys.executable, '-m', 'base.startup', options['path'], self._get_host()]
+        if options['warm_up']:
+            command.append('--warm-up')
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        start = time.perf_counter()
+        process = subprocess.run(command, cwd=settings.BASE_DIR, env=env, stdout=subprocess.PIPE,
+                                 stderr=subprocess.PIPE, universal_newlines=True)
+        total = time.perf_counter() - start
+        if process.returncode:
+            raise CommandError('The application failed to start:\n{}'.format(process.stderr))
+        report = json.loads(process.stdout)
+
+        self.stdout.write('Phase                         Seconds')
+        elapsed = 0
+        for name, seconds in report['phases']:
+            elapsed += seconds
+            self.stdout.write('{:<30}{:>7.3f}'.format(name, seconds))
+        self.stdout.write('{:<30}{:>7.3f}'.format('interpreter and exit', total - elapsed))
+        self.stdout.write('First request served with status {} after {:.3f}s.\n'.format(
+            report['status'][0], total - elapsed + sum(seconds for name, seconds in report['phases'][:-1])))
+
+        self.stdout.write('Module                                                Cumulative     Self')
+        for name, cumulative, own in report['imports'][:options['limit']]:
+            self.stdout.write('{:<54}{:>10.3f}{:>9.3f}'.format(name, cumulative, own))
+        self.stdout.write(self.style.SUCCESS('{} modules imported.'.format(len(report['imports']))))
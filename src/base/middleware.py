@@ -0,0 +1,123 @@
+import hashlib
+import hmac
+import logging
+import random
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import MiddlewareNotUsed
+from django.urls import reverse
+
+from base import db_routers, sharding
+from base.profiling import RequestProfile
+from base.queries import QueryBudgetExceeded, QueryInspector
+
+logger = logging.getLogger(__name__)
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaRoutingMiddleware(object):
+    """
+    Lets safe requests read from the replicas, unless the same client wrote in the last
+    `REPLICA_PIN_SECONDS`, so clients always read their own writes.
+    Clients are told apart by their credentials (Authorization header or session cookie)
+    because authentication only happens later, inside the views.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def _get_pin_key(self, request):
+        credentials = request.META.get('HTTP_AUTHORIZATION') or request.COOKIES.get(settings.SESSION_COOKIE_NAME)
+        if not credentials:
+            return None
+        return 'replica-pin:{}'.format(hashlib.sha1(credentials.encode('utf-8')).hexdigest())
+
+    def __call__(self, request):
+        pin_key = self._get_pin_key(request)
+        safe = request.method in SAFE_METHODS
+        db_routers.start_request(read_from_replica=safe and not (pin_key and cache.get(pin_key)))
+        try:
+            response = self.get_response(request)
+        finally:
+            wrote = db_routers.finish_request()
+        if pin_key and (wrote or not safe):
+            cache.set(pin_key, True, getattr(settings, 'REPLICA_PIN_SECONDS', 10))
+        return response
+
+
+class ShardRoutingMiddleware(object):
+    """
+    Makes the request available to `ShardRouter`, which routes the owner scoped queries to the shard
+    of the user once the view has authenticated it. The admin is left on the `default` shard.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.admin_prefix = reverse('admin:index')
+
+    def __call__(self, request):
+        if request.path.startswith(self.admin_prefix):
+            return self.get_response(request)
+        sharding.start_request(request)
+        try:
+            return self.get_response(request)
+        finally:
+            sharding.finish_request()
+
+
+class QueryInspectionMiddleware(object):
+    """
+    Reports the query shapes a request repeats more than `QUERY_REPEAT_THRESHOLD` times: logs them with
+    `QUERY_INSPECTION = 'log'`, the default with DEBUG, or fails the request with 'raise'.
+    Streamed responses are only inspected until the view returns.
+    """
+
+    def __init__(self, get_response):
+        self.mode = getattr(settings, 'QUERY_INSPECTION', '')
+        if not self.mode:
+            raise MiddlewareNotUsed()
+        self.threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with QueryInspector(self.threshold) as inspector:
+            response = self.get_response(request)
+        if inspector.repeated:
+            report = '{} {}\n{}'.format(request.method, request.path, inspector.report())
+            if self.mode == 'raise':
+                raise QueryBudgetExceeded(report)
+            logger.warning('Repeated queries in %s', report)
+        return response
+
+
+class ProfilingMiddleware(object):
+    """
+    Profiles a `PROFILING_SAMPLE_RATE` fraction of the requests, and the requests sent with
+    `X-Profile: <PROFILING_TOKEN>`; these can add `X-Profile-Memory: true` for a tracemalloc report,
+    which slows the request down. The id of the profile is returned in `X-Profile-Id`, see `base.profiling`.
+    Streamed responses are only profiled until the view returns.
+    """
+
+    def __init__(self, get_response):
+        self.sample_rate = getattr(settings, 'PROFILING_SAMPLE_RATE', 0)
+        self.token = getattr(settings, 'PROFILING_TOKEN', '')
+        if not self.sample_rate and not self.token:
+            raise MiddlewareNotUsed()
+        self.memory = getattr(settings, 'PROFILING_MEMORY', False)
+        self.get_response = get_response
+
+    def _is_requested(self, request):
+        token = request.META.get('HTTP_X_PROFILE')
+        return bool(self.token and token and hmac.compare_digest(token.encode('utf-8'), self.token.encode('utf-8')))
+
+    def __call__(self, request):
+        requested = self._is_requested(request)
+        if not requested and not (self.sample_rate and random.random() < self.sample_rate):
+            return self.get_response(request)
+        memory = self.memory or (requested and request.META.get('HTTP_X_PROFILE_MEMORY', '').lower() in ('1', 'true'))
+        with RequestProfile(memory) as profile:
+            response = self.get_response(request)
+        response['X-Profile-Id'] = profile.save(request, response)
+        return response
@@ -1,4 +1,22 @@
-from django.db import models
+from django.db import connections, models
+
+# Ids sent in a single `DELETE ... WHERE ... IN (...)`, under the 999 parameters of older SQLite versions.
+DELETE_BATCH_SIZE = 500
+
+
+def delete_rows(model, ids, using, column='id'):
+    """
+    Deletes the rows of `model` whose `column` is in `ids` with plain DELETEs, without loading them or sending
+    the `pre_delete`/`post_delete` signals. For rows that still exist elsewhere, e.g. moved or archived.
+    """
+    ids = list(ids)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for start in range(0, len(ids), DELETE_BATCH_SIZE):
+            batch = ids[start:start + DELETE_BATCH_SIZE]
+            cursor.execute('DELETE FROM {} WHERE {} IN ({})'.format(
+                connection.ops.quote_name(model._meta.db_table), connection.ops.quote_name(column),
+                ', '.join(['%s'] * len(batch))), batch)
 
 
 class BaseModel(models.Model):
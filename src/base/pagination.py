@@ -1,7 +1,73 @@
+from collections import OrderedDict
+
+from django.conf import settings
+from rest_framework import serializers
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+
+# Estimated bytes of the JSON values of each serializer field, the key and punctuation are added.
+FIELD_BYTES = (
+    (serializers.BooleanField, 5),
+    (serializers.NullBooleanField, 5),
+    (serializers.IntegerField, 10),
+    (serializers.FloatField, 10),
+    (serializers.DecimalField, 12),
+    (serializers.RelatedField, 10),
+    (serializers.DateTimeField, 28),
+    (serializers.DateField, 12),
+    (serializers.ListField, 1024),
+    (serializers.DictField, 1024),
+    (serializers.BaseSerializer, 1024),
+)
+DEFAULT_FIELD_BYTES = 32
+MAX_CHAR_FIELD_BYTES = 64
+
+
+def estimate_field_bytes(field):
+    if isinstance(field, serializers.CharField):
+        return min(field.max_length or MAX_CHAR_FIELD_BYTES, MAX_CHAR_FIELD_BYTES) + 2
+    for field_class, size in FIELD_BYTES:
+        if isinstance(field, field_class):
+            return size
+    return DEFAULT_FIELD_BYTES
+
+
+def estimate_row_bytes(serializer):
+    fields = getattr(serializer, 'child', serializer).fields
+    return sum(len(name) + 4 + estimate_field_bytes(field) for name, field in fields.items()) + 2
 
 
 class StandardResultsSetPagination(PageNumberPagination):
+    """
+    Pages hold `page_size` rows unless `?page_size=` asks more, up to the rows that fit in `PAGE_BYTE_BUDGET`
+    by the estimated size of a row of the view's serializer, so cheap endpoints and sparse `?fields=`
+    requests get larger pages. Views can set `page_row_bytes` instead, and `page_max_size` to cap the pages
+    of rows that still run queries of their own. The page size is in the response.
+    """
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 10
+
+    def get_max_page_size(self, view):
+        row_bytes = getattr(view, 'page_row_bytes', None)
+        if row_bytes is None:
+            if not hasattr(view, 'get_serializer'):
+                return self.max_page_size
+            row_bytes = estimate_row_bytes(view.get_serializer())
+        budget = getattr(settings, 'PAGE_BYTE_BUDGET', 65536) // row_bytes
+        max_size = getattr(view, 'page_max_size', None) or getattr(settings, 'PAGE_MAX_SIZE', 500)
+        return max(self.page_size, min(budget, max_size))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if view is not None:
+            self.max_page_size = self.get_max_page_size(view)
+        return super(StandardResultsSetPagination, self).paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('count', self.page.paginator.count),
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('page_size', self.page.paginator.per_page),
+            ('results', data),
+        ]))
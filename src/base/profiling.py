@@ -0,0 +1,132 @@
+"""
+Profiles of single requests, taken by `ProfilingMiddleware`: a cProfile of everything the request runs
+(middleware, authentication, filter backends, serializers and rendering) and, when asked, the memory
+allocated by each line with tracemalloc. Each profile is written to `PROFILING_DIR` as `<id>.prof`,
+readable with `pstats`, and `<id>.json` with the request and the memory report; `manage.py profiles`
+lists and summarizes them.
+"""
+import cProfile
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import datetime
+
+from django.conf import settings
+
+# Lines reported in the memory summary of a profile.
+MEMORY_TOP = 25
+
+# tracemalloc traces the whole process: it is started for the first memory profile and stopped after the
+# last one, the concurrent profiles share it.
+_tracing_lock = threading.Lock()
+_tracing_profiles = 0
+_started_tracing = False
+
+
+def _start_tracing():
+    global _tracing_profiles, _started_tracing
+    with _tracing_lock:
+        if not _tracing_profiles and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            _started_tracing = True
+        _tracing_profiles += 1
+
+
+def _stop_tracing():
+    global _tracing_profiles, _started_tracing
+    with _tracing_lock:
+        _tracing_profiles -= 1
+        if not _tracing_profiles and _started_tracing:
+            tracemalloc.stop()
+            _started_tracing = False
+
+
+class RequestProfile(object):
+
+    def __init__(self, memory=False):
+        self.memory = memory
+        self.profiler = cProfile.Profile()
+        self.duration = None
+        self.allocations = []
+        self.peak = None
+        self._snapshot = None
+
+    def __enter__(self):
+        if self.memory:
+            _start_tracing()
+            self._snapshot = tracemalloc.take_snapshot()
+        self._start = time.perf_counter()
+        self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.profiler.disable()
+        self.duration = time.perf_counter() - self._start
+        if self.memory:
+            try:
+                stats = tracemalloc.take_snapshot().compare_to(self._snapshot, 'lineno')
+                self.allocations = [
+                    ['{}:{}'.format(stat.traceback[0].filename, stat.traceback[0].lineno), stat.size_diff,
+                     stat.count_diff] for stat in stats[:MEMORY_TOP]]
+                # Process-wide, it includes the allocations of the concurrent requests.
+                self.peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                _stop_tracing()
+
+    def save(self, request, response):
+        """
+        Writes the profile to `PROFILING_DIR`, returns its id.
+        """
+        directory = get_directory()
+        os.makedirs(directory, exist_ok=True)
+        slug = re.sub(r'[^a-zA-Z0-9]+', '-', request.path).strip('-')[:60] or 'root'
+        profile_id = '{:%Y%m%d-%H%M%S-%f}-{}-{}'.format(datetime.now(), request.method.lower(), slug)
+        self.profiler.dump_stats(os.path.join(directory, profile_id + '.prof'))
+        with open(os.path.join(directory, profile_id + '.json'), 'w') as report:
+            json.dump({
+                'id': profile_id,
+                'method': request.method,
+                'path': request.get_full_path(),
+                'status': response.status_code,
+                'duration': self.duration,
+                'memory_peak': self.peak,
+                'allocations': self.allocations,
+            }, report)
+        prune(directory)
+        return profile_id
+
+
+def get_directory():
+    return getattr(settings, 'PROFILING_DIR', os.path.join(tempfile.gettempdir(), 'golist-profiles'))
+
+
+def list_profiles(directory=None):
+    """
+    Returns the reports of the profiles in `directory`, newest first.
+    """
+    directory = directory or get_directory()
+    if not os.path.isdir(directory):
+        return []
+    reports = []
+    for name in sorted(os.listdir(directory), reverse=True):
+        if name.endswith('.json'):
+            with open(os.path.join(directory, name)) as report:
+                reports.append(json.load(report))
+    return reports
+
+
+def prune(directory):
+    """
+    Keeps the last `PROFILING_MAX_FILES` profiles.
+    """
+    names = sorted(name[:-len('.json')] for name in os.listdir(directory) if name.endswith('.json'))
+    for profile_id in names[:-getattr(settings, 'PROFILING_MAX_FILES', 200) or None]:
+        for extension in ('.json', '.prof'):
+            try:
+                os.remove(os.path.join(directory, profile_id + extension))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,136 @@
+"""
+N+1 detection: fingerprints the SQL run inside a block and reports the query shapes repeated more than
+a threshold, with the serializer field and the project code that issued them.
+"""
+import os
+import re
+import sys
+from collections import Counter, OrderedDict
+from contextlib import ContextDecorator, ExitStack
+
+from django.conf import settings
+from django.db import connections
+
+_normalizations = [
+    (re.compile(r"'(?:[^']|'')*'"), '?'),
+    (re.compile(r'\b\d+(?:\.\d+)?\b'), '?'),
+    (re.compile(r'%s'), '?'),
+    (re.compile(r'\(\s*\?(?:\s*,\s*\?)*\s*\)'), '(...)'),
+    (re.compile(r'\s+'), ' '),
+]
+
+_this_file = os.path.abspath(__file__)
+
+# Project frames kept in the report of a repeated query, innermost first.
+STACK_DEPTH = 6
+
+
+def fingerprint(sql):
+    """
+    Returns the shape of a query: parameters, literals and `IN` lists replaced by placeholders.
+    """
+    for pattern, replacement in _normalizations:
+        sql = pattern.sub(replacement, sql)
+    return sql.strip()
+
+
+def _origin(frame):
+    """
+    Returns the serializer field being rendered, if any, and the innermost frames of the project code.
+    """
+    field = None
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        if field is None and code.co_name == 'to_representation' and 'field' in frame.f_locals:
+            field = '{}.{}'.format(type(frame.f_locals['self']).__name__,
+                                   getattr(frame.f_locals['field'], 'field_name', '?'))
+        filename = os.path.abspath(code.co_filename)
+        if filename.startswith(settings.BASE_DIR) and filename != _this_file and len(stack) < STACK_DEPTH:
+            stack.append('{}:{} in {}'.format(os.path.relpath(filename, settings.BASE_DIR), frame.f_lineno,
+                                              code.co_name))
+        frame = frame.f_back
+    return field, stack
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryInspector(object):
+    """
+    Counts the queries run on every database while active, by fingerprint. The origin of a query shape is
+    captured once, when it is repeated more than `threshold` times.
+    """
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.total = 0
+        self.counts = Counter()
+        self.origins = OrderedDict()
+        self._wrappers = None
+
+    def __call__(self, execute, sql, params, many, context):
+        key = fingerprint(sql)
+        self.total += 1
+        self.counts[key] += 1
+        if self.counts[key] == self.threshold + 1:
+            self.origins[key] = _origin(sys._getframe(1))
+        return execute(sql, params, many, context)
+
+    def __enter__(self):
+        self._wrappers = ExitStack()
+        for alias in connections:
+            self._wrappers.enter_context(connections[alias].execute_wrapper(self))
+        return self
+
+    def __exit__(self, *exc_info):
+        self._wrappers.close()
+
+    def _get_repeated(self):
+        return [(key, self.counts[key]) + origin for key, origin in self.origins.items()]
+    repeated = property(_get_repeated)
+
+    def report(self):
+        lines = []
+        for key, count, field, stack in self.repeated:
+            lines.append('{} queries of: {}'.format(count, key))
+            if field:
+                lines.append('  rendering {}'.format(field))
+            lines.extend('  {}'.format(frame) for frame in stack)
+        return '\n'.join(lines)
+
+
+class query_budget(ContextDecorator):
+    """
+    Fails with `QueryBudgetExceeded` when the block runs more than `max_queries` queries or repeats
+    a query shape more than `max_repeats` times (`QUERY_REPEAT_THRESHOLD` by default)::
+
+        @query_budget(max_queries=6)
+        def test_list_products(self):
+            ...
+    """
+
+    def __init__(self, max_queries=None, max_repeats=None):
+        self.max_queries = max_queries
+        self.max_repeats = max_repeats
+
+    def __enter__(self):
+        threshold = self.max_repeats
+        if threshold is None:
+            threshold = getattr(settings, 'QUERY_REPEAT_THRESHOLD', 5)
+        self.inspector = QueryInspector(threshold).__enter__()
+        return self.inspector
+
+    def __exit__(self, exc_type, exc, traceback):
+        self.inspector.__exit__(exc_type, exc, traceback)
+        if exc_type is not None:
+            return False
+        problems = []
+        if self.max_queries is not None and self.inspector.total > self.max_queries:
+            problems.append('{} queries, the budget is {}.'.format(self.inspector.total, self.max_queries))
+        if self.inspector.repeated:
+            problems.append(self.inspector.report())
+        if problems:
+            raise QueryBudgetExceeded('\n'.join(problems))
+        return False
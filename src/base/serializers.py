@@ -0,0 +1,51 @@
+from uuid import UUID
+
+from django.core.exceptions import FieldDoesNotExist, ObjectDoesNotExist
+from rest_framework import serializers
+
+
+def is_uuid(value):
+    try:
+        UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def lookup(value, field=None):
+    """
+    Returns the filter matching an object, or the object of the relation `field`, by id or by `uuid`.
+    """
+    name = 'uuid' if is_uuid(value) else 'pk'
+    return {'{}__{}'.format(field, name) if field else name: value}
+
+
+class PrimaryKeyOrUUIDRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    Accepts the id or the `uuid` of the related object, so clients can reference objects created offline
+    before they are synced.
+    """
+
+    def to_internal_value(self, data):
+        queryset = self.get_queryset()
+        if isinstance(data, str) and is_uuid(data):
+            try:
+                queryset.model._meta.get_field('uuid')
+            except FieldDoesNotExist:
+                self.fail('incorrect_type', data_type=type(data).__name__)
+            try:
+                return queryset.get(uuid=data)
+            except ObjectDoesNotExist:
+                self.fail('does_not_exist', pk_value=data)
+        return super(PrimaryKeyOrUUIDRelatedField, self).to_internal_value(data)
+
+
+class ClientUUIDModelSerializer(serializers.ModelSerializer):
+    """
+    Serializer of models with a `uuid` clients can choose when creating an object, read-only afterwards.
+    """
+    serializer_related_field = PrimaryKeyOrUUIDRelatedField
+
+    def update(self, instance, validated_data):
+        validated_data.pop('uuid', None)
+        return super(ClientUUIDModelSerializer, self).update(instance, validated_data)
@@ -0,0 +1,192 @@
+import threading
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Count
+
+# Owner scoped models, every row of a user lives in the user's shard.
+SHARDED_MODELS = {
+    'lists.list', 'lists.item', 'lists.archivedlist',
+    'products.category', 'products.product',
+    'users.usersummary', 'users.productspending',
+}
+
+# Reference data every shard needs for its joins, copied to all of them with the same ids.
+REPLICATED_MODELS = {'products.catalogproduct'}
+
+_state = threading.local()
+
+
+def get_shards():
+    return getattr(settings, 'SHARDS', [DEFAULT_DB_ALIAS])
+
+
+def is_sharded(model):
+    return model._meta.label_lower in SHARDED_MODELS
+
+
+def is_replicated(model):
+    return model._meta.label_lower in REPLICATED_MODELS
+
+
+def get_owner_id(instance):
+    if instance._meta.label == settings.AUTH_USER_MODEL:
+        return instance.pk
+    return getattr(instance, 'owner_id', None)
+
+
+def _cache_key(owner_id):
+    return 'shard:{}'.format(owner_id)
+
+
+def ensure_owner(owner_id, alias):
+    """
+    Copies the user row to `alias` so the foreign keys of the shard hold. The copy can not log in,
+    authentication always reads the users of the `default` database.
+    """
+    if alias == DEFAULT_DB_ALIAS:
+        return
+    from users.models import User
+
+    if not User.objects.using(alias).filter(pk=owner_id).exists():
+        user = User.objects.using(DEFAULT_DB_ALIAS).get(pk=owner_id)
+        User.objects.using(alias).create(pk=user.pk, username=user.username, hash=user.hash,
+                                         password=make_password(None))
+
+
+def _has_rows(owner_id, alias):
+    from django.apps import apps
+
+    models = [apps.get_model(label) for label in SHARDED_MODELS]
+    return any(model._base_manager.using(alias).filter(owner_id=owner_id).exists()
+               for model in models if any(field.name == 'owner' for field in model._meta.fields))
+
+
+def assign(owner_id):
+    """
+    Places a user on the shard with the fewest users, returns the shard of the user.
+    Users with rows from before the sharding stay on `default`.
+    """
+    from users.models import UserShard
+
+    if _has_rows(owner_id, DEFAULT_DB_ALIAS):
+        alias = DEFAULT_DB_ALIAS
+    else:
+        directory = UserShard.objects.using(DEFAULT_DB_ALIAS)
+        counts = dict(directory.order_by().values_list('shard').annotate(Count('id')))
+        alias = min(get_shards(), key=lambda shard: counts.get(shard, 0))
+        ensure_owner(owner_id, alias)
+    entry, created = UserShard.objects.using(DEFAULT_DB_ALIAS).get_or_create(user_id=owner_id,
+                                                                           defaults={'shard': alias})
+    return entry.shard
+
+
+def shard_for(owner_id, write=False):
+    """
+    Returns the database alias holding the rows of the owner, from the directory kept in `default`.
+    Users are placed when created, the ones missing from the directory (created before the sharding) are
+    read from `default` and only placed, with `assign`, on their first `write`.
+    """
+    shards = get_shards()
+    if len(shards) == 1:
+        return shards[0]
+    key = _cache_key(owner_id)
+    alias = cache.get(key)
+    if alias is None:
+        from users.models import UserShard
+
+        alias = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user_id=owner_id).values_list(
+            'shard', flat=True).first()
+        if alias is None:
+            if not write:
+                return DEFAULT_DB_ALIAS
+            alias = assign(owner_id)
+        cache.set(key, alias, getattr(settings, 'SHARD_DIRECTORY_CACHE_SECONDS', 300))
+    return alias
+
+
+def replicate(instances, alias):
+    """
+    Creates or updates copies of the `instances` of a replicated model in `alias`, keeping their ids.
+    """
+    if not instances:
+        return
+    model = type(instances[0])
+    manager = model._base_manager.using(alias)
+    existing = set(manager.filter(pk__in=[instance.pk for instance in instances]).values_list('pk', flat=True))
+    created = []
+    for instance in instances:
+        values = {field.attname: getattr(instance, field.attname) for field in model._meta.concrete_fields}
+        if instance.pk in existing:
+            manager.filter(pk=instance.pk).update(**values)
+        else:
+            created.append(model(**values))
+    manager.bulk_create(created)
+
+
+def forget(owner_id):
+    cache.delete(_cache_key(owner_id))
+
+
+def start_request(request):
+    _state.request = request
+
+
+def finish_request():
+    _state.request = None
+
+
+@contextmanager
+def use_shard(alias):
+    """
+    Routes the owner scoped queries made outside of a request, e.g. by commands and jobs, to `alias`.
+    """
+    previous = getattr(_state, 'alias', None)
+    _state.alias = alias
+    try:
+        yield alias
+    finally:
+        _state.alias = previous
+
+
+def current_shard(write=False):
+    alias = getattr(_state, 'alias', None)
+    if alias:
+        return alias
+    request = getattr(_state, 'request', None)
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated:
+        return shard_for(user.pk, write)
+    return None
+
+
+def reserve_id_range(using, **kwargs):
+    """
+    Starts the ids of the sharded tables of the n-th shard at n * `SHARD_ID_RANGE`, so ids are unique
+    across shards and users keep their ids when moved. Runs after `migrate`, supports SQLite and PostgreSQL.
+    """
+    from django.apps import apps
+
+    shards = get_shards()
+    if using not in shards or not shards.index(using):
+        return
+    start = shards.index(using) * getattr(settings, 'SHARD_ID_RANGE', 100000000)
+    connection = connections[using]
+    with connection.cursor() as cursor:
+        for label in SHARDED_MODELS:
+            model = apps.get_model(label)
+            table = model._meta.db_table
+            if connection.vendor == 'sqlite':
+                cursor.execute('UPDATE sqlite_sequence SET seq = %s WHERE name = %s AND seq < %s',
+                               [start, table, start])
+                cursor.execute('INSERT INTO sqlite_sequence (name, seq) SELECT %s, %s WHERE NOT EXISTS '
+                               '(SELECT 1 FROM sqlite_sequence WHERE name = %s)', [table, start, table])
+            elif connection.vendor == 'postgresql':
+                column = model._meta.pk.column
+                cursor.execute(
+                    'SELECT setval(pg_get_serial_sequence(%s, %s), GREATEST(%s, (SELECT MAX({}) FROM {})))'.format(
+                        connection.ops.quote_name(column), connection.ops.quote_name(table)),
+                    [table, column, start])
@@ -0,0 +1,86 @@
+"""
+Measures a cold start of the application, run in a fresh interpreter by the `startup_profile` command:
+`python -m base.startup <path>` prints a JSON report on stdout.
+"""
+import importlib
+import json
+import sys
+import time
+
+_start = time.perf_counter()
+_imports = {}
+_stack = []
+_find_and_load = importlib._bootstrap._find_and_load
+
+
+def _timed_find_and_load(name, import_):
+    start = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _find_and_load(name, import_)
+    finally:
+        elapsed = time.perf_counter() - start
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += elapsed
+        _imports[name] = (elapsed, elapsed - children)
+
+
+def _serve(path, host):
+    from io import BytesIO
+    from wsgiref.util import setup_testing_defaults
+
+    environ = {'PATH_INFO': path, 'HTTP_HOST': host, 'SERVER_NAME': host, 'wsgi.input': BytesIO()}
+    setup_testing_defaults(environ)
+    statuses = []
+
+    def start_response(status, headers, exc_info=None):
+        statuses.append(int(status.split()[0]))
+
+    from golist_server.wsgi import application
+    response = application(environ, start_response)
+    try:
+        for chunk in response:
+            pass
+    finally:
+        if hasattr(response, 'close'):
+            response.close()
+    return statuses[0]
+
+
+def main(path, host, warm_up):
+    phases = []
+    checkpoint = _start
+
+    def phase(name):
+        nonlocal checkpoint
+        now = time.perf_counter()
+        phases.append((name, now - checkpoint))
+        checkpoint = now
+
+    import django
+    from django.conf import settings
+    settings.WARM_UP = False
+    settings.ALLOWED_HOSTS = list(settings.ALLOWED_HOSTS) + [host]
+    django.setup()
+    phase('settings and apps')
+    import golist_server.wsgi  # noqa: F401
+    phase('wsgi application')
+    if warm_up:
+        from base.warmup import warm_up as run_warm_up
+        run_warm_up()
+        phase('warm up')
+    status = _serve(path, host)
+    phase('first request')
+    status_again = _serve(path, host)
+    phase('second request')
+    return {
+        'phases': phases,
+        'status': [status, status_again],
+        'imports': sorted(([name] + list(times) for name, times in _imports.items()), key=lambda row: -row[1]),
+    }
+
+
+if __name__ == '__main__':
+    importlib._bootstrap._find_and_load = _timed_find_and_load
+    json.dump(main(sys.argv[1], sys.argv[2], '--warm-up' in sys.argv), sys.stdout)
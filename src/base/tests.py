@@ -1,13 +1,47 @@
+import io
+import json
+import os
+import shutil
+import tempfile
+import time
+import tracemalloc
+from datetime import timedelta
+from unittest import skipUnless
+
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from rest_framework.test import APITestCase
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from rest_framework import status
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.response import Response
+from rest_framework.test import APIRequestFactory, APITestCase
 
 from django.urls import reverse
+from django.utils.datetime_safe import datetime
+
+from base import benchmarks, checks, db_routers, idempotency, profiling, sharding
+from base.middleware import ReplicaRoutingMiddleware
+from base.pagination import StandardResultsSetPagination
+from base.queries import QueryBudgetExceeded, fingerprint, query_budget
+from base.throttling import MemoryBuckets, memory_buckets
+from base.warmup import warm_up
+from lists.models import List, Item
+from lists.serializers import ItemSerializer
+from products.models import Product, CatalogProduct
+from users.models import IdempotencyKey, UserShard
 
 User = get_user_model()
 
 
+# Requests repeating a query shape fail the tests, see `base.queries`.
+@override_settings(QUERY_INSPECTION='raise')
 class BaseAPITest(APITestCase):
     def setUp(self):
+        memory_buckets.clear()
         self.john_lennon = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
         self.john_lennon_token = self._get_jwt_token('john', 'johnpassword')
 
@@ -19,3 +53,502 @@ class BaseAPITest(APITestCase):
         self.paul_mccartney = User.objects.create_user('paul', 'mccartney@thebeatles.com', 'paulpassword',
                                                        hash='PAULMCCARTNEYHASH')
         self.paul_mccartney_token = self._get_jwt_token('paul', 'paulpassword')
+
+
+@override_settings(REPLICA_DATABASES=['replica'])
+class ReplicaRoutingTest(TestCase):
+    def setUp(self):
+        self.router = db_routers.ReplicaRouter()
+        self.router._health['replica'] = (True, time.monotonic())
+        self.factory = RequestFactory()
+        cache.clear()
+
+    def tearDown(self):
+        db_routers.finish_request()
+
+    def _get_read_alias(self, request):
+        aliases = []
+
+        def get_response(_request):
+            aliases.append(self.router.db_for_read(User))
+            return HttpResponse()
+        ReplicaRoutingMiddleware(get_response)(request)
+        return aliases[0]
+
+    def test_safe_requests_read_from_replica(self):
+        self.assertEqual(self._get_read_alias(self.factory.get('/', HTTP_AUTHORIZATION='JWT a')), 'replica')
+        self.assertIsNone(self._get_read_alias(self.factory.post('/', HTTP_AUTHORIZATION='JWT a')))
+
+    def test_reads_after_write_stay_on_primary(self):
+        db_routers.start_request(read_from_replica=True)
+        self.assertEqual(self.router.db_for_read(User), 'replica')
+        self.router.db_for_write(User)
+        self.assertIsNone(self.router.db_for_read(User))
+        self.assertTrue(db_routers.finish_request())
+
+    def test_client_is_pinned_to_primary_after_write(self):
+        self._get_read_alias(self.factory.post('/', HTTP_AUTHORIZATION='JWT a'))
+        self.assertIsNone(self._get_read_alias(self.factory.get('/', HTTP_AUTHORIZATION='JWT a')))
+        self.assertEqual(self._get_read_alias(self.factory.get('/', HTTP_AUTHORIZATION='JWT b')), 'replica')
+
+    @override_settings(REPLICA_DATABASES=['replica', 'missing'])
+    def test_unhealthy_replicas_are_left_out(self):
+        self.assertEqual(self.router.get_replicas(), ['replica'])
+        self.assertFalse(self.router._health['missing'][0])
+
+    def test_replicas_need_a_shared_cache(self):
+        with override_settings(REPLICA_DATABASES=['replica']):
+            self.assertEqual([warning.id for warning in checks.check_replica_pin_cache(None)], ['base.W001'])
+        with override_settings(REPLICA_DATABASES=['replica'], CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.memcached.MemcachedCache'}}):
+            self.assertEqual(checks.check_replica_pin_cache(None), [])
+        with override_settings(REPLICA_DATABASES=[]):
+            self.assertEqual(checks.check_replica_pin_cache(None), [])
+
+    def test_shards_need_a_shared_cache(self):
+        with override_settings(SHARDS=['default', 'shard']):
+            self.assertEqual([warning.id for warning in checks.check_shard_directory_cache(None)], ['base.W002'])
+        with override_settings(SHARDS=['default']):
+            self.assertEqual(checks.check_shard_directory_cache(None), [])
+
+    def test_replicas_do_not_migrate(self):
+        self.assertFalse(self.router.allow_migrate('replica', 'lists'))
+        self.assertIsNone(self.router.allow_migrate('default', 'lists'))
+
+
+@skipUnless(settings.REPLICA_DATABASES, 'Needs REPLICA_DATABASE_URLS')
+class ReplicaDatabaseTest(TransactionTestCase):
+    def test_safe_request_reads_from_configured_replica(self):
+        router = db_routers.ReplicaRouter()
+        db_routers.start_request(read_from_replica=True)
+        try:
+            self.assertIn(router.db_for_read(User), settings.REPLICA_DATABASES)
+            self.assertEqual(User.objects.using(router.db_for_read(User)).count(), 0)
+        finally:
+            db_routers.finish_request()
+
+
+@override_settings(SHARDS=['default', 'shard'])
+class ShardRoutingTest(TestCase):
+    def setUp(self):
+        self.router = db_routers.ShardRouter()
+        self.john = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
+        UserShard.objects.update_or_create(user=self.john, defaults={'shard': 'shard'})
+        cache.clear()
+
+    def tearDown(self):
+        sharding.finish_request()
+
+    def test_owner_scoped_models_follow_their_owner(self):
+        self.assertEqual(self.router.db_for_write(List, instance=self.john), 'shard')
+        self.assertEqual(self.router.db_for_write(List, instance=List(owner=self.john)), 'shard')
+        self.assertIsNone(self.router.db_for_read(List))
+        self.assertIsNone(self.router.db_for_read(User, instance=self.john))
+
+    def test_related_lookups_stay_on_the_instance_database(self):
+        my_list = List(owner_id=self.john.pk)
+        my_list._state.db = 'shard'
+        self.assertEqual(self.router.db_for_read(Item, instance=my_list), 'shard')
+        self.assertEqual(self.router.db_for_read(User, instance=my_list), 'default')
+        product = Product(owner_id=self.john.pk)
+        product._state.db = 'default'
+        self.assertFalse(self.router.allow_relation(my_list, product))
+        self.assertIsNone(self.router.allow_relation(my_list, self.john))
+
+    def test_current_shard(self):
+        request = RequestFactory().get('/')
+        request.user = self.john
+        sharding.start_request(request)
+        self.assertEqual(self.router.db_for_read(Product), 'shard')
+        with sharding.use_shard('default'):
+            self.assertIsNone(self.router.db_for_read(Product))
+
+    def test_new_users_go_to_the_least_loaded_shard(self):
+        paul = User.objects.create_user('paul', 'mccartney@thebeatles.com', 'paulpassword', hash='PAULHASH')
+        self.assertEqual(sharding.shard_for(paul.pk), 'default')
+        self.assertEqual(UserShard.objects.get(user=paul).shard, 'default')
+
+    def test_users_missing_from_the_directory_are_placed_on_write(self):
+        UserShard.objects.all().delete()
+        with self.assertNumQueries(1):
+            self.assertEqual(sharding.shard_for(self.john.pk), 'default')
+        self.assertFalse(UserShard.objects.exists())
+        self.assertIsNone(self.router.db_for_read(List, instance=List(owner_id=self.john.pk)))
+        self.assertFalse(UserShard.objects.exists())
+        self.assertIsNone(self.router.db_for_write(List, instance=List(owner_id=self.john.pk)))
+        self.assertEqual(UserShard.objects.get().user, self.john)
+
+    def test_users_with_rows_stay_on_default(self):
+        UserShard.objects.all().delete()
+        List.objects.create(owner=self.john, name='My List', valid_at=datetime.now())
+        self.assertEqual(sharding.assign(self.john.pk), 'default')
+
+    def test_rebalance_to_unknown_shard(self):
+        with self.assertRaises(CommandError):
+            call_command('rebalance_shards', user='john', to='missing', stdout=io.StringIO())
+
+
+@skipUnless(len(settings.SHARDS) > 1, 'Needs SHARD_DATABASE_URLS')
+class ShardedDatabaseTest(BaseAPITest):
+    multi_db = True
+
+    def setUp(self):
+        cache.clear()
+        super(ShardedDatabaseTest, self).setUp()
+        self._create_paul_mccartney()
+        self.assertEqual(sharding.shard_for(self.john_lennon.pk), 'default')
+        self.assertEqual(sharding.shard_for(self.paul_mccartney.pk), settings.SHARDS[1])
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        response = self.client.post(reverse('list-list'), {'name': 'My List'}, format='json')
+        self.list_id = response.data['id']
+        response = self.client.post(reverse('product-list'), {'name': 'Coat', 'unit_price': 50.0}, format='json')
+        self.client.post(reverse('item-list', args=[self.list_id]), {'product': response.data['id'], 'quantity': 2},
+                         format='json')
+
+    def test_rows_are_stored_on_the_owner_shard(self):
+        shard = settings.SHARDS[1]
+        self.assertGreaterEqual(self.list_id, settings.SHARD_ID_RANGE)
+        self.assertTrue(List.objects.using(shard).filter(pk=self.list_id, owner=self.paul_mccartney).exists())
+        self.assertEqual(Item.objects.using(shard).filter(list=self.list_id).count(), 1)
+        self.assertFalse(List.objects.using('default').exists())
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        self.assertEqual(self.client.get(reverse('list-list')).data['count'], 0)
+
+    def test_move_user_keeps_ids(self):
+        call_command('rebalance_shards', user='paul', to='default', stdout=io.StringIO())
+        self.assertEqual(sharding.shard_for(self.paul_mccartney.pk), 'default')
+        self.assertFalse(List.objects.using(settings.SHARDS[1]).exists())
+        response = self.client.get(reverse('item-list', args=[self.list_id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(self.client.get(reverse('user-summary')).data['lists_qty'], 1)
+
+    def test_deleted_users_are_purged_from_their_shard(self):
+        shard = settings.SHARDS[1]
+        self.paul_mccartney.delete()
+        self.assertFalse(List.objects.using(shard).exists())
+        self.assertFalse(Item.objects.using(shard).exists())
+        self.assertFalse(Product.objects.using(shard).exists())
+        self.assertFalse(User.objects.using(shard).filter(pk=self.paul_mccartney.pk).exists())
+
+    def test_catalog_is_replicated_to_every_shard(self):
+        milk = CatalogProduct.objects.create(gtin='04006381333931', name='Whole Milk', unit_price=3.50)
+        self.assertTrue(CatalogProduct.objects.using(settings.SHARDS[1]).filter(pk=milk.pk).exists())
+        response = self.client.post(reverse('product-list'), {'catalog_product': milk.pk}, format='json')
+        self.assertEqual(response.data['name'], 'Whole Milk')
+        response = self.client.get(reverse('product-suggest'), {'q': 'whole'})
+        self.assertEqual([row['name'] for row in response.data], ['Whole Milk'])
+
+
+@override_settings(REST_FRAMEWORK=dict(settings.REST_FRAMEWORK, DEFAULT_THROTTLE_RATES={
+    'read': '3/min', 'aggregate': '1/min', 'write': '2/min'}))
+class ThrottlingTest(BaseAPITest):
+    def setUp(self):
+        super(ThrottlingTest, self).setUp()
+        cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _make_requests_until_throttled(self, method, url, limit=10, **kwargs):
+        for i in range(limit):
+            response = getattr(self.client, method)(url, kwargs, format='json')
+            if response.status_code == status.HTTP_429_TOO_MANY_REQUESTS:
+                return i, response
+        return limit, None
+
+    def test_scopes_are_throttled_separately(self):
+        allowed, response = self._make_requests_until_throttled('post', reverse('list-list'), name='List')
+        self.assertEqual(allowed, 2)
+        self.assertGreater(int(response['Retry-After']), 0)
+        allowed, response = self._make_requests_until_throttled('get', reverse('list-list'))
+        self.assertEqual(allowed, 3)
+        allowed, response = self._make_requests_until_throttled('get', reverse('list-list'), search='List')
+        self.assertEqual(allowed, 1)
+        allowed, response = self._make_requests_until_throttled('get', reverse('user-summary'))
+        self.assertEqual(allowed, 0)
+
+    def test_users_are_throttled_separately(self):
+        self._make_requests_until_throttled('get', reverse('list-list'))
+        self._create_paul_mccartney()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        self.assertEqual(self._make_requests_until_throttled('get', reverse('list-list'))[0], 3)
+
+    @override_settings(THROTTLE_BACKEND='cache')
+    def test_shared_cache_backend(self):
+        self.assertEqual(self._make_requests_until_throttled('get', reverse('list-list'))[0], 3)
+        memory_buckets.clear()
+        self.assertEqual(self._make_requests_until_throttled('get', reverse('list-list'))[0], 0)
+
+    def test_memory_buckets_are_bounded(self):
+        buckets = MemoryBuckets()
+        buckets.max_buckets = 3
+        now = time.time()
+        for key in ('a', 'b', 'c'):
+            buckets.set(key, (0, now, 60), 60)
+        buckets.set('a', (0, now, 60), 60)
+        buckets.set('d', (0, now, 60), 60)
+        self.assertEqual(list(buckets._buckets), ['c', 'a', 'd'])
+
+
+class StartupTest(TestCase):
+    def test_warm_up(self):
+        self.assertGreater(warm_up(), 0)
+
+    def test_startup_profile(self):
+        stdout = io.StringIO()
+        call_command('startup_profile', limit=3, warm_up=True, stdout=stdout)
+        output = stdout.getvalue()
+        self.assertIn('First request served with status 401', output)
+        self.assertIn('warm up', output)
+        self.assertIn('modules imported', output)
+
+    def test_documentation_is_served(self):
+        response = self.client.get('/', HTTP_ACCEPT='application/openapi+json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        schema = json.loads(response.content.decode('utf-8'))
+        self.assertEqual(schema['info']['title'], 'Go List Api Documentation')
+        # Anonymously, only the endpoints open to everyone are documented.
+        self.assertIn(reverse('login'), schema['paths'])
+        self.assertNotIn(reverse('list-list'), schema['paths'])
+
+
+class QueryInspectionTest(BaseAPITest):
+    def setUp(self):
+        super(QueryInspectionTest, self).setUp()
+        self.list = List.objects.create(owner=self.john_lennon, name='List')
+        for i in range(8):
+            self.list.add_item(Product.objects.create(owner=self.john_lennon, name='Product {}'.format(i),
+                                                      unit_price=1), 1)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def test_fingerprint(self):
+        self.assertEqual(fingerprint("SELECT * FROM t WHERE a = 'it''s' AND b IN (1, 2, 3) AND c = %s"),
+                         'SELECT * FROM t WHERE a = ? AND b IN (...) AND c = ?')
+
+    def test_repeated_queries_fail_the_budget(self):
+        with self.assertRaises(QueryBudgetExceeded) as raised, query_budget(max_repeats=3):
+            ItemSerializer(Item.objects.filter(list=self.list), many=True).data
+        self.assertIn('8 queries of: SELECT', str(raised.exception))
+        self.assertIn('rendering ItemSerializer.total_price', str(raised.exception))
+        self.assertIn('in _get_total_price', str(raised.exception))
+
+    @query_budget(max_queries=3)
+    def test_list_products_within_budget(self):
+        response = self.client.get(reverse('product-list'))
+        self.assertEqual(len(response.data['results']), 8)
+
+    def test_middleware(self):
+        # Every query of the request counts as repeated with a threshold of 0.
+        with override_settings(QUERY_INSPECTION='raise', QUERY_REPEAT_THRESHOLD=0):
+            client = self.client_class()
+            client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+            with self.assertRaises(QueryBudgetExceeded):
+                client.get(reverse('item-list', kwargs={'list_pk': self.list.pk}))
+        with override_settings(QUERY_INSPECTION='log', QUERY_REPEAT_THRESHOLD=0):
+            client = self.client_class()
+            client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+            with self.assertLogs('base.middleware', 'WARNING') as logs:
+                response = client.get(reverse('item-list', kwargs={'list_pk': self.list.pk}))
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('GET /api/lists/{}/items/'.format(self.list.pk), logs.output[0])
+
+
+class PaginationTest(BaseAPITest):
+    def setUp(self):
+        super(PaginationTest, self).setUp()
+        Product.objects.bulk_create([Product(owner=self.john_lennon, name='Product {}'.format(i), unit_price=i)
+                                     for i in range(60)])
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _get_products(self, **kwargs):
+        return self.client.get(reverse('product-list'), kwargs)
+
+    def test_default_page_size(self):
+        response = self._get_products()
+        self.assertEqual(response.data['page_size'], 10)
+        self.assertEqual(len(response.data['results']), 10)
+
+    def test_page_size_is_capped_by_the_byte_budget(self):
+        response = self._get_products(page_size=50)
+        self.assertEqual(response.data['page_size'], 50)
+        self.assertEqual(len(response.data['results']), 50)
+        with override_settings(PAGE_BYTE_BUDGET=8192):
+            response = self._get_products(page_size=50)
+            self.assertLess(response.data['page_size'], 50)
+            self.assertGreater(response.data['page_size'], 10)
+            self.assertEqual(len(response.data['results']), response.data['page_size'])
+            sparse_response = self._get_products(page_size=50, fields='name')
+            self.assertGreater(sparse_response.data['page_size'], response.data['page_size'])
+
+    def test_page_size_is_capped_by_the_view(self):
+        class View(object):
+            page_row_bytes = 100
+            page_max_size = 20
+        self.assertEqual(StandardResultsSetPagination().get_max_page_size(View()), 20)
+
+    def test_full_item_pages_run_a_fixed_number_of_queries(self):
+        items_list = List.objects.create(owner=self.john_lennon, name='List')
+        for product in Product.objects.all()[:50]:
+            items_list.add_item(product, 1)
+        with query_budget(max_queries=4):
+            response = self.client.get(reverse('item-list', kwargs={'list_pk': items_list.pk}), {'page_size': 50})
+        self.assertEqual(len(response.data['results']), 50)
+
+    def test_sparse_fields(self):
+        response = self._get_products(fields='name,unit_price')
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name', 'unit_price'})
+        self.assertEqual(self._get_products(fields='name,colour').status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class IdempotencyTest(BaseAPITest):
+    def setUp(self):
+        super(IdempotencyTest, self).setUp()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _post(self, url, data, key):
+        return self.client.post(url, data, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retries_replay_the_first_response(self):
+        response = self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        retry = self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        self.assertEqual(retry.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(retry.data['id'], response.data['id'])
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(List.objects.count(), 1)
+        product = Product.objects.create(owner=self.john_lennon, name='Milk', unit_price=1)
+        url_items = reverse('item-list', kwargs={'list_pk': response.data['id']})
+        for i in range(2):
+            self._post(url_items, {'product': product.pk, 'quantity': 2}, 'key-2')
+        self.assertEqual(Item.objects.get().quantity, 2)
+
+    def test_key_reused_for_another_request(self):
+        self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        response = self._post(reverse('list-list'), {'name': 'Pharmacy'}, 'key-1')
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(List.objects.count(), 1)
+
+    def test_failed_requests_are_not_stored(self):
+        response = self._post(reverse('list-list'), {}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_key_of_a_dead_request_is_taken_over(self):
+        self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        # As left by a request killed while running.
+        IdempotencyKey.objects.update(status_code=None, response='')
+        response = self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        IdempotencyKey.objects.update(updated_at=datetime.now() - timedelta(seconds=61))
+        response = self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(IdempotencyKey.objects.get().status_code, status.HTTP_201_CREATED)
+
+    def test_request_taken_over_leaves_the_key_to_the_retry(self):
+        request = Request(APIRequestFactory().post('/api/lists/', {'name': 'Groceries'}, format='json'),
+                          parsers=[JSONParser()])
+        request.user = self.john_lennon
+
+        def handler():
+            # The retry takes the key over while this request is still running.
+            IdempotencyKey.objects.update(updated_at=datetime.now() - timedelta(seconds=61))
+            self.assertTrue(idempotency._reserve(self.john_lennon, 'key-1', 'retry')[1])
+            return Response({'id': 1}, status=status.HTTP_201_CREATED)
+        idempotency.idempotent(handler, request, 'key-1')()
+        record = IdempotencyKey.objects.get()
+        self.assertEqual(record.request_hash, 'retry')
+        self.assertIsNone(record.status_code)
+
+    def test_purge_expired_keys(self):
+        self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1')
+        IdempotencyKey.objects.update(created_at=datetime.now() - timedelta(hours=25))
+        call_command('purge_idempotency_keys', stdout=io.StringIO())
+        self.assertFalse(IdempotencyKey.objects.exists())
+        self.assertEqual(self._post(reverse('list-list'), {'name': 'Groceries'}, 'key-1').status_code,
+                         status.HTTP_201_CREATED)
+        self.assertEqual(List.objects.count(), 2)
+
+
+class ProfilingTest(BaseAPITest):
+    def setUp(self):
+        super(ProfilingTest, self).setUp()
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def _get_client(self):
+        client = self.client_class()
+        client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        return client
+
+    def test_profile_requested_with_header(self):
+        with override_settings(PROFILING_TOKEN='secret', PROFILING_DIR=self.directory):
+            client = self._get_client()
+            self.assertFalse(client.get(reverse('list-list')).has_header('X-Profile-Id'))
+            self.assertFalse(client.get(reverse('list-list'), HTTP_X_PROFILE='wrong').has_header('X-Profile-Id'))
+            response = client.get(reverse('list-list'), HTTP_X_PROFILE='secret', HTTP_X_PROFILE_MEMORY='true')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            reports = profiling.list_profiles()
+            self.assertEqual([report['id'] for report in reports], [response['X-Profile-Id']])
+            self.assertEqual(reports[0]['path'], reverse('list-list'))
+            self.assertIsNotNone(reports[0]['memory_peak'])
+            output = io.StringIO()
+            call_command('profiles', 'last', '--limit', '500', stdout=output)
+        self.assertIn('(dispatch)', output.getvalue())
+        self.assertIn('(get_serializer)', output.getvalue())
+        self.assertIn('Allocated by line', output.getvalue())
+
+    def test_sampled_profiles(self):
+        with override_settings(PROFILING_SAMPLE_RATE=1.0, PROFILING_DIR=self.directory, PROFILING_MAX_FILES=2):
+            client = self._get_client()
+            for i in range(3):
+                self.assertTrue(client.get(reverse('list-list')).has_header('X-Profile-Id'))
+            output = io.StringIO()
+            call_command('profiles', stdout=output)
+        self.assertEqual(len(profiling.list_profiles(self.directory)), 2)
+        self.assertIn('2 profiles', output.getvalue())
+        self.assertIsNone(profiling.list_profiles(self.directory)[0]['memory_peak'])
+
+    def test_concurrent_memory_profiles_share_tracing(self):
+        if tracemalloc.is_tracing():
+            self.skipTest('tracemalloc is started outside of the profiles')
+        with profiling.RequestProfile(memory=True) as outer:
+            with profiling.RequestProfile(memory=True):
+                pass
+            self.assertTrue(tracemalloc.is_tracing())
+        self.assertIsNotNone(outer.peak)
+        self.assertFalse(tracemalloc.is_tracing())
+
+
+class BenchmarkTest(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.baseline = os.path.join(directory, 'benchmarks.json')
+
+    def test_benchmarks_run_without_database(self):
+        # SimpleTestCase fails on any query.
+        for name in benchmarks.get_names():
+            benchmarks.get_benchmark(name)()
+
+    def test_compare(self):
+        rows, regressions = benchmarks.compare({'a': 1.3, 'b': 1.1, 'c': 0.5}, {'a': 1.0, 'b': 1.0}, threshold=0.2)
+        self.assertEqual(regressions, ['a'])
+        self.assertEqual([(name, previous) for name, seconds, previous, change in rows],
+                         [('a', 1.0), ('b', 1.0), ('c', None)])
+        self.assertAlmostEqual(rows[0][3], 0.3)
+
+    def test_command_saves_baseline_and_flags_regressions(self):
+        output = io.StringIO()
+        call_command('benchmark', 'filter.is_owner', '--baseline', self.baseline, '--save', '--repeat', '1',
+                     stdout=output)
+        self.assertIn('Baseline saved', output.getvalue())
+        with open(self.baseline) as baseline:
+            self.assertEqual(list(json.load(baseline)['results']), ['filter.is_owner'])
+
+        call_command('benchmark', 'filter.is_owner', '--baseline', self.baseline, '--threshold', '10', '--repeat', '1',
+                     stdout=output)
+        self.assertIn('no regression', output.getvalue())
+
+        benchmarks.save_baseline(self.baseline, {'filter.is_owner': 1e-9})
+        with self.assertRaisesMessage(CommandError, 'filter.is_owner'):
+            call_command('benchmark', 'filter.is_owner', '--baseline', self.baseline, '--repeat', '1', stdout=output)
@@ -0,0 +1,106 @@
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class MemoryBuckets(object):
+    """
+    Token buckets of the current process, each one a `(tokens, timestamp, timeout)` tuple. Reads take no
+    lock, so concurrent requests of a client may each spend the same token. At most `max_buckets` are kept:
+    the least recently used ones are forgotten first, which refills them.
+    """
+    max_buckets = 10000
+
+    def __init__(self):
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        return self._buckets.get(key)
+
+    def set(self, key, bucket, timeout):
+        with self._lock:
+            self._buckets[key] = bucket
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.max_buckets:
+                self._buckets.popitem(last=False)
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class CacheBuckets(object):
+    """
+    Token buckets shared by every worker through the Django cache.
+    """
+
+    def get(self, key):
+        return cache.get(key)
+
+    def set(self, key, bucket, timeout):
+        cache.set(key, bucket, timeout)
+
+    def clear(self):
+        pass
+
+
+memory_buckets = MemoryBuckets()
+
+
+class ScopedTokenBucketThrottle(BaseThrottle):
+    """
+    Throttles each user (or IP address for anonymous requests) with a token bucket per scope.
+    The scope is the view `throttle_scope` when set, otherwise `write` for unsafe methods,
+    `aggregate` for searches and `read` for everything else. Rates come from `DEFAULT_THROTTLE_RATES`.
+    """
+
+    def __init__(self):
+        self.wait_seconds = None
+
+    def get_scope(self, request, view):
+        scope = getattr(view, 'throttle_scope', None)
+        if scope:
+            return scope
+        if request.method not in SAFE_METHODS:
+            return 'write'
+        if request.query_params.get(api_settings.SEARCH_PARAM):
+            return 'aggregate'
+        return 'read'
+
+    def get_backend(self):
+        return CacheBuckets() if getattr(settings, 'THROTTLE_BACKEND', 'memory') == 'cache' else memory_buckets
+
+    def parse_rate(self, rate):
+        num, period = rate.split('/')
+        duration = {'s': 1, 'm': 60, 'h': 3600, 'd': 86400}[period[0]]
+        return int(num), duration
+
+    def allow_request(self, request, view):
+        scope = self.get_scope(request, view)
+        rate = api_settings.DEFAULT_THROTTLE_RATES.get(scope)
+        if rate is None:
+            return True
+        capacity, duration = self.parse_rate(rate)
+        refill_rate = capacity / float(duration)
+        ident = request.user.pk if request.user and request.user.is_authenticated else self.get_ident(request)
+        key = 'throttle:{}:{}'.format(scope, ident)
+
+        backend = self.get_backend()
+        now = time.time()
+        bucket = backend.get(key)
+        tokens = capacity if bucket is None else min(capacity, bucket[0] + (now - bucket[1]) * refill_rate)
+        if tokens < 1:
+            self.wait_seconds = (1 - tokens) / refill_rate
+            return False
+        backend.set(key, (tokens - 1, now, duration), duration)
+        return True
+
+    def wait(self):
+        return self.wait_seconds
@@ -1,7 +1,63 @@
 from rest_framework import viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import SAFE_METHODS
 
+from base import idempotency
+from base.serializers import is_uuid
 
-class OwnerModelViewSet(viewsets.ModelViewSet):
+
+class SparseFieldsMixin(object):
+    """
+    Renders only the fields listed in `?fields=name,unit_price` on reads; `id` is always included.
+    Smaller rows also allow larger pages, see `base.pagination`.
+    """
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super(SparseFieldsMixin, self).get_serializer(*args, **kwargs)
+        requested = self.request.query_params.get('fields') if self.request is not None else None
+        if requested and self.request.method in SAFE_METHODS:
+            fields = getattr(serializer, 'child', serializer).fields
+            names = {name.strip() for name in requested.split(',') if name.strip()} | {'id'}
+            unknown = names - set(fields)
+            if unknown:
+                raise ValidationError({'fields': ['Unknown fields: {}.'.format(', '.join(sorted(unknown)))]})
+            for name in set(fields) - names:
+                fields.pop(name)
+        return serializer
+
+
+class IdempotencyMixin(object):
+    """
+    Writes sent with an `Idempotency-Key` header run once, retries get the first response, see
+    `base.idempotency`.
+    """
+
+    def initial(self, request, *args, **kwargs):
+        super(IdempotencyMixin, self).initial(request, *args, **kwargs)
+        key = request.META.get(idempotency.HEADER)
+        handler_name = request.method.lower()
+        if key and request.method in idempotency.METHODS and hasattr(self, handler_name):
+            if len(key) > 255:
+                raise ValidationError({'Idempotency-Key': ['Ensure this header has no more than 255 characters.']})
+            setattr(self, handler_name, idempotency.idempotent(getattr(self, handler_name), request, key))
+
+
+class UUIDLookupMixin(object):
+    """
+    Finds the objects of the URLs by id or by `uuid`, e.g. `/api/lists/<uuid>/`.
+    """
+
+    def get_object(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        if is_uuid(self.kwargs.get(lookup_url_kwarg)):
+            self.lookup_url_kwarg = lookup_url_kwarg
+            self.lookup_field = 'uuid'
+        return super(UUIDLookupMixin, self).get_object()
+
+
+class OwnerModelViewSet(IdempotencyMixin, UUIDLookupMixin, SparseFieldsMixin, viewsets.ModelViewSet):
+    # Set per action with `@action(throttle_scope=...)`, see `base.throttling.ScopedTokenBucketThrottle`.
+    throttle_scope = None
 
     def perform_create(self, serializer):
         serializer.save(owner=self.request.user)
@@ -0,0 +1,38 @@
+import time
+
+from django.db import connections
+from django.urls import URLResolver, get_resolver
+from rest_framework.settings import api_settings
+
+
+def _walk(patterns):
+    for pattern in patterns:
+        pattern.pattern.regex
+        if isinstance(pattern, URLResolver):
+            yield from _walk(pattern.url_patterns)
+        else:
+            yield pattern
+
+
+def warm_up():
+    """
+    Does the lazy work of the first requests before the worker accepts traffic: compiles the URL patterns,
+    imports the REST framework classes and builds the serializer fields of every API view.
+    Run before forking (e.g. with a preloading server) the workers share the result.
+    Returns the seconds taken.
+    """
+    start = time.monotonic()
+    resolver = get_resolver()
+    resolver.reverse_dict
+    for setting in ('DEFAULT_RENDERER_CLASSES', 'DEFAULT_PARSER_CLASSES', 'DEFAULT_AUTHENTICATION_CLASSES',
+                    'DEFAULT_PERMISSION_CLASSES', 'DEFAULT_THROTTLE_CLASSES', 'DEFAULT_PAGINATION_CLASS'):
+        getattr(api_settings, setting)
+    serializers = set()
+    for pattern in _walk(resolver.url_patterns):
+        serializer_class = getattr(getattr(pattern.callback, 'cls', None), 'serializer_class', None)
+        if serializer_class is not None and serializer_class not in serializers:
+            serializers.add(serializer_class)
+            serializer_class().fields
+    # Connections opened while warming up must not be shared by the forked workers.
+    connections.close_all()
+    return time.monotonic() - start
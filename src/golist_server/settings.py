@@ -1,12 +1,15 @@
 import os
 
 import datetime
+import tempfile
 import environ
 
 root = environ.Path(__file__) - 3
 env = environ.Env(DEBUG=(bool, False), )
 
-environ.Env.read_env(env_file='{}/.env'.format(root))
+env_file = '{}/.env'.format(root)
+if os.path.exists(env_file):
+    environ.Env.read_env(env_file=env_file)
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -18,9 +21,11 @@ ALLOWED_HOSTS = []
 
 INSTALLED_APPS = [
     # Apps
+    'base.apps.BaseConfig',
     'lists.apps.ListsConfig',
     'products.apps.ProductsConfig',
     'users.apps.UsersConfig',
+    'jobs.apps.JobsConfig',
     # Default Django
     'django.contrib.admin',
     'django.contrib.auth',
@@ -36,6 +41,10 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'base.middleware.ProfilingMiddleware',
+    'base.middleware.QueryInspectionMiddleware',
+    'base.middleware.ReplicaRoutingMiddleware',
+    'base.middleware.ShardRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -68,6 +77,58 @@ DATABASES = {
     'default': env.db()
 }
 
+# Shared by the workers: replica pins, shard directory and throttling, e.g. redis:// or memcache://.
+CACHES = {
+    'default': env.cache('CACHE_URL', default='locmemcache://'),
+}
+
+# Read replicas, as a comma separated list of database urls. Tests run them as mirrors of `default`.
+REPLICA_DATABASES = []
+for i, url in enumerate(env.list('REPLICA_DATABASE_URLS', default=[]), start=1):
+    alias = 'replica_{}'.format(i)
+    DATABASES[alias] = dict(env.db_url_config(url), TEST={'MIRROR': 'default'})
+    REPLICA_DATABASES.append(alias)
+
+# Shards of the owner scoped data (see `base.sharding`), as a comma separated list of database urls.
+# `default` is always the first shard and holds the users and the user-to-shard directory.
+SHARDS = ['default']
+for i, url in enumerate(env.list('SHARD_DATABASE_URLS', default=[]), start=1):
+    alias = 'shard_{}'.format(i)
+    DATABASES[alias] = env.db_url_config(url)
+    SHARDS.append(alias)
+
+DATABASE_ROUTERS = ['base.db_routers.ShardRouter', 'base.db_routers.ReplicaRouter']
+
+SHARD_ID_RANGE = env.int('SHARD_ID_RANGE', default=100000000)
+
+# Seconds the shard of a user is cached; with several shards the cache must be shared by the workers (CACHE_URL),
+# so a user moved by `rebalance_shards` is moved for all of them.
+SHARD_DIRECTORY_CACHE_SECONDS = env.int('SHARD_DIRECTORY_CACHE_SECONDS', default=300)
+
+# Profiles this fraction of the requests, and the ones sent with `X-Profile: <PROFILING_TOKEN>`, see `base.profiling`.
+PROFILING_SAMPLE_RATE = env.float('PROFILING_SAMPLE_RATE', default=0.0)
+
+PROFILING_TOKEN = env('PROFILING_TOKEN', default='')
+
+# Adds a tracemalloc report to every profile, not only to the ones asked with `X-Profile-Memory: true`.
+PROFILING_MEMORY = env.bool('PROFILING_MEMORY', default=False)
+
+# Generated files, kept out of the source tree.
+PROFILING_DIR = env('PROFILING_DIR', default=os.path.join(tempfile.gettempdir(), 'golist-profiles'))
+
+PROFILING_MAX_FILES = env.int('PROFILING_MAX_FILES', default=200)
+
+# `log` or `raise` the query shapes a request repeats more than QUERY_REPEAT_THRESHOLD times, see `base.queries`.
+QUERY_INSPECTION = env('QUERY_INSPECTION', default='log' if DEBUG else '')
+
+QUERY_REPEAT_THRESHOLD = env.int('QUERY_REPEAT_THRESHOLD', default=5)
+
+# Clients read from the primary for this many seconds after a write. The pins are kept in the cache, which
+# has to be shared by every worker (CACHE_URL) when there are replicas, see `base.checks`.
+REPLICA_PIN_SECONDS = env.int('REPLICA_PIN_SECONDS', default=10)
+
+REPLICA_HEALTH_CHECK_INTERVAL = env.int('REPLICA_HEALTH_CHECK_INTERVAL', default=30)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -83,26 +144,85 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# The browsable API (and its templates and forms) is only loaded where it is used, by default in DEBUG.
+BROWSABLE_API = env.bool('BROWSABLE_API', default=DEBUG)
+
 REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': (
         'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ),
+    ) + (('rest_framework.renderers.BrowsableAPIRenderer', ) if BROWSABLE_API else ()),
     'DEFAULT_PERMISSION_CLASSES': (
         'rest_framework.permissions.IsAuthenticated',
+        'users.permissions.HasApiKeyScope',
     ),
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_jwt.authentication.JSONWebTokenAuthentication',
+        'users.authentication.ApiKeyAuthentication',
         'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
     ),
-    'DEFAULT_PAGINATION_CLASS': 'base.pagination.StandardResultsSetPagination'
+    'DEFAULT_PAGINATION_CLASS': 'base.pagination.StandardResultsSetPagination',
+    'DEFAULT_THROTTLE_CLASSES': (
+        'base.throttling.ScopedTokenBucketThrottle',
+    ),
+    'DEFAULT_THROTTLE_RATES': {
+        'read': env('THROTTLE_RATE_READ', default='600/min'),
+        'aggregate': env('THROTTLE_RATE_AGGREGATE', default='60/min'),
+        'write': env('THROTTLE_RATE_WRITE', default='120/min'),
+    },
 }
 
+# `?page_size=` can ask as many rows as fit in this many bytes, by the estimated size of a row, see `base.pagination`.
+PAGE_BYTE_BUDGET = env.int('PAGE_BYTE_BUDGET', default=65536)
+
+PAGE_MAX_SIZE = env.int('PAGE_MAX_SIZE', default=500)
+
+# `memory` keeps the throttling buckets in each worker, `cache` shares them through the Django cache.
+THROTTLE_BACKEND = env('THROTTLE_BACKEND', default='memory')
+
 JWT_AUTH = {
-    'JWT_EXPIRATION_DELTA': datetime.timedelta(seconds=6000)
+    'JWT_EXPIRATION_DELTA': datetime.timedelta(seconds=env.int('JWT_EXPIRATION_SECONDS', default=300)),
+    'JWT_RESPONSE_PAYLOAD_HANDLER': 'users.tokens.jwt_response_payload_handler',
 }
 
+REFRESH_TOKEN_EXPIRATION_DELTA = datetime.timedelta(days=env.int('REFRESH_TOKEN_EXPIRATION_DAYS', default=30))
+
+# Seconds a process trusts an API key it verified, revoked keys may work that long in the other processes.
+API_KEY_CACHE_SECONDS = env.int('API_KEY_CACHE_SECONDS', default=60)
+
+# Seconds a rotated API key keeps working.
+API_KEY_ROTATION_GRACE_SECONDS = env.int('API_KEY_ROTATION_GRACE_SECONDS', default=3600)
+
+# Retries sent with the same Idempotency-Key within this many hours get the first response, see `base.idempotency`.
+IDEMPOTENCY_KEY_TTL_HOURS = env.int('IDEMPOTENCY_KEY_TTL_HOURS', default=24)
+
+# A request still running after this many seconds is taken for dead, and a retry with its key runs again.
+IDEMPOTENCY_LOCK_SECONDS = env.int('IDEMPOTENCY_LOCK_SECONDS', default=60)
+
+JOBS_MAX_RUNNING_PER_USER = env.int('JOBS_MAX_RUNNING_PER_USER', default=2)
+
+JOBS_LOCK_TIMEOUT = env.int('JOBS_LOCK_TIMEOUT', default=600)
+
+LISTS_ARCHIVE_AFTER_DAYS = env.int('LISTS_ARCHIVE_AFTER_DAYS', default=90)
+
+# memory or postgresql (LISTEN/NOTIFY, needed when running more than one worker process).
+EVENTS_BACKEND = env('EVENTS_BACKEND', default='memory')
+
+EVENTS_BUFFER_SIZE = env.int('EVENTS_BUFFER_SIZE', default=100)
+
+# The last events are kept for this many owners, and for this many seconds after their last event.
+EVENTS_BUFFER_OWNERS = env.int('EVENTS_BUFFER_OWNERS', default=10000)
+
+EVENTS_BUFFER_TTL = env.int('EVENTS_BUFFER_TTL', default=3600)
+
+SSE_HEARTBEAT_SECONDS = env.int('SSE_HEARTBEAT_SECONDS', default=15)
+
+SSE_MAX_DURATION = env.int('SSE_MAX_DURATION', default=300)
+
+SSE_MAX_CONNECTIONS = env.int('SSE_MAX_CONNECTIONS', default=50)
+
+# Builds the URL resolvers and serializer fields when the WSGI application is loaded, see `base.warmup`.
+WARM_UP = env.bool('WARM_UP', default=True)
+
 LANGUAGE_CODE = 'pt-br'
 
 TIME_ZONE = 'America/Sao_Paulo'
@@ -15,9 +15,17 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path, include
-from rest_framework_swagger.views import get_swagger_view
 
-schema_view = get_swagger_view(title='Go List Api Documentation')
+_schema_view = None
+
+
+def schema_view(request, *args, **kwargs):
+    # Swagger and its codecs are only imported when the documentation is first requested.
+    global _schema_view
+    if _schema_view is None:
+        from rest_framework_swagger.views import get_swagger_view
+        _schema_view = get_swagger_view(title='Go List Api Documentation')
+    return _schema_view(request, *args, **kwargs)
 
 
 urlpatterns = [
@@ -28,6 +36,7 @@ urlpatterns = [
     path('api/users/', include('users.urls')),
     path('api/lists/', include('lists.urls')),
     path('api/products/', include('products.urls')),
+    path('api/jobs/', include('jobs.urls')),
     # Docs
     path('api-auth/', include('rest_framework.urls', namespace='rest_framework'))
 ]
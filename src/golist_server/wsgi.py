@@ -9,8 +9,13 @@ https://docs.djangoproject.com/en/2.0/howto/deployment/wsgi/
 
 import os
 
+from django.conf import settings
 from django.core.wsgi import get_wsgi_application
 
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "golist_server.settings")
 
 application = get_wsgi_application()
+
+if settings.WARM_UP:
+    from base.warmup import warm_up
+    warm_up()
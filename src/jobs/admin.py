@@ -0,0 +1,12 @@
+from django.contrib import admin
+
+from base.admin import BaseModelAdmin
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(BaseModelAdmin):
+    list_display = ['task', 'status', 'attempts', 'owner', 'run_at', 'finished_at']
+    list_filter = ['status', 'task']
+    raw_id_fields = ['owner']
@@ -0,0 +1,39 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from jobs import queue
+
+
+def _execute(job):
+    try:
+        return queue.execute(job)
+    finally:
+        connection.close()
+
+
+class Command(BaseCommand):
+    help = 'Runs the background jobs with a pool of threads.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=4, help='Number of jobs run at the same time.')
+        parser.add_argument('--poll-interval', type=float, default=1.0,
+                            help='Seconds to wait before polling again when there is nothing to run.')
+        parser.add_argument('--once', action='store_true', help='Exit once there are no more jobs to run.')
+
+    def handle(self, *args, **options):
+        threads = options['threads']
+        running = set()
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            while True:
+                running = {future for future in running if not future.done()}
+                jobs = queue.claim(threads - len(running)) if len(running) < threads else []
+                for job in jobs:
+                    self.stdout.write('Running job {} ({})'.format(job.pk, job.task))
+                    running.add(pool.submit(_execute, job))
+                if not jobs:
+                    if options['once'] and not running:
+                        break
+                    time.sleep(options['poll_interval'])
@@ -0,0 +1,49 @@
+import json
+
+from django.db import models
+from django.utils.translation import gettext_lazy as _
+
+from base.models import BaseModel
+
+
+class Job(BaseModel):
+    PENDING = 'pending'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = (
+        (PENDING, _('Pending')),
+        (RUNNING, _('Running')),
+        (SUCCEEDED, _('Succeeded')),
+        (FAILED, _('Failed')),
+    )
+
+    owner = models.ForeignKey('users.User', related_name='jobs', verbose_name=_('Owner'), on_delete=models.CASCADE)
+    task = models.CharField(_('Task'), max_length=100)
+    payload = models.TextField(_('Payload'), default='{}')
+    status = models.CharField(_('Status'), max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(_('Attempts'), default=0)
+    max_attempts = models.IntegerField(_('Max attempts'), default=3)
+    run_at = models.DateTimeField(_('Run at'))
+    locked_at = models.DateTimeField(_('Locked at'), null=True, blank=True)
+    finished_at = models.DateTimeField(_('Finished at'), null=True, blank=True)
+    result = models.TextField(_('Result'), blank=True)
+    error = models.TextField(_('Error'), blank=True)
+
+    class Meta:
+        ordering = ['-created_at', ]
+        index_together = [
+            ('status', 'run_at'),
+            ('owner', 'status'),
+        ]
+
+    def __str__(self):
+        return '{} ({})'.format(self.task, self.status)
+
+    def _get_arguments(self):
+        return json.loads(self.payload)
+    arguments = property(_get_arguments)
+
+    def _is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+    is_finished = property(_is_finished)
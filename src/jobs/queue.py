@@ -0,0 +1,104 @@
+import json
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.utils import timezone
+
+from users.models import User
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def task(name):
+    """
+    Registers the decorated function as the handler of the `name` jobs.
+    Handlers receive the job owner and the job arguments and return a JSON serializable result.
+    """
+    def decorator(func):
+        registry[name] = func
+        return func
+    return decorator
+
+
+def enqueue(owner, name, max_attempts=3, **arguments):
+    if name not in registry:
+        raise KeyError('Unknown task: {}'.format(name))
+    return Job.objects.create(owner=owner, task=name, payload=json.dumps(arguments), max_attempts=max_attempts,
+                              run_at=timezone.now())
+
+
+def _get_setting(name, default):
+    return getattr(settings, name, default)
+
+
+def claim(limit):
+    """
+    Locks up to `limit` runnable jobs for this worker, skipping the rows other workers already hold
+    and the owners that already reached `JOBS_MAX_RUNNING_PER_USER`. A claim counts as an attempt, so
+    the jobs whose worker died are given up once they ran out of attempts.
+    """
+    now = timezone.now()
+    max_running = _get_setting('JOBS_MAX_RUNNING_PER_USER', 2)
+    stale_at = now - timedelta(seconds=_get_setting('JOBS_LOCK_TIMEOUT', 600))
+    with transaction.atomic():
+        candidates = Job.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Job.PENDING, run_at__lte=now) | Q(status=Job.RUNNING, locked_at__lt=stale_at)
+        ).order_by('run_at')[:limit * 4]
+        candidates = list(candidates)
+        exhausted = [job.pk for job in candidates if job.status == Job.RUNNING and job.attempts >= job.max_attempts]
+        if exhausted:
+            Job.objects.filter(pk__in=exhausted).update(status=Job.FAILED, locked_at=None, finished_at=now,
+                                                        error='The worker stopped during the last attempt.')
+            candidates = [job for job in candidates if job.pk not in exhausted]
+        # Serializes the claims of each owner across workers, so the running jobs are counted once.
+        owner_ids = sorted({job.owner_id for job in candidates})
+        list(User.objects.select_for_update().filter(pk__in=owner_ids).order_by('pk').values_list('pk'))
+        running = dict(Job.objects.filter(
+            status=Job.RUNNING, locked_at__gte=stale_at, owner__in=owner_ids
+        ).order_by().values_list('owner').annotate(Count('id')))
+        claimed = []
+        for job in candidates:
+            if len(claimed) == limit:
+                break
+            if running.get(job.owner_id, 0) >= max_running:
+                continue
+            running[job.owner_id] = running.get(job.owner_id, 0) + 1
+            claimed.append(job.pk)
+        Job.objects.filter(pk__in=claimed).update(status=Job.RUNNING, locked_at=now, attempts=F('attempts') + 1)
+    return list(Job.objects.filter(pk__in=claimed).select_related('owner').order_by('run_at'))
+
+
+def execute(job):
+    try:
+        result = registry[job.task](job.owner, **job.arguments)
+    except Exception:
+        logger.exception('Job %s (%s) failed', job.pk, job.task)
+        job.error = traceback.format_exc()
+        if job.attempts < job.max_attempts:
+            job.status = Job.PENDING
+            job.run_at = timezone.now() + timedelta(seconds=2 ** job.attempts)
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = json.dumps(result)
+        job.error = ''
+        job.finished_at = timezone.now()
+    job.locked_at = None
+    job.save(update_fields=['status', 'run_at', 'locked_at', 'finished_at', 'result', 'error', 'updated_at'])
+    return job
+
+
+def process_available(limit=10):
+    """
+    Claims and runs jobs in the current thread, returns the processed jobs.
+    """
+    return [execute(job) for job in claim(limit)]
@@ -0,0 +1,21 @@
+import json
+
+from rest_framework import serializers
+
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    arguments = serializers.SerializerMethodField()
+    result = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Job
+        fields = ('id', 'task', 'arguments', 'status', 'attempts', 'max_attempts', 'run_at', 'finished_at', 'result',
+                  'created_at', 'updated_at')
+
+    def get_arguments(self, obj):
+        return obj.arguments
+
+    def get_result(self, obj):
+        return json.loads(obj.result) if obj.result else None
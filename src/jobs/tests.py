@@ -0,0 +1,72 @@
+from datetime import timedelta
+
+from django.test import override_settings
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from base.tests import BaseAPITest
+from users.models import UserSummary
+from . import queue
+from .models import Job
+
+
+@queue.task('jobs.tests.fail')
+def fail(owner):
+    raise ValueError('Expected failure')
+
+
+class JobAPITest(BaseAPITest):
+    def _make_request_get_job(self, pk):
+        url_job_api = reverse('job-detail', kwargs={'pk': pk})
+        return self.client.get(url_job_api, format='json')
+
+    def test_long_operation_returns_accepted_job(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self.client.post(reverse('user-summary-rebuild'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        job_pk = response.data['job']
+        self.assertEqual(self._make_request_get_job(job_pk).data['status'], Job.PENDING)
+        self.assertFalse(UserSummary.objects.exists())
+        queue.process_available()
+        self.assertEqual(self._make_request_get_job(job_pk).data['status'], Job.SUCCEEDED)
+
+    def test_get_job_with_other_user_token(self):
+        job = queue.enqueue(self.john_lennon, 'users.rebuild_summaries')
+        self._create_paul_mccartney()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        self.assertEqual(self._make_request_get_job(job.pk).status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_failed_job_is_retried(self):
+        job = queue.enqueue(self.john_lennon, 'jobs.tests.fail', max_attempts=2)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.process_available()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.PENDING)
+        self.assertEqual(job.attempts, 1)
+        self.assertIn('Expected failure', job.error)
+        Job.objects.filter(pk=job.pk).update(run_at=job.created_at)
+        with self.assertLogs('jobs.queue', 'ERROR'):
+            queue.process_available()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.attempts, 2)
+
+    @override_settings(JOBS_MAX_RUNNING_PER_USER=1)
+    def test_concurrency_limit_per_user(self):
+        self._create_paul_mccartney()
+        for _ in range(3):
+            queue.enqueue(self.john_lennon, 'users.rebuild_summaries')
+        queue.enqueue(self.paul_mccartney, 'users.rebuild_summaries')
+        claimed = queue.claim(10)
+        self.assertEqual(sorted(job.owner_id for job in claimed), [self.john_lennon.pk, self.paul_mccartney.pk])
+        self.assertEqual(queue.claim(10), [])
+
+    def test_job_of_a_dead_worker_is_given_up(self):
+        job = queue.enqueue(self.john_lennon, 'users.rebuild_summaries', max_attempts=2)
+        for attempt in (1, 2):
+            self.assertEqual([claimed.attempts for claimed in queue.claim(10)], [attempt])
+            Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+        self.assertEqual(queue.claim(10), [])
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 2))
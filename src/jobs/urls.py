@@ -0,0 +1,7 @@
+from rest_framework.routers import DefaultRouter
+
+from .views import JobViewSet
+
+router = DefaultRouter()
+router.register(r'', JobViewSet, base_name='job')
+urlpatterns = router.urls
@@ -0,0 +1,22 @@
+from rest_framework import status, viewsets
+from rest_framework.response import Response
+from rest_framework.reverse import reverse
+
+from base.filters import IsOwnerFilterBackend
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Job.objects.all()
+    serializer_class = JobSerializer
+    filter_backends = (IsOwnerFilterBackend, )
+
+
+def accepted_response(request, job):
+    """
+    Response for the endpoints that hand their work over to a background job.
+    """
+    url = reverse('job-detail', kwargs={'pk': job.pk}, request=request)
+    return Response({'job': job.pk, 'status': job.status, 'url': url}, status=status.HTTP_202_ACCEPTED,
+                    headers={'Location': url})
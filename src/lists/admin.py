@@ -1,20 +1,43 @@
 from django.contrib import admin
+from django.utils.translation import gettext_lazy as _
 
 from base.admin import BaseModelAdmin
 
-from .models import List, Item
+from .models import List, Item, ArchivedList
 
 
 class ItemInLine(admin.TabularInline):
     model = Item
     extra = 0
+    autocomplete_fields = ['product']
+    readonly_fields = ('purchased_at', 'position')
+
+    def get_queryset(self, request):
+        return super(ItemInLine, self).get_queryset(request).select_related('product')
+
+
+class ActiveListFilter(admin.SimpleListFilter):
+    title = _('Is it active?')
+    parameter_name = 'active'
+
+    def lookups(self, request, model_admin):
+        return (('1', _('Yes')), ('0', _('No')))
+
+    def queryset(self, request, queryset):
+        if self.value() in ('0', '1'):
+            return queryset.active(self.value() == '1')
+        return queryset
 
 
 @admin.register(List)
 class ListAdmin(BaseModelAdmin):
-    list_display = ['_is_active', 'name', 'created_at', 'owner']
+    list_display = ['_is_active', 'name', 'remaining_items', 'checked_items', 'total_value', 'created_at', 'owner']
     list_display_links = ('name', 'created_at', )
-    list_filter = ['owner', ]
+    list_filter = [ActiveListFilter, ]
+    list_select_related = ('owner', )
+    search_fields = ['name', 'owner__username']
+    autocomplete_fields = ['owner']
+    readonly_fields = ('remaining_items', 'checked_items', 'remaining_value', 'checked_value')
 
     fieldsets = (
         (
@@ -24,7 +47,8 @@ class ListAdmin(BaseModelAdmin):
         ),
         (
             'Info', {
-                'fields': ('created_at', 'updated_at'),
+                'fields': ('remaining_items', 'checked_items', 'remaining_value', 'checked_value', 'created_at',
+                           'updated_at'),
             }
         ),
     )
@@ -33,5 +57,12 @@ class ListAdmin(BaseModelAdmin):
         ItemInLine,
     ]
 
+    def get_queryset(self, request):
+        return super(ListAdmin, self).get_queryset(request).with_is_active()
 
 
+@admin.register(ArchivedList)
+class ArchivedListAdmin(BaseModelAdmin):
+    list_display = ['name', 'valid_at', 'items_qty', 'total_value', 'owner']
+    list_select_related = ('owner', )
+    raw_id_fields = ['owner']
@@ -0,0 +1,67 @@
+import json
+from collections import Counter, defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from base import sharding
+from base.events import publish_on_commit
+from base.models import delete_rows
+from products.models import product_name
+from users import summaries
+from .models import List, Item, ArchivedList
+
+
+def _archive_batch(cutoff, batch_size, using):
+    with transaction.atomic(using=using):
+        expired = List.objects.select_for_update(skip_locked=True).filter(valid_at__lt=cutoff).order_by('pk')
+        lists = list(expired[:batch_size])
+        if not lists:
+            return 0
+        items = defaultdict(list)
+        rows = Item.objects.filter(list__in=lists).order_by('position', 'created_at').annotate(
+            product_name=product_name('product__')).values_list(
+            'list_id', 'product_id', 'product_name', 'product__unit_price', 'quantity')
+        for list_id, product_id, name, unit_price, quantity in rows:
+            items[list_id].append({'product': product_id, 'name': name, 'unit_price': unit_price,
+                                   'quantity': quantity})
+        archives = []
+        for items_list in lists:
+            list_items = items[items_list.pk]
+            archives.append(ArchivedList(
+                owner_id=items_list.owner_id, original_id=items_list.pk, name=items_list.name,
+                valid_at=items_list.valid_at, list_created_at=items_list.created_at, items_qty=len(list_items),
+                total_value=sum((item['unit_price'] or 0) * item['quantity'] for item in list_items),
+                items=json.dumps(list_items),
+            ))
+        ArchivedList.objects.bulk_create(archives)
+        # Plain DELETEs: archiving must not fire the per-row signals, the spending rollups keep the list history.
+        list_ids = [items_list.pk for items_list in lists]
+        delete_rows(Item, list_ids, using, column='list_id')
+        delete_rows(List, list_ids, using)
+        owners = Counter(items_list.owner_id for items_list in lists)
+        for owner_id, count in owners.items():
+            summaries.add_lists(owner_id, -count)
+        for items_list in lists:
+            publish_on_commit(items_list.owner_id, 'list.archived', {'id': items_list.pk, 'name': items_list.name,
+                                                                     'valid_at': items_list.valid_at})
+        return len(lists)
+
+
+def archive_expired_lists(days, batch_size=100):
+    """
+    Moves the lists expired for more than `days` days, and their items, to `ArchivedList`.
+    Works shard by shard, in transactions of `batch_size` lists so locks are only held for a short time.
+    Returns the number of archived lists.
+    """
+    cutoff = timezone.now() - timedelta(days=days)
+    archived = 0
+    for alias in sharding.get_shards():
+        with sharding.use_shard(alias):
+            while True:
+                count = _archive_batch(cutoff, batch_size, alias)
+                archived += count
+                if count < batch_size:
+                    break
+    return archived
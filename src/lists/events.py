@@ -0,0 +1,60 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from base.events import publish_on_commit
+from .models import List, Item
+from .signals import item_adjusted, item_moved, items_checked, items_cleared
+
+
+def _list_data(instance):
+    return {'id': instance.pk, 'name': instance.name, 'valid_at': instance.valid_at}
+
+
+def _item_data(instance):
+    return {'id': instance.pk, 'list': instance.list_id, 'product': instance.product_id,
+            'quantity': instance.quantity, 'position': instance.position}
+
+
+@receiver(post_save, sender=List)
+def list_saved(sender, instance, created, **kwargs):
+    publish_on_commit(instance.owner_id, 'list.created' if created else 'list.updated', _list_data(instance))
+
+
+@receiver(post_delete, sender=List)
+def list_deleted(sender, instance, **kwargs):
+    publish_on_commit(instance.owner_id, 'list.deleted', _list_data(instance))
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, **kwargs):
+    publish_on_commit(instance.list.owner_id, 'item.created' if created else 'item.updated', _item_data(instance))
+
+
+@receiver(item_adjusted, sender=Item)
+def item_quantity_adjusted(sender, instance, created, **kwargs):
+    publish_on_commit(instance.list.owner_id, 'item.created' if created else 'item.updated', _item_data(instance))
+
+
+@receiver(items_checked, sender=Item)
+def items_purchased(sender, items_list, ids, purchased, **kwargs):
+    publish_on_commit(items_list.owner_id, 'items.checked' if purchased else 'items.unchecked',
+                      {'list': items_list.pk, 'items': ids})
+
+
+@receiver(items_cleared, sender=Item)
+def items_removed(sender, items_list, count, **kwargs):
+    publish_on_commit(items_list.owner_id, 'items.cleared', {'list': items_list.pk, 'count': count})
+
+
+@receiver(item_moved, sender=Item)
+def item_moved_in_list(sender, instance, rebalanced, **kwargs):
+    # A rebalanced list has new positions for all its items, clients have to fetch them again.
+    publish_on_commit(instance.list.owner_id, 'items.reordered' if rebalanced else 'item.updated',
+                      _item_data(instance))
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    owner_id = List.objects.filter(pk=instance.list_id).values_list('owner_id', flat=True).first()
+    if owner_id is not None:
+        publish_on_commit(owner_id, 'item.deleted', _item_data(instance))
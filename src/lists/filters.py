@@ -0,0 +1,15 @@
+import django_filters
+from django_filters.rest_framework import BooleanFilter
+
+from lists.models import List
+
+
+class ListFilter(django_filters.FilterSet):
+    active = BooleanFilter(method='filter_active')
+
+    class Meta:
+        model = List
+        fields = ['active', ]
+
+    def filter_active(self, queryset, name, value):
+        return queryset.active(value)
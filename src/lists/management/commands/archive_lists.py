@@ -0,0 +1,17 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from lists.archive import archive_expired_lists
+
+
+class Command(BaseCommand):
+    help = 'Moves the lists expired for a while, and their items, to the archive.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=settings.LISTS_ARCHIVE_AFTER_DAYS,
+                            help='Archive lists expired for more than this number of days.')
+        parser.add_argument('--batch-size', type=int, default=100, help='Number of lists archived per transaction.')
+
+    def handle(self, *args, **options):
+        archived = archive_expired_lists(options['days'], options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('{} lists archived.'.format(archived)))
@@ -0,0 +1,35 @@
+# Generated by Django 2.0.5 on 2026-10-19 14:53
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('lists', '0004_auto_20180603_1438'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedList',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('original_id', models.IntegerField(verbose_name='Original id')),
+                ('name', models.CharField(max_length=100, verbose_name='Name')),
+                ('valid_at', models.DateTimeField(null=True, verbose_name='Valid at')),
+                ('list_created_at', models.DateTimeField(verbose_name='List created at')),
+                ('items_qty', models.IntegerField(default=0, verbose_name='Items quantity')),
+                ('total_value', models.FloatField(default=0, verbose_name='Total value')),
+                ('items', models.TextField(default='[]', verbose_name='Items')),
+                ('owner', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_lists', to=settings.AUTH_USER_MODEL, verbose_name='Owner')),
+            ],
+            options={
+                'ordering': ['-valid_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 2.0.5 on 2026-10-19 14:54
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0005_archivedlist'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='list',
+            index=models.Index(fields=['owner', 'valid_at'], name='lists_list_owner_i_fdb7c4_idx'),
+        ),
+    ]
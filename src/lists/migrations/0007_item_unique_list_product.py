@@ -0,0 +1,29 @@
+from django.db import migrations
+from django.db.models import Count, Min, Sum
+
+
+def merge_duplicate_items(apps, schema_editor):
+    # Keeps the oldest item of each (list, product), with the quantity of all of them.
+    Item = apps.get_model('lists', 'Item')
+    items = Item.objects.using(schema_editor.connection.alias)
+    duplicates = items.filter(product__isnull=False).values('list', 'product').annotate(
+        count=Count('id'), first_id=Min('id'), quantity=Sum('quantity')).filter(count__gt=1).order_by()
+    for row in duplicates:
+        items.filter(pk=row['first_id']).update(quantity=row['quantity'])
+        items.filter(list=row['list'], product=row['product']).exclude(pk=row['first_id']).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_auto_20261019_1519'),
+        ('lists', '0006_auto_20261019_1454'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AlterUniqueTogether(
+            name='item',
+            unique_together={('list', 'product')},
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 2.0.5 on 2026-10-19 15:35
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def store_list_totals(apps, schema_editor):
+    # No item is checked yet, every item is remaining.
+    List = apps.get_model('lists', 'List')
+    Item = apps.get_model('lists', 'Item')
+    using = schema_editor.connection.alias
+    items = Item.objects.using(using).filter(list=OuterRef('pk')).order_by().values('list')
+    List.objects.using(using).update(
+        remaining_items=Coalesce(Subquery(items.annotate(total=Count('id')).values('total')), Value(0)),
+        remaining_value=Coalesce(Subquery(items.annotate(
+            total=Sum(F('quantity') * F('product__unit_price'))).values('total')), Value(0)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0007_item_unique_list_product'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='purchased',
+            field=models.BooleanField(default=False, verbose_name='Purchased'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='purchased_at',
+            field=models.DateTimeField(blank=True, null=True, verbose_name='Purchased at'),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='checked_items',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Checked items'),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='checked_value',
+            field=models.FloatField(default=0, editable=False, verbose_name='Checked value'),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='remaining_items',
+            field=models.IntegerField(default=0, editable=False, verbose_name='Remaining items'),
+        ),
+        migrations.AddField(
+            model_name='list',
+            name='remaining_value',
+            field=models.FloatField(default=0, editable=False, verbose_name='Remaining value'),
+        ),
+        migrations.RunPython(store_list_totals, migrations.RunPython.noop),
+    ]
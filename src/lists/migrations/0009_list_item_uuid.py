@@ -0,0 +1,23 @@
+# Generated by Django 2.0.5 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0008_item_purchased_list_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='list',
+            name='uuid',
+            field=models.UUIDField(null=True, verbose_name='UUID'),
+        ),
+        migrations.AddField(
+            model_name='item',
+            name='uuid',
+            field=models.UUIDField(null=True, verbose_name='UUID'),
+        ),
+    ]
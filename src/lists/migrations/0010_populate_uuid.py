@@ -0,0 +1,23 @@
+import uuid
+
+from django.db import migrations
+
+
+def populate_uuid(apps, schema_editor):
+    # One UUID per row, a default on `AddField` would give every existing row the same one.
+    for model_name in ('list', 'item'):
+        model = apps.get_model('lists', model_name)
+        rows = model.objects.using(schema_editor.connection.alias)
+        for pk in rows.filter(uuid__isnull=True).values_list('pk', flat=True).iterator():
+            rows.filter(pk=pk).update(uuid=uuid.uuid4())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0009_list_item_uuid'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_uuid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 2.0.5 on 2026-10-19 15:42
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0010_populate_uuid'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='list',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='UUID'),
+        ),
+        migrations.AlterField(
+            model_name='item',
+            name='uuid',
+            field=models.UUIDField(default=uuid.uuid4, unique=True, verbose_name='UUID'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 2.0.5 on 2026-10-19 18:20
+
+from django.db import migrations, models
+
+
+def populate_position(apps, schema_editor):
+    # Existing items keep their order, by creation, spread apart like appended items.
+    Item = apps.get_model('lists', 'Item')
+    items = Item.objects.using(schema_editor.connection.alias)
+    list_id, position = None, 0
+    for pk, item_list_id in items.order_by('list_id', 'created_at', 'id').values_list('pk', 'list_id').iterator():
+        position = position + 1024 if item_list_id == list_id else 1024
+        list_id = item_list_id
+        items.filter(pk=pk).update(position=position)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('lists', '0011_unique_uuid'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='item',
+            name='position',
+            field=models.BigIntegerField(default=0, editable=False, verbose_name='Position'),
+            preserve_default=False,
+        ),
+        migrations.RunPython(populate_position, migrations.RunPython.noop),
+        migrations.AlterModelOptions(
+            name='item',
+            options={'ordering': ['position', 'created_at']},
+        ),
+        migrations.AddIndex(
+            model_name='item',
+            index=models.Index(fields=['list', 'position'], name='lists_item_list_id_2f70c4_idx'),
+        ),
+    ]
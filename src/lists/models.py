@@ -1,25 +1,75 @@
-from django.db import models
-from django.db.models import Sum, F
+import json
+from uuid import uuid4
+
+from django.db import IntegrityError, connections, models, router, transaction
+from django.db.models import Count, Sum, F, Q, Case, When, Value, BooleanField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils import timezone
 from django.utils.translation import gettext_lazy as _
 
 from base.models import BaseModel
+from .signals import item_adjusted, item_moved, items_checked, items_cleared
+
+# Totals stored on `List`, kept up to date by `lists.totals`.
+LIST_TOTAL_FIELDS = ('remaining_items', 'checked_items', 'remaining_value', 'checked_value')
+
+# Distance between the positions of consecutive items when appended or rebalanced: an item can be moved
+# about log2(POSITION_GAP) times into the same gap before the list has to be rebalanced.
+POSITION_GAP = 1024
+
+
+class ListQuerySet(models.QuerySet):
+
+    def _active_q(self):
+        return Q(valid_at__isnull=True) | Q(valid_at__gt=timezone.now())
+
+    def with_is_active(self):
+        return self.annotate(active_now=Case(When(self._active_q(), then=Value(True)), default=Value(False),
+                                             output_field=BooleanField()))
+
+    def active(self, value=True):
+        return self.filter(self._active_q()) if value else self.exclude(self._active_q())
+
+    def refresh_totals(self):
+        """
+        Recomputes the stored totals of the lists from their items with a single UPDATE.
+        """
+        items = Item.objects.filter(list=OuterRef('pk')).order_by().values('list')
+
+        def total(purchased, aggregate):
+            return Coalesce(Subquery(items.filter(purchased=purchased).annotate(total=aggregate).values('total')),
+                            Value(0))
+
+        value = Sum(F('quantity') * F('product__unit_price'))
+        return self.update(remaining_items=total(False, Count('id')), checked_items=total(True, Count('id')),
+                           remaining_value=total(False, value), checked_value=total(True, value))
 
 
 class List(BaseModel):
     owner = models.ForeignKey('users.User', related_name='lists', verbose_name=_('Owner'), on_delete=models.CASCADE)
+    # Can be chosen by the client, so objects created offline can be referenced before being synced.
+    uuid = models.UUIDField(_('UUID'), default=uuid4, unique=True)
     name = models.CharField(_('Name'), max_length=100)
     valid_at = models.DateTimeField(_('Valid at'), null=True)
+    remaining_items = models.IntegerField(_('Remaining items'), default=0, editable=False)
+    checked_items = models.IntegerField(_('Checked items'), default=0, editable=False)
+    remaining_value = models.FloatField(_('Remaining value'), default=0, editable=False)
+    checked_value = models.FloatField(_('Checked value'), default=0, editable=False)
+
+    objects = ListQuerySet.as_manager()
 
     def _is_active(self):
+        # Lists fetched with `List.objects.with_is_active()` already know it from the query.
+        if hasattr(self, 'active_now'):
+            return self.active_now
         return self.valid_at > timezone.now() if self.valid_at else True
     _is_active.boolean = True
     _is_active.short_description = _('Is it active?')
+    _is_active.admin_order_field = 'active_now'
     is_active = property(_is_active)
 
     def _get_total_value(self):
-        return self.list_items.annotate(total_price=F('quantity') * F('product__unit_price')).aggregate(
-            total=Sum('total_price'))['total'] or 0
+        return self.remaining_value + self.checked_value
     total_value = property(_get_total_value)
 
     def _get_items_qty(self):
@@ -32,18 +82,246 @@ class List(BaseModel):
 
     class Meta:
         ordering = ['name', 'owner']
+        indexes = [
+            models.Index(fields=['owner', 'valid_at']),
+        ]
 
     def __str__(self):
         return self.name
 
     def add_item(self, product, quantity):
-        return Item.objects.create(list=self, product=product, quantity=quantity)
+        item = Item.objects.add(self, product, quantity)[0]
+        self.refresh_from_db(fields=LIST_TOTAL_FIELDS)
+        return item
+
+
+class ItemQuerySet(models.QuerySet):
+
+    def add(self, items_list, product, quantity, uuid=None):
+        """
+        Adds `quantity` units of `product` to the list, merged into the item of the product when it is
+        already on the list, with a single `INSERT ... ON CONFLICT DO UPDATE`. Returns `(item, created)`;
+        a merged item keeps its own `uuid`.
+        """
+        using = self._db or router.db_for_write(self.model, instance=items_list)
+        connection = connections[using]
+        uuid = uuid or uuid4()
+        if product is None:
+            # Items without product never conflict.
+            return Item.objects.using(using).create(list=items_list, product=product, quantity=quantity,
+                                                    uuid=uuid), True
+        # `RETURNING` needs SQLite 3.35.
+        if not (connection.vendor == 'postgresql' or (
+                connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 35))):
+            return self._add_without_upsert(using, items_list, product, quantity, uuid)
+        now = connection.ops.adapt_datetimefield_value(timezone.now())
+        table = connection.ops.quote_name(self.model._meta.db_table)
+        uuid = self.model._meta.get_field('uuid').get_db_prep_value(uuid, connection)
+        # A row just inserted has `xmax = 0` in PostgreSQL; with SQLite it has the `uuid` just sent, a merged
+        # one keeps its own.
+        created = '(xmax = 0)' if connection.vendor == 'postgresql' else 'uuid = %s'
+        with transaction.atomic(using=using):
+            with connection.cursor() as cursor:
+                # More units of a checked product still have to be bought, so merging unchecks the item.
+                # A new item goes after the last one, a merged item keeps its position.
+                cursor.execute(
+                    'INSERT INTO {table} (created_at, updated_at, uuid, list_id, product_id, quantity, purchased, '
+                    'position) VALUES (%s, %s, %s, %s, %s, %s, %s, '
+                    '(SELECT COALESCE(MAX(position), 0) + %s FROM {table} WHERE list_id = %s)) '
+                    'ON CONFLICT (list_id, product_id) DO UPDATE '
+                    'SET quantity = {table}.quantity + EXCLUDED.quantity, updated_at = EXCLUDED.updated_at, '
+                    'purchased = EXCLUDED.purchased, purchased_at = NULL '
+                    'RETURNING id, {created}'.format(table=table, created=created),
+                    [now, now, uuid, items_list.pk, product.pk, quantity, False, POSITION_GAP, items_list.pk] + (
+                        [] if connection.vendor == 'postgresql' else [uuid]))
+                pk, created = cursor.fetchone()
+            item = Item.objects.using(using).select_related('list', 'product').get(pk=pk)
+            item_adjusted.send(sender=Item, instance=item, delta=quantity, created=bool(created))
+        return item, bool(created)
+
+    def _add_without_upsert(self, using, items_list, product, quantity, uuid):
+        """
+        `add` for the databases without `INSERT ... ON CONFLICT ... RETURNING`: an UPDATE of the item of the
+        product, else an INSERT, and the UPDATE again when a concurrent request inserted it first.
+        """
+        items = Item.objects.using(using).filter(list=items_list, product=product)
+
+        def merge():
+            if not items.update(quantity=F('quantity') + quantity, purchased=False, purchased_at=None,
+                                updated_at=timezone.now()):
+                return None
+            item = items.select_related('list', 'product').get()
+            item_adjusted.send(sender=Item, instance=item, delta=quantity, created=False)
+            return item
+
+        with transaction.atomic(using=using):
+            item = merge()
+            if item is not None:
+                return item, False
+            try:
+                with transaction.atomic(using=using):
+                    return Item.objects.using(using).create(list=items_list, product=product, quantity=quantity,
+                                                            uuid=uuid), True
+            except IntegrityError:
+                return merge(), False
+
+    def adjust(self, pk, delta):
+        """
+        Adds `delta` to the item quantity with a single `UPDATE ... SET quantity = quantity + delta`,
+        refusing to go below zero. Returns the updated item, or None when nothing was updated.
+        """
+        items = self.filter(pk=pk)
+        if delta < 0:
+            items = items.filter(quantity__gte=-delta)
+        using = self._db or router.db_for_write(self.model)
+        with transaction.atomic(using=using):
+            if not items.using(using).update(quantity=F('quantity') + delta, updated_at=timezone.now()):
+                return None
+            item = Item.objects.using(using).select_related('list', 'product').get(pk=pk)
+            item_adjusted.send(sender=Item, instance=item, delta=delta, created=False)
+        return item
+
+    def set_purchased(self, items_list, purchased, ids=None):
+        """
+        Checks or unchecks the items of `ids` of the list, or all of them, with a single
+        `UPDATE ... WHERE id IN (...)`. Returns the number of updated items.
+        """
+        items = self.filter(list=items_list, purchased=not purchased)
+        if ids is not None:
+            items = items.filter(pk__in=ids)
+        using = self._db or router.db_for_write(self.model, instance=items_list)
+        now = timezone.now()
+        with transaction.atomic(using=using):
+            updated = items.using(using).update(purchased=purchased, purchased_at=now if purchased else None,
+                                                updated_at=now)
+            if updated:
+                items_checked.send(sender=Item, items_list=items_list, ids=ids, purchased=purchased)
+        return updated
+
+    def clear_checked(self, items_list):
+        """
+        Removes the checked items of the list with a single `DELETE`, without the per-row `post_delete`
+        signals: like archived lists, the spending rollups keep the bought items. Returns the number of
+        removed items.
+        """
+        using = self._db or router.db_for_write(self.model, instance=items_list)
+        connection = connections[using]
+        with transaction.atomic(using=using), connection.cursor() as cursor:
+            cursor.execute('DELETE FROM {} WHERE {} = %s AND {} = %s'.format(
+                connection.ops.quote_name(self.model._meta.db_table), connection.ops.quote_name('list_id'),
+                connection.ops.quote_name('purchased')), [items_list.pk, True])
+            deleted = cursor.rowcount
+            if deleted:
+                items_cleared.send(sender=Item, items_list=items_list, count=deleted)
+        return deleted
+
+    def next_position(self, items_list):
+        last = self.filter(list=items_list).aggregate(last=models.Max('position'))['last']
+        return (last or 0) + POSITION_GAP
+
+    def move(self, item, after=None, before=None):
+        """
+        Moves the item right after `after`, right before `before`, or to the top of its list with neither,
+        writing only the moved row: it takes the middle of the gap between its new neighbours. When the gap
+        is exhausted the list is rebalanced first, see `rebalance`. Returns the item.
+        """
+        using = self._db or router.db_for_write(self.model, instance=item)
+        with transaction.atomic(using=using):
+            # Serializes the moves in the list, so two of them don't take the same place.
+            List.objects.using(using).select_for_update().filter(pk=item.list_id).exists()
+            lower, upper = self._get_gap(using, item, after, before)
+            rebalanced = lower is not None and upper is not None and upper - lower < 2
+            if rebalanced:
+                Item.objects.using(using).rebalance(item.list_id)
+                lower, upper = self._get_gap(using, item, after, before)
+            if upper is None:
+                position = (lower or 0) + POSITION_GAP
+            elif lower is None:
+                position = upper - POSITION_GAP
+            else:
+                position = lower + (upper - lower) // 2
+            Item.objects.using(using).filter(pk=item.pk).update(position=position, updated_at=timezone.now())
+            item.position = position
+            item_moved.send(sender=Item, instance=item, rebalanced=rebalanced)
+        return item
+
+    def _get_gap(self, using, item, after, before):
+        """
+        Returns the positions around the new place of the item, None past the first or the last item.
+        """
+        others = Item.objects.using(using).filter(list=item.list_id).exclude(pk=item.pk)
+        if after is not None:
+            lower = others.values_list('position', flat=True).get(pk=after.pk)
+            return lower, others.filter(position__gt=lower).aggregate(upper=models.Min('position'))['upper']
+        if before is not None:
+            upper = others.values_list('position', flat=True).get(pk=before.pk)
+            return others.filter(position__lt=upper).aggregate(lower=models.Max('position'))['lower'], upper
+        return None, others.aggregate(upper=models.Min('position'))['upper']
+
+    def rebalance(self, list_id):
+        """
+        Spreads the positions of the items of the list `POSITION_GAP` apart, in their current order, with
+        a single UPDATE. Only needed when repeated moves into the same place exhausted its gap.
+        """
+        items = self.filter(list=list_id)
+        ids = items.order_by('position', 'created_at', 'id').values_list('pk', flat=True)
+        whens = [When(pk=pk, then=Value((i + 1) * POSITION_GAP)) for i, pk in enumerate(ids)]
+        if whens:
+            items.update(position=Case(*whens, output_field=models.BigIntegerField()))
+
+    def previews(self, list_ids, size):
+        """
+        Returns the first `size` items of each list, by list id, with a single query ranking the items
+        of every list with `ROW_NUMBER() OVER (PARTITION BY list_id ...)`.
+        """
+        previews = {list_id: [] for list_id in list_ids}
+        if not list_ids or size < 1:
+            return previews
+        using = self._db or router.db_for_read(self.model)
+        connection = connections[using]
+        if connection.vendor == 'postgresql' or (
+                connection.vendor == 'sqlite' and connection.Database.sqlite_version_info >= (3, 25)):
+            from products.models import CatalogProduct, Product
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    'SELECT ranked.id, ranked.list_id, ranked.product_id, ranked.name, ranked.quantity FROM ('
+                    'SELECT i.id, i.list_id, i.product_id, COALESCE(p.name, c.name, %s) AS name, i.quantity, '
+                    'ROW_NUMBER() OVER (PARTITION BY i.list_id ORDER BY i.position, i.created_at, i.id) '
+                    'AS rank_in_list '
+                    'FROM {item} i LEFT JOIN {product} p ON p.id = i.product_id '
+                    'LEFT JOIN {catalog} c ON c.id = p.catalog_product_id '
+                    'WHERE i.list_id IN ({list_ids})) ranked '
+                    'WHERE ranked.rank_in_list <= %s ORDER BY ranked.list_id, ranked.rank_in_list'.format(
+                        item=connection.ops.quote_name(self.model._meta.db_table),
+                        product=connection.ops.quote_name(Product._meta.db_table),
+                        catalog=connection.ops.quote_name(CatalogProduct._meta.db_table),
+                        list_ids=', '.join(['%s'] * len(list_ids))),
+                    [''] + list(list_ids) + [size])
+                rows = cursor.fetchall()
+        else:
+            from products.models import product_name
+
+            rows = self.model.objects.using(using).filter(list__in=list_ids).annotate(
+                name=product_name('product__')).order_by('list', 'position', 'created_at', 'id').values_list(
+                'id', 'list_id', 'product_id', 'name', 'quantity')
+        for pk, list_id, product_id, name, quantity in rows:
+            if len(previews[list_id]) < size:
+                previews[list_id].append({'id': pk, 'product': product_id, 'name': name, 'quantity': quantity})
+        return previews
 
 
 class Item(BaseModel):
     list = models.ForeignKey('lists.List', verbose_name=_('List'), related_name='list_items', on_delete=models.CASCADE)
+    uuid = models.UUIDField(_('UUID'), default=uuid4, unique=True)
     product = models.ForeignKey('products.Product', verbose_name=_('Product'), on_delete=models.CASCADE, null=True)
     quantity = models.FloatField(_('Quantity'), default=0)
+    purchased = models.BooleanField(_('Purchased'), default=False)
+    purchased_at = models.DateTimeField(_('Purchased at'), null=True, blank=True)
+    # Manual order of the items in the list, changed by `ItemQuerySet.move`. New items go last.
+    position = models.BigIntegerField(_('Position'), editable=False)
+
+    objects = ItemQuerySet.as_manager()
 
     def _get_total_price(self):
         if self.product:
@@ -52,9 +330,42 @@ class Item(BaseModel):
     total_price = property(_get_total_price)
 
     class Meta:
-        ordering = ['created_at', ]
+        ordering = ['position', 'created_at']
+        unique_together = ('list', 'product')
+        indexes = [
+            models.Index(fields=['list', 'position']),
+        ]
 
     def __str__(self):
-        return '{} ({})'.format(self.product.name, self.quantity)
+        return '{} ({})'.format(self.product.display_name, self.quantity)
 
+    def save(self, *args, **kwargs):
+        if self.position is None:
+            using = kwargs.get('using') or router.db_for_write(Item, instance=self)
+            self.position = Item.objects.using(using).next_position(self.list_id)
+        super(Item, self).save(*args, **kwargs)
+
+
+class ArchivedList(BaseModel):
+    """
+    Expired list moved out of the hot tables, with its items denormalized into a single row.
+    """
+    owner = models.ForeignKey('users.User', related_name='archived_lists', verbose_name=_('Owner'),
+                              on_delete=models.CASCADE)
+    original_id = models.IntegerField(_('Original id'))
+    name = models.CharField(_('Name'), max_length=100)
+    valid_at = models.DateTimeField(_('Valid at'), null=True)
+    list_created_at = models.DateTimeField(_('List created at'))
+    items_qty = models.IntegerField(_('Items quantity'), default=0)
+    total_value = models.FloatField(_('Total value'), default=0)
+    items = models.TextField(_('Items'), default='[]')
+
+    class Meta:
+        ordering = ['-valid_at', ]
+
+    def __str__(self):
+        return self.name
 
+    def _get_items_data(self):
+        return json.loads(self.items)
+    items_data = property(_get_items_data)
@@ -1,19 +1,78 @@
+from django.utils import timezone
 from rest_framework import serializers
 
+from base.serializers import ClientUUIDModelSerializer, PrimaryKeyOrUUIDRelatedField, is_uuid
 from products.serializers import ProductSerializer
-from .models import List, Item
+from .models import List, Item, ArchivedList
 
 
-class ListSerializer(serializers.ModelSerializer):
+class ListSerializer(ClientUUIDModelSerializer):
 
     class Meta:
         model = List
-        fields = ('id', 'name', 'total_value', 'valid_at', 'is_active', 'created_at', 'updated_at')
+        fields = ('id', 'uuid', 'name', 'total_value', 'remaining_items', 'checked_items', 'remaining_value',
+                  'checked_value', 'valid_at', 'is_active', 'created_at', 'updated_at')
 
 
-class ItemSerializer(serializers.ModelSerializer):
-    list = serializers.PrimaryKeyRelatedField(queryset=List.objects.all(), required=False)
+class ItemSerializer(ClientUUIDModelSerializer):
+    list = PrimaryKeyOrUUIDRelatedField(queryset=List.objects.all(), required=False)
 
     class Meta:
         model = Item
-        fields = ('id', 'total_price', 'quantity', 'product', 'list', 'created_at', 'updated_at')
+        fields = ('id', 'uuid', 'total_price', 'quantity', 'product', 'list', 'purchased', 'purchased_at', 'position',
+                  'created_at', 'updated_at')
+        read_only_fields = ('purchased_at', )
+        # Adding a product already on the list merges the items, see `ItemQuerySet.add`.
+        validators = []
+
+    def validate(self, attrs):
+        if 'purchased' in attrs and attrs['purchased'] != getattr(self.instance, 'purchased', False):
+            attrs['purchased_at'] = timezone.now() if attrs['purchased'] else None
+        return attrs
+
+
+class ArchivedListSerializer(serializers.ModelSerializer):
+    items = serializers.ListField(source='items_data', read_only=True)
+    archived_at = serializers.DateTimeField(source='created_at', read_only=True)
+
+    class Meta:
+        model = ArchivedList
+        fields = ('id', 'original_id', 'name', 'valid_at', 'items_qty', 'total_value', 'items', 'list_created_at',
+                  'archived_at')
+
+
+class ItemAdjustSerializer(serializers.Serializer):
+    delta = serializers.FloatField()
+
+
+class ItemCheckSerializer(serializers.Serializer):
+    ids = serializers.ListField(child=serializers.IntegerField(), allow_empty=False)
+
+
+class ItemMoveSerializer(serializers.Serializer):
+    """
+    Place of a moved item: right after the item `after`, right before the item `before`, by id or `uuid`,
+    or at the top of the list with neither.
+    """
+    after = serializers.CharField(required=False, allow_null=True)
+    before = serializers.CharField(required=False, allow_null=True)
+
+    def _validate_item(self, value):
+        if value is None or is_uuid(value):
+            return value
+        try:
+            int(value)
+        except ValueError:
+            raise serializers.ValidationError('Expected the id or the uuid of an item.')
+        return value
+
+    def validate_after(self, value):
+        return self._validate_item(value)
+
+    def validate_before(self, value):
+        return self._validate_item(value)
+
+    def validate(self, attrs):
+        if attrs.get('after') is not None and attrs.get('before') is not None:
+            raise serializers.ValidationError('Only one of after and before can be given.')
+        return attrs
@@ -0,0 +1,13 @@
+from django.dispatch import Signal
+
+# Sent after `ItemQuerySet.adjust` and `ItemQuerySet.add`, which skip `post_save`.
+item_adjusted = Signal(providing_args=['instance', 'delta', 'created'])
+
+# Sent after `ItemQuerySet.set_purchased`, `ids` is None when every item of the list was updated.
+items_checked = Signal(providing_args=['items_list', 'ids', 'purchased'])
+
+# Sent after `ItemQuerySet.clear_checked`, which deletes the checked items of the list without `post_delete`.
+items_cleared = Signal(providing_args=['items_list', 'count'])
+
+# Sent after `ItemQuerySet.move`, `rebalanced` when the positions of the other items of the list changed too.
+item_moved = Signal(providing_args=['instance', 'rebalanced'])
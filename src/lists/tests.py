@@ -1,14 +1,25 @@
+import csv
+import gzip
+import io
+import json
 from datetime import timedelta
+from uuid import UUID, uuid4
 
-from django.test import TestCase
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
 from django.utils.datetime_safe import datetime
 from rest_framework import status
 from rest_framework.reverse import reverse
 
+from base.events import MemoryBroker, broker, connection_slots
 from base.tests import BaseAPITest
 from products.models import Product
-from .models import List, Item
+from users.models import ProductSpending
+from .archive import archive_expired_lists
+from .models import POSITION_GAP, List, Item, ArchivedList
 
 User = get_user_model()
 
@@ -27,6 +38,21 @@ class ListModelTest(TestCase):
         my_yesterday_list = List.objects.create(owner=self.user, name='My Test List for Yesterday', valid_at=yesterday)
         self.assertFalse(my_yesterday_list.is_active)
 
+    def test_if_list_is_active_from_query(self):
+        tomorrow = datetime.now() + timedelta(days=1)
+        yesterday = datetime.now() - timedelta(days=1)
+        List.objects.create(owner=self.user, name='My Test List for Tomorrow', valid_at=tomorrow)
+        List.objects.create(owner=self.user, name='My Test List for Yesterday', valid_at=yesterday)
+        List.objects.create(owner=self.user, name='My Test List without Validity')
+        lists = {my_list.name: my_list.is_active for my_list in List.objects.with_is_active()}
+        self.assertEqual(lists, {
+            'My Test List for Tomorrow': True,
+            'My Test List for Yesterday': False,
+            'My Test List without Validity': True,
+        })
+        self.assertEqual(List.objects.active().count(), 2)
+        self.assertEqual(List.objects.active(False).count(), 1)
+
     def test_add_item(self):
         my_list = List.objects.create(owner=self.user, name='My Test List')
         # Milk
@@ -118,6 +144,18 @@ class ListAPITest(BaseAPITest):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(List.objects.get(pk=my_list.pk).name, 'Yoko`s Buy List')
 
+    def test_update_list_valid_at_across_now(self):
+        my_list = List.objects.create(owner=self.john_lennon, name='Lennon`s Buy List',
+                                      valid_at=datetime.now() - timedelta(days=1))
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self.client.patch(reverse('list-detail', kwargs={'pk': my_list.pk}),
+                                     {'valid_at': datetime.now() + timedelta(days=2)}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(response.data['is_active'])
+        response = self._make_request_update_list(my_list.pk, name=my_list.name,
+                                                  valid_at=datetime.now() - timedelta(days=2))
+        self.assertFalse(response.data['is_active'])
+
     def test_update_list_with_invalid_jwt_token(self):
         my_list = List.objects.create(owner=self.john_lennon, name='Lennon`s Buy List')
         self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token[:-1])
@@ -200,6 +238,41 @@ class ListAPITest(BaseAPITest):
         for i, result in enumerate(results):
             self.assertEqual(result['name'], sorted_names[i])
 
+    def test_list_lists_filtered_by_active(self):
+        List.objects.create(owner=self.john_lennon, name='Tomorrow', valid_at=datetime.now() + timedelta(days=1))
+        List.objects.create(owner=self.john_lennon, name='Yesterday', valid_at=datetime.now() - timedelta(days=1))
+        List.objects.create(owner=self.john_lennon, name='Forever')
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self._make_request_get_lists(active='true')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([result['name'] for result in response.data['results']], ['Forever', 'Tomorrow'])
+        self.assertTrue(all(result['is_active'] for result in response.data['results']))
+        response = self._make_request_get_lists(active='false')
+        self.assertEqual([result['name'] for result in response.data['results']], ['Yesterday'])
+        self.assertFalse(response.data['results'][0]['is_active'])
+
+    def test_list_lists_with_item_previews(self):
+        products = [Product.objects.create(name=name, unit_price=1, owner=self.john_lennon)
+                    for name in ('Bread', 'Milk', 'Eggs')]
+        for name in self._get_default_list_names():
+            a_list = List.objects.create(owner=self.john_lennon, name=name)
+            for product in products:
+                a_list.add_item(product, 2)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self._make_request_get_lists(preview=2)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        for result in response.data['results']:
+            self.assertEqual([row['name'] for row in result['preview']], ['Bread', 'Milk'])
+            self.assertEqual(result['preview'][0]['quantity'], 2)
+        self.assertNotIn('preview', self._make_request_get_lists().data['results'][0])
+        with CaptureQueriesContext(connection) as without_preview:
+            self._make_request_get_lists()
+        with CaptureQueriesContext(connection) as with_preview:
+            self._make_request_get_lists(preview=3)
+        self.assertEqual(len(with_preview), len(without_preview) + 1)
+        response = self._make_request_get_lists(preview='many')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
 
 class ItemAPITest(BaseAPITest):
     def setUp(self):
@@ -241,8 +314,43 @@ class ItemAPITest(BaseAPITest):
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertEqual(Item.objects.filter(list__owner=self.john_lennon).count(), 1)
         self.assertEqual(self.john_list.items_qty, 1)
+        self.john_list.refresh_from_db()
         self.assertEqual(self.john_list.total_value, self.products[0].unit_price * 2)
 
+    def test_create_item_merges_with_item_of_same_product(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self._make_request_create_item(self.john_list.pk, product=self.products[0].pk, quantity=2)
+        item_id = response.data['id']
+        response = self._make_request_create_item(self.john_list.pk, product=self.products[0].pk, quantity=3)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['id'], item_id)
+        self.assertEqual(response.data['quantity'], 5)
+        self.assertEqual(self.john_list.items_qty, 1)
+        self.assertEqual(ProductSpending.objects.get(product=self.products[0]).quantity, 5)
+        self.assertEqual(self.john_list.add_item(self.products[0], 1).pk, item_id)
+        self.assertEqual(Item.objects.get(pk=item_id).quantity, 6)
+
+    def test_add_item_reports_created(self):
+        item, created = Item.objects.add(self.john_list, self.products[0], 0)
+        self.assertTrue(created)
+        self.assertEqual(Item.objects.add(self.john_list, self.products[0], 0), (item, False))
+        # Without `INSERT ... ON CONFLICT ... RETURNING`, e.g. SQLite before 3.35.
+        add = Item.objects.all()._add_without_upsert
+        item, created = add('default', self.yoko_list, self.products[2], 2, uuid4())
+        self.assertTrue(created)
+        Item.objects.set_purchased(self.yoko_list, True)
+        merged, created = add('default', self.yoko_list, self.products[2], 3, uuid4())
+        self.assertFalse(created)
+        self.assertEqual((merged.pk, merged.quantity, merged.purchased), (item.pk, 5, False))
+
+    def test_update_item_to_product_already_on_the_list(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        self.john_list.add_item(self.products[0], 2)
+        item = self.john_list.add_item(self.products[2], 1)
+        response = self._make_request_update_item(self.john_list.pk, item.pk, product=self.products[0].pk, quantity=1)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Item.objects.get(pk=item.pk).product, self.products[2])
+
     def test_create_item_in_list_with_invalid_jwt_token(self):
         self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token[:-1])
         response = self._make_request_create_item(self.john_list.pk, product=self.products[0].pk, quantity=2)
@@ -254,6 +362,10 @@ class ItemAPITest(BaseAPITest):
         self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token[:-1])
         response = self._make_request_create_item(self.yoko_list.pk, product=self.products[0].pk, quantity=2)
         self.assertEqual(response.status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self._make_request_create_item(self.paul_list.pk, product=self.products[0].pk, quantity=2)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Item.objects.filter(list=self.paul_list).exists())
 
     def test_delete_item_with_valid_jwt_token(self):
         self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
@@ -262,6 +374,7 @@ class ItemAPITest(BaseAPITest):
         self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
         self.assertEqual(Item.objects.filter(list__owner=self.john_lennon).count(), 0)
         self.assertEqual(self.john_list.items_qty, 0)
+        self.john_list.refresh_from_db()
         self.assertEqual(self.john_list.total_value, 0)
 
     def test_delete_item_with_invalid_jwt_token(self):
@@ -343,3 +456,351 @@ class ItemAPITest(BaseAPITest):
         self.assertIsNone(data['next'])
         results = data['results']
         self.assertEqual(len(results), len(filtered_names))
+
+    def _make_request_adjust_item(self, list_pk, pk, delta):
+        url_item_api = reverse('item-adjust', kwargs={'list_pk': list_pk, 'pk': pk})
+        return self.client.post(url_item_api, {'delta': delta}, format='json')
+
+    def test_adjust_item_quantity(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        item = self.john_list.add_item(self.products[0], 2)
+        response = self._make_request_adjust_item(self.john_list.pk, item.pk, 3)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['quantity'], 5)
+        self.assertEqual(response.data['list_total_value'], self.products[0].unit_price * 5)
+        response = self._make_request_adjust_item(self.john_list.pk, item.pk, -1)
+        self.assertEqual(response.data['quantity'], 4)
+        self.assertEqual(Item.objects.get(pk=item.pk).quantity, 4)
+        self.assertEqual(ProductSpending.objects.get(product=self.products[0]).quantity, 4)
+
+    def test_adjust_item_quantity_below_zero(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        item = self.john_list.add_item(self.products[0], 2)
+        response = self._make_request_adjust_item(self.john_list.pk, item.pk, -3)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(Item.objects.get(pk=item.pk).quantity, 2)
+
+    def test_adjust_item_quantity_with_other_user_token(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        item = self.john_list.add_item(self.products[0], 2)
+        response = self._make_request_adjust_item(self.john_list.pk, item.pk, 3)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(Item.objects.get(pk=item.pk).quantity, 2)
+
+    def _make_request_check_items(self, list_pk, action, **kwargs):
+        url_check_api = reverse('item-{}'.format(action), kwargs={'list_pk': list_pk})
+        return self.client.post(url_check_api, kwargs, format='json')
+
+    def test_check_and_uncheck_items(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        coat, glasses, shirt = [self.john_list.add_item(product, 2) for product in self.products[0:6:2]]
+        response = self._make_request_check_items(self.john_list.pk, 'check-items', ids=[coat.pk, glasses.pk])
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['updated'], 2)
+        self.assertEqual(response.data['checked_items'], 2)
+        self.assertEqual(response.data['remaining_items'], 1)
+        self.assertAlmostEqual(response.data['checked_value'], (50.20 + 40.00) * 2)
+        self.assertAlmostEqual(response.data['remaining_value'], 35.50 * 2)
+        self.assertIsNotNone(Item.objects.get(pk=coat.pk).purchased_at)
+        response = self._make_request_check_items(self.john_list.pk, 'uncheck-items', ids=[coat.pk, shirt.pk])
+        self.assertEqual(response.data['updated'], 1)
+        self.assertIsNone(Item.objects.get(pk=coat.pk).purchased_at)
+        response = self._make_request_check_items(self.john_list.pk, 'clear-checked')
+        self.assertEqual(response.data['deleted'], 1)
+        self.assertEqual(response.data['checked_items'], 0)
+        self.assertEqual(response.data['remaining_items'], 2)
+        self.assertEqual(set(Item.objects.values_list('pk', flat=True)), {coat.pk, shirt.pk})
+        # The bought items stay in the spending rollups.
+        self.assertEqual(ProductSpending.objects.get(product=glasses.product).quantity, 2)
+
+    def test_check_items_with_other_user_token(self):
+        item = self.john_list.add_item(self.products[0], 2)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        response = self._make_request_check_items(self.john_list.pk, 'check-items', ids=[item.pk])
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Item.objects.get(pk=item.pk).purchased)
+
+    def test_list_totals_follow_items_and_prices(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        item = self.john_list.add_item(self.products[0], 2)
+        response = self._make_request_update_item(self.john_list.pk, item.pk, product=self.products[0].pk,
+                                                  quantity=2, purchased=True)
+        self.assertIsNotNone(response.data['purchased_at'])
+        self.john_list.refresh_from_db()
+        self.assertEqual((self.john_list.checked_items, self.john_list.remaining_items), (1, 0))
+        self.john_list.add_item(self.products[0], 1)
+        # More units of a checked product uncheck it.
+        self.assertEqual((self.john_list.checked_items, self.john_list.remaining_items), (0, 1))
+        self.products[0].unit_price = 10
+        self.products[0].save()
+        self.john_list.refresh_from_db()
+        self.assertEqual(self.john_list.remaining_value, 30)
+
+    def test_reference_objects_by_client_uuid(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        list_uuid, item_uuid = str(uuid4()), str(uuid4())
+        response = self.client.post(reverse('list-list'), {'uuid': list_uuid, 'name': 'Offline'}, format='json')
+        self.assertEqual(response.data['uuid'], list_uuid)
+        response = self._make_request_create_item(list_uuid, uuid=item_uuid, product=str(self.products[0].uuid),
+                                                  quantity=1)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['uuid'], item_uuid)
+        self.assertEqual(Item.objects.get(uuid=item_uuid).list.uuid, UUID(list_uuid))
+        response = self.client.put(reverse('list-detail', kwargs={'pk': list_uuid}),
+                                   {'uuid': str(uuid4()), 'name': 'Synced'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['uuid'], list_uuid)
+        response = self.client.get(reverse('item-detail', kwargs={'list_pk': list_uuid, 'pk': item_uuid}))
+        self.assertEqual(response.data['quantity'], 1)
+
+    def _make_request_move_item(self, list_pk, pk, **kwargs):
+        url_item_api = reverse('item-move', kwargs={'list_pk': list_pk, 'pk': pk})
+        return self.client.post(url_item_api, kwargs, format='json')
+
+    def _get_item_ids(self, items_list):
+        return [item['id'] for item in self._make_request_get_items(items_list.pk).data['results']]
+
+    def test_move_item(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        coat, shirt, shoes = [self.john_list.add_item(product, 1) for product in self.products[0:6:2]]
+        self.assertEqual(self._get_item_ids(self.john_list), [coat.pk, shirt.pk, shoes.pk])
+        response = self._make_request_move_item(self.john_list.pk, shoes.pk, after=coat.pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(coat.position < response.data['position'] < shirt.position)
+        self.assertEqual(self._get_item_ids(self.john_list), [coat.pk, shoes.pk, shirt.pk])
+        self._make_request_move_item(self.john_list.pk, coat.pk, before=str(shirt.uuid))
+        self.assertEqual(self._get_item_ids(self.john_list), [shoes.pk, coat.pk, shirt.pk])
+        self._make_request_move_item(self.john_list.pk, shirt.pk)
+        self.assertEqual(self._get_item_ids(self.john_list), [shirt.pk, shoes.pk, coat.pk])
+        self._make_request_move_item(self.john_list.pk, shirt.pk, after=coat.pk)
+        self.assertEqual(self._get_item_ids(self.john_list), [shoes.pk, coat.pk, shirt.pk])
+        # Merged items keep their place, new ones go last.
+        self.john_list.add_item(self.products[2], 1)
+        glasses = self.john_list.add_item(self.products[6], 1)
+        self.assertEqual(self._get_item_ids(self.john_list), [shoes.pk, coat.pk, shirt.pk, glasses.pk])
+
+    def test_move_item_with_invalid_place(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        coat, shirt = [self.john_list.add_item(product, 1) for product in self.products[0:4:2]]
+        other = self.yoko_list.add_item(self.products[0], 1)
+        response = self._make_request_move_item(self.john_list.pk, coat.pk, after=shirt.pk, before=shirt.pk)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        for place in ({'after': coat.pk}, {'before': other.pk}, {'after': 'abc'}, {'before': '²'}):
+            response = self._make_request_move_item(self.john_list.pk, coat.pk, **place)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        response = self._make_request_move_item(self.john_list.pk, coat.pk, after=shirt.pk)
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_move_item_writes_only_the_moved_row(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        Item.objects.bulk_create(Item(list=self.john_list, quantity=i, position=(i + 1) * POSITION_GAP)
+                                 for i in range(200))
+        items = list(self.john_list.list_items.all())
+        with CaptureQueriesContext(connection) as queries:
+            response = self._make_request_move_item(self.john_list.pk, items[-1].pk, after=items[0].pk)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('UPDATE')]), 1)
+        self.assertEqual(list(self.john_list.list_items.values_list('pk', flat=True)[:3]),
+                         [items[0].pk, items[-1].pk, items[1].pk])
+
+    def test_move_item_rebalances_an_exhausted_gap(self):
+        first, second, moved = [Item.objects.create(list=self.john_list, quantity=1, position=position)
+                                for position in (1, 2, 3)]
+        Item.objects.move(moved, after=first)
+        self.assertEqual(list(self.john_list.list_items.values_list('pk', 'position')),
+                         [(first.pk, POSITION_GAP), (moved.pk, POSITION_GAP * 3 // 2), (second.pk, POSITION_GAP * 2)])
+
+
+class ExportAPITest(BaseAPITest):
+    def setUp(self):
+        super(ExportAPITest, self).setUp()
+        self._create_paul_mccartney()
+        self.john_list = List.objects.create(owner=self.john_lennon, name='John`s List')
+        self.paul_list = List.objects.create(owner=self.paul_mccartney, name='Paul`s List')
+        coat = Product.objects.create(name='Coat', unit_price=50.20, owner=self.john_lennon)
+        self.john_list.add_item(coat, 2)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _get_content(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_export_lists_as_csv(self):
+        response = self.client.get(reverse('list-export'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        rows = list(csv.reader(io.StringIO(self._get_content(response).decode('utf-8'))))
+        self.assertEqual(rows[0], ['id', 'name', 'valid_at', 'created_at', 'updated_at'])
+        self.assertEqual([row[1] for row in rows[1:]], ['John`s List'])
+
+    def test_export_items_as_gzipped_ndjson(self):
+        response = self.client.get(reverse('list-export-items'), {'output': 'ndjson', 'gzip': 'true'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertIn('items.ndjson.gz', response['Content-Disposition'])
+        lines = gzip.decompress(self._get_content(response)).decode('utf-8').splitlines()
+        self.assertEqual(len(lines), 1)
+        item = json.loads(lines[0])
+        self.assertEqual(item['list_name'], 'John`s List')
+        self.assertEqual(item['product_name'], 'Coat')
+        self.assertEqual(item['quantity'], 2)
+
+    def test_export_with_invalid_output(self):
+        response = self.client.get(reverse('list-export'), {'output': 'xml'})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ArchiveTest(BaseAPITest):
+    def setUp(self):
+        super(ArchiveTest, self).setUp()
+        self.coat = Product.objects.create(name='Coat', unit_price=50.00, owner=self.john_lennon)
+        self.old_list = List.objects.create(owner=self.john_lennon, name='Old List',
+                                            valid_at=datetime.now() - timedelta(days=100))
+        self.old_list.add_item(self.coat, 2)
+        self.recent_list = List.objects.create(owner=self.john_lennon, name='Recent List',
+                                               valid_at=datetime.now() - timedelta(days=1))
+        self.recent_list.add_item(self.coat, 1)
+
+    def test_archive_expired_lists(self):
+        self.assertEqual(archive_expired_lists(days=30, batch_size=1), 1)
+        self.assertFalse(List.objects.filter(pk=self.old_list.pk).exists())
+        self.assertEqual(Item.objects.count(), 1)
+        archived = ArchivedList.objects.get()
+        self.assertEqual(archived.original_id, self.old_list.pk)
+        self.assertEqual(archived.total_value, 100.00)
+        self.assertEqual(archived.items_data, [{'product': self.coat.pk, 'name': 'Coat', 'unit_price': 50.00,
+                                                'quantity': 2}])
+        self.assertEqual(self.john_lennon.summary.lists_qty, 1)
+        # The spending rollups keep the archived items.
+        self.assertEqual(ProductSpending.objects.get(product=self.coat).quantity, 3)
+
+    def test_archive_lists_command(self):
+        call_command('archive_lists', days=0, batch_size=1, stdout=io.StringIO())
+        self.assertEqual(ArchivedList.objects.count(), 2)
+        self.assertEqual(List.objects.count(), 0)
+
+    def test_get_archived_lists(self):
+        archive_expired_lists(days=30)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        response = self.client.get(reverse('archived-list-list'), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['items'][0]['name'], 'Coat')
+
+    def test_get_archived_lists_with_other_user_token(self):
+        archive_expired_lists(days=30)
+        self._create_paul_mccartney()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        response = self.client.get(reverse('archived-list-list'), format='json')
+        self.assertEqual(response.data['count'], 0)
+
+
+@override_settings(SSE_HEARTBEAT_SECONDS=0.05, SSE_MAX_DURATION=0.1)
+class EventsAPITest(BaseAPITest):
+    def setUp(self):
+        super(EventsAPITest, self).setUp()
+        broker.clear()
+        self.my_list = List.objects.create(owner=self.john_lennon, name='My List', valid_at=datetime.now())
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _stream(self, url, **extra):
+        response = self.client.get(url, HTTP_ACCEPT='text/event-stream', **extra)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        return b''.join(response.streaming_content).decode('utf-8')
+
+    def test_stream_events_since_last_event_id(self):
+        broker.publish(self.john_lennon.pk, 'list.updated', {'id': self.my_list.pk, 'name': 'Old'})
+        last_event_id = broker._buffers[self.john_lennon.pk][-1]['id']
+        broker.publish(self.john_lennon.pk, 'list.updated', {'id': self.my_list.pk, 'name': 'New'})
+        body = self._stream(reverse('list-events'), HTTP_LAST_EVENT_ID=str(last_event_id))
+        self.assertIn('event: list.updated', body)
+        self.assertIn('"New"', body)
+        self.assertNotIn('"Old"', body)
+        self.assertIn(': heartbeat', body)
+
+    def test_stream_events_of_one_list(self):
+        other_list = List.objects.create(owner=self.john_lennon, name='Other List', valid_at=datetime.now())
+        broker.publish(self.john_lennon.pk, 'item.created', {'id': 1, 'list': other_list.pk})
+        broker.publish(self.john_lennon.pk, 'item.created', {'id': 2, 'list': self.my_list.pk})
+        body = self._stream(reverse('list-list-events', args=[self.my_list.pk]), HTTP_LAST_EVENT_ID='0')
+        self.assertIn('"id": 2', body)
+        self.assertNotIn('"id": 1', body)
+
+    def test_stream_events_of_one_list_after_bulk_changes(self):
+        item = self.my_list.add_item(Product.objects.create(owner=self.john_lennon, name='Coat', unit_price=1), 1)
+        broker.publish(self.john_lennon.pk, 'items.checked', {'list': self.my_list.pk, 'items': [item.pk]})
+        broker.publish(self.john_lennon.pk, 'items.cleared', {'list': self.my_list.pk + 1, 'count': 1})
+        broker.publish(self.john_lennon.pk, 'list.updated', {'id': self.my_list.pk, 'name': 'Mine'})
+        body = self._stream(reverse('list-list-events', args=[self.my_list.pk]), HTTP_LAST_EVENT_ID='0')
+        self.assertIn('event: items.checked', body)
+        self.assertNotIn('event: items.cleared', body)
+        self.assertIn('event: list.updated', body)
+
+    def test_stream_events_of_other_user(self):
+        broker.publish(self.john_lennon.pk, 'list.updated', {'id': self.my_list.pk, 'name': 'Mine'})
+        self._create_paul_mccartney()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        body = self._stream(reverse('list-events'), HTTP_LAST_EVENT_ID='0')
+        self.assertNotIn('Mine', body)
+        response = self.client.get(reverse('list-list-events', args=[self.my_list.pk]))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_stream_events_connection_limit(self):
+        acquired = 0
+        while connection_slots.acquire(blocking=False):
+            acquired += 1
+        try:
+            response = self.client.get(reverse('list-events'), HTTP_ACCEPT='application/json')
+            self.assertEqual(response.status_code, status.HTTP_503_SERVICE_UNAVAILABLE)
+            self.assertIn('Retry-After', response)
+        finally:
+            for _ in range(acquired):
+                connection_slots.release()
+
+    def test_stream_events_slot_released_when_subscribe_fails(self):
+        def subscribe(owner_id, last_event_id=None):
+            raise RuntimeError('broker down')
+
+        acquired = 0
+        while connection_slots.acquire(blocking=False):
+            acquired += 1
+        connection_slots.release()
+        broker.subscribe = subscribe
+        try:
+            with self.assertRaises(RuntimeError):
+                self.client.get(reverse('list-events'), HTTP_ACCEPT='text/event-stream')
+            self.assertTrue(connection_slots.acquire(blocking=False))
+        finally:
+            del broker.subscribe
+            for _ in range(acquired):
+                connection_slots.release()
+
+    def test_event_buffers_are_bounded(self):
+        buffers = MemoryBroker(buffer_size=2, max_owners=2, buffer_ttl=60)
+        for owner_id in (1, 2, 1, 3):
+            buffers.publish(owner_id, 'list.updated', {'id': owner_id})
+        self.assertEqual(list(buffers._buffers), [1, 3])
+        buffers._buffered_at[1] -= 61
+        buffers.publish(3, 'list.updated', {'id': 3})
+        self.assertEqual(list(buffers._buffers), [3])
+        self.assertEqual(len(buffers._buffers[3]), 2)
+
+
+class EventsPublishTest(TransactionTestCase):
+    def setUp(self):
+        broker.clear()
+        self.user = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
+        self.coat = Product.objects.create(name='Coat', unit_price=50.00, owner=self.user)
+
+    def test_publish_list_and_item_changes(self):
+        my_list = List.objects.create(owner=self.user, name='My List', valid_at=datetime.now())
+        list_id = my_list.pk
+        item = my_list.add_item(self.coat, 1)
+        item_id = item.pk
+        Item.objects.adjust(item_id, 2)
+        item.delete()
+        my_list.delete()
+        events = [(event['type'], event['data']['id']) for event in broker._buffers[self.user.pk]]
+        self.assertEqual(events, [('list.created', list_id), ('item.created', item_id), ('item.updated', item_id),
+                                  ('item.deleted', item_id), ('list.deleted', list_id)])
@@ -0,0 +1,47 @@
+"""
+Keeps the totals stored on the lists up to date with their items and the prices of their products.
+"""
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from products.models import Product
+from products.signals import products_bulk_updated
+from .models import List, Item
+from .signals import item_adjusted, items_checked, items_cleared
+
+
+def _refresh(list_id, using):
+    List.objects.using(using).filter(pk=list_id).refresh_totals()
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, **kwargs):
+    _refresh(instance.list_id, instance._state.db)
+
+
+@receiver(item_adjusted, sender=Item)
+def item_quantity_adjusted(sender, instance, **kwargs):
+    _refresh(instance.list_id, instance._state.db)
+
+
+@receiver(items_checked, sender=Item)
+@receiver(items_cleared, sender=Item)
+def items_purchased(sender, items_list, **kwargs):
+    _refresh(items_list.pk, items_list._state.db)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    _refresh(instance.list_id, instance._state.db)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    if not created:
+        List.objects.using(instance._state.db).filter(list_items__product=instance).refresh_totals()
+
+
+@receiver(products_bulk_updated, sender=Product)
+def products_updated(sender, owner_ids, fields, using, **kwargs):
+    if 'unit_price' in fields:
+        List.objects.using(using).filter(owner__in=owner_ids).refresh_totals()
@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
 from rest_framework_nested import routers
 
-from .views import ListsViewSet, ItemViewSet
+from .views import ListsViewSet, ItemViewSet, ArchivedListViewSet
 
 router = DefaultRouter()
+router.register(r'archived', ArchivedListViewSet, base_name='archived-list')
 router.register(r'', ListsViewSet, base_name='list')
 
 
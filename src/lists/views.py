@@ -1,30 +1,184 @@
+from django.db import IntegrityError, router, transaction
 from django.http import Http404
-from rest_framework import filters, viewsets
+from django_filters.rest_framework import DjangoFilterBackend
+from rest_framework import filters, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
 
+from base.events import EventStreamRenderer, stream_response
+from base.exports import stream_export
 from base.filters import IsOwnerFilterBackend
-from base.viewsets import OwnerModelViewSet
-from .serializers import ListSerializer, ItemSerializer
-from .models import List, Item
+from base.serializers import lookup
+from base.viewsets import IdempotencyMixin, OwnerModelViewSet, SparseFieldsMixin, UUIDLookupMixin
+from lists.filters import ListFilter
+from products.models import product_name
+from .serializers import (ListSerializer, ItemSerializer, ArchivedListSerializer, ItemAdjustSerializer,
+                          ItemCheckSerializer, ItemMoveSerializer)
+from .models import LIST_TOTAL_FIELDS, List, Item, ArchivedList
 
 
 class ListsViewSet(OwnerModelViewSet):
     queryset = List.objects.all()
     serializer_class = ListSerializer
+    filter_backends = (DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter, IsOwnerFilterBackend)
+    filter_class = ListFilter
+    search_fields = ('name', )
+    max_preview = 10
+
+    def get_queryset(self):
+        return super(ListsViewSet, self).get_queryset().with_is_active()
+
+    def perform_update(self, serializer):
+        items_list = serializer.save()
+        # `active_now` was read before `valid_at` changed.
+        items_list.__dict__.pop('active_now', None)
+
+    def list(self, request, *args, **kwargs):
+        """
+        `?preview=N` adds the first N items of every list of the page, read with a single query.
+        """
+        response = super(ListsViewSet, self).list(request, *args, **kwargs)
+        preview = request.query_params.get('preview')
+        if preview:
+            try:
+                size = min(int(preview), self.max_preview)
+            except ValueError:
+                raise ValidationError({'preview': ['A valid integer is required.']})
+            rows = response.data['results'] if isinstance(response.data, dict) else response.data
+            previews = Item.objects.previews([row['id'] for row in rows], size)
+            for row in rows:
+                row['preview'] = previews[row['id']]
+        return response
+
+    @action(detail=False, throttle_scope='aggregate')
+    def export(self, request):
+        columns = (('id', 'id'), ('name', 'name'), ('valid_at', 'valid_at'), ('created_at', 'created_at'),
+                   ('updated_at', 'updated_at'))
+        return stream_export(request, self.filter_queryset(self.get_queryset()), columns, 'lists')
+
+    @action(detail=False, url_path='items/export', throttle_scope='aggregate')
+    def export_items(self, request):
+        columns = (('id', 'id'), ('list', 'list_id'), ('list_name', 'list__name'), ('product', 'product_id'),
+                   ('product_name', 'product_name'), ('unit_price', 'product__unit_price'),
+                   ('quantity', 'quantity'), ('created_at', 'created_at'), ('updated_at', 'updated_at'))
+        queryset = Item.objects.filter(list__owner=request.user).order_by('list', 'created_at').annotate(
+            product_name=product_name('product__'))
+        return stream_export(request, queryset, columns, 'items')
+
+    @action(detail=False, renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def events(self, request):
+        return stream_response(request)
+
+    @action(detail=True, url_path='events', renderer_classes=[EventStreamRenderer, JSONRenderer])
+    def list_events(self, request, pk=None):
+        list_id = self.get_object().pk
+
+        def accept(event):
+            # Events of the list itself carry its `id`, the ones of its items a `list`.
+            data = event['data']
+            return (data['list'] if 'list' in data else data.get('id')) == list_id
+        return stream_response(request, accept)
+
+
+class ArchivedListViewSet(SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = ArchivedList.objects.all()
+    serializer_class = ArchivedListSerializer
     filter_backends = (filters.SearchFilter, filters.OrderingFilter, IsOwnerFilterBackend)
     search_fields = ('name', )
 
 
-class ItemViewSet(viewsets.ModelViewSet):
+class ItemViewSet(IdempotencyMixin, UUIDLookupMixin, SparseFieldsMixin, viewsets.ModelViewSet):
     serializer_class = ItemSerializer
     filter_backends = (filters.SearchFilter, )
-    search_fields = ('product__name', )
+    search_fields = ('product__name', 'product__catalog_product__name')
 
     def get_queryset(self):
-        return Item.objects.filter(list=self.kwargs['list_pk'], list__owner=self.request.user)
+        items = Item.objects.filter(list__owner=self.request.user, **lookup(self.kwargs['list_pk'], 'list'))
+        # `total_price` reads the product of every item.
+        return items.select_related('product')
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items_list = self._get_list(request)
+        # Adding a product already on the list adds to its quantity.
+        item, created = Item.objects.add(items_list, serializer.validated_data.get('product'),
+                                         serializer.validated_data.get('quantity', 0),
+                                         serializer.validated_data.get('uuid'))
+        return Response(self.get_serializer(item).data,
+                        status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
 
-    def perform_create(self, serializer):
+    def perform_update(self, serializer):
         try:
-            items_list = List.objects.get(pk=self.kwargs['list_pk'])
-            serializer.save(list=items_list)
-        except List.DoesNotExist:
+            with transaction.atomic(using=router.db_for_write(Item, instance=serializer.instance)):
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({'product': ['This product is already on the list.']})
+
+    @action(detail=True, methods=['post'])
+    def adjust(self, request, list_pk=None, pk=None):
+        serializer = ItemAdjustSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        delta = serializer.validated_data['delta']
+        item = self.get_queryset().adjust(self.get_object().pk, delta)
+        if item is None:
+            raise ValidationError({'delta': ['The quantity can not be negative.']})
+        item.list.refresh_from_db(fields=LIST_TOTAL_FIELDS)
+        return Response({'id': item.pk, 'quantity': item.quantity, 'list_total_value': item.list.total_value},
+                        status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'])
+    def move(self, request, list_pk=None, pk=None):
+        """
+        Moves the item after or before another item of the list, see `ItemQuerySet.move`.
+        """
+        item = self.get_object()
+        serializer = ItemMoveSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        neighbours = {}
+        for field in ('after', 'before'):
+            value = serializer.validated_data.get(field)
+            if value is not None:
+                neighbours[field] = self.get_queryset().exclude(pk=item.pk).filter(**lookup(value)).first()
+                if neighbours[field] is None:
+                    raise ValidationError({field: ['Invalid item "{}", it must be another item of the list.'.format(
+                        value)]})
+        item = Item.objects.move(item, **neighbours)
+        return Response(self.get_serializer(item).data, status=status.HTTP_200_OK)
+
+    def _get_list(self, request):
+        items_list = List.objects.filter(owner=request.user, **lookup(self.kwargs['list_pk'])).first()
+        if items_list is None:
             raise Http404
+        return items_list
+
+    def _totals_response(self, items_list, **data):
+        items_list.refresh_from_db(fields=LIST_TOTAL_FIELDS)
+        data.update((field, getattr(items_list, field)) for field in LIST_TOTAL_FIELDS)
+        return Response(data, status=status.HTTP_200_OK)
+
+    def _set_purchased(self, request, purchased, ids=None):
+        items_list = self._get_list(request)
+        return self._totals_response(items_list, updated=Item.objects.set_purchased(items_list, purchased, ids))
+
+    @action(detail=False, methods=['post'], url_path='check')
+    def check_items(self, request, list_pk=None):
+        serializer = ItemCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._set_purchased(request, True, serializer.validated_data['ids'])
+
+    @action(detail=False, methods=['post'], url_path='uncheck')
+    def uncheck_items(self, request, list_pk=None):
+        serializer = ItemCheckSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return self._set_purchased(request, False, serializer.validated_data['ids'])
+
+    @action(detail=False, methods=['post'], url_path='clear-checked')
+    def clear_checked(self, request, list_pk=None):
+        """
+        Removes the checked items of the list, the ones already bought.
+        """
+        items_list = self._get_list(request)
+        return self._totals_response(items_list, deleted=Item.objects.clear_checked(items_list))
@@ -1,25 +1,69 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
+from django.urls import reverse
+from django.utils.html import format_html
+from django.utils.translation import gettext_lazy as _
 
 from base.admin import BaseModelAdmin
 
-from .models import Category, Product
+from .models import Category, Product, CatalogProduct
 
 
-class ProductInLine(admin.TabularInline):
-    model = Product
-    extra = 0
+class ProductActionForm(ActionForm):
+    percentage = forms.FloatField(label=_('Percentage'), required=False)
+    category = forms.IntegerField(label=_('Category id'), required=False)
 
 
 @admin.register(Category)
 class CategoryAdmin(BaseModelAdmin):
     list_display = ['title', 'owner', 'created_at']
+    list_select_related = ('owner', )
+    search_fields = ['title']
+    autocomplete_fields = ['owner']
+    readonly_fields = ('products', )
 
-    inlines = [
-        ProductInLine,
-    ]
+    def products(self, obj):
+        # The products are browsed in their own paginated changelist instead of an unbounded inline.
+        if obj.pk is None:
+            return '-'
+        url = '{}?category__id__exact={}'.format(reverse('admin:products_product_changelist'), obj.pk)
+        return format_html('<a href="{}">{}</a>', url, _('See the products of this category'))
+    products.short_description = _('Products')
+
+
+@admin.register(CatalogProduct)
+class CatalogProductAdmin(BaseModelAdmin):
+    list_display = ['name', 'brand', 'gtin', 'unit_price']
+    search_fields = ['name', '=gtin']
 
 
 @admin.register(Product)
 class ProductAdmin(BaseModelAdmin):
-    list_display = ['name', 'category', 'unit_price', 'created_at']
+    list_display = ['__str__', 'category', 'catalog_product', 'unit_price', 'created_at']
+    list_select_related = ('category', 'catalog_product')
+    search_fields = ['name', 'catalog_product__name', '=catalog_product__gtin']
+    autocomplete_fields = ['owner', 'category', 'catalog_product']
+    action_form = ProductActionForm
+    actions = ['reprice', 'move_to_category']
+
+    def reprice(self, request, queryset):
+        try:
+            percentage = float(request.POST['percentage'])
+        except (KeyError, ValueError):
+            self.message_user(request, _('Inform the percentage to re-price the products.'), messages.ERROR)
+            return
+        updated = queryset.reprice(percentage)
+        self.message_user(request, _('%(count)d products re-priced.') % {'count': updated})
+    reprice.short_description = _('Re-price selected products by the percentage')
 
+    def move_to_category(self, request, queryset):
+        category = Category.objects.filter(pk=request.POST.get('category') or None).first()
+        if category is None:
+            self.message_user(request, _('Inform the id of the category to move the products to.'), messages.ERROR)
+            return
+        # Categories belong to a single owner, other owners' products are left untouched.
+        updated = queryset.filter(owner=category.owner_id).move_to(category)
+        self.message_user(request, _('%(count)d products moved to %(category)s.') % {'count': updated,
+                                                                                     'category': category})
+    move_to_category.short_description = _('Move selected products to the category')
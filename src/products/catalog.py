@@ -0,0 +1,67 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from base import sharding
+from .models import CatalogProduct
+
+GTIN_LENGTHS = (8, 12, 13, 14)
+
+
+def normalize_gtin(value):
+    """
+    Returns the 14 digits form of an EAN-8, UPC-A, EAN-13 or GTIN-14 code, or None when `value` is not
+    a valid code (wrong length or check digit).
+    """
+    digits = ''.join(char for char in str(value) if not char.isspace() and char != '-')
+    if not digits.isdigit() or len(digits) not in GTIN_LENGTHS:
+        return None
+    digits = digits.zfill(14)
+    # Check digit: weights 3 and 1 alternate from the rightmost digit of the payload.
+    total = sum(int(digit) * (3 if i % 2 == 0 else 1) for i, digit in enumerate(reversed(digits[:-1])))
+    if (10 - total % 10) % 10 != int(digits[-1]):
+        return None
+    return digits
+
+
+def lookup(gtin):
+    """
+    Returns the catalog product of a scanned code with a single query on the unique GTIN index.
+    """
+    gtin = normalize_gtin(gtin)
+    if gtin is None:
+        return None
+    return CatalogProduct.objects.filter(gtin=gtin).first()
+
+
+def import_rows(rows, batch_size=500):
+    """
+    Creates or updates the catalog from `(gtin, name, brand, unit_price)` rows, on every shard with the
+    same ids. Returns the number of imported rows, invalid codes are skipped.
+    """
+    imported = 0
+    batch = {}
+    for gtin, name, brand, unit_price in rows:
+        gtin = normalize_gtin(gtin)
+        if gtin is None:
+            continue
+        batch[gtin] = {'name': name, 'brand': brand, 'unit_price': float(unit_price or 0)}
+        if len(batch) >= batch_size:
+            imported += _import_batch(batch)
+            batch = {}
+    if batch:
+        imported += _import_batch(batch)
+    return imported
+
+
+def _import_batch(batch):
+    catalog = CatalogProduct.objects.using(DEFAULT_DB_ALIAS)
+    existing = dict(catalog.filter(gtin__in=batch).values_list('gtin', 'pk'))
+    now = timezone.now()
+    for gtin, pk in existing.items():
+        catalog.filter(pk=pk).update(updated_at=now, **batch[gtin])
+    catalog.bulk_create(CatalogProduct(gtin=gtin, **values) for gtin, values in batch.items() if gtin not in existing)
+    rows = list(catalog.filter(gtin__in=batch))
+    for alias in sharding.get_shards():
+        if alias != DEFAULT_DB_ALIAS:
+            sharding.replicate(rows, alias)
+    return len(batch)
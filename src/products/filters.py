@@ -1,11 +1,16 @@
 import django_filters
 
+from products.catalog import normalize_gtin
 from products.models import Product
 
 
 class ProductFilter(django_filters.FilterSet):
     category = django_filters.CharFilter(name='category__title')
+    gtin = django_filters.CharFilter(method='filter_gtin')
 
     class Meta:
         model = Product
-        fields = ['category', ]
+        fields = ['category', 'gtin']
+
+    def filter_gtin(self, queryset, name, value):
+        return queryset.filter(catalog_product__gtin=normalize_gtin(value) or '')
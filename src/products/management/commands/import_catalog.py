@@ -0,0 +1,20 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from products import catalog
+
+
+class Command(BaseCommand):
+    help = 'Creates or updates the product catalog from a CSV file with gtin, name, brand and unit_price columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file, with a header row.')
+        parser.add_argument('--batch-size', type=int, default=500, help='Number of products imported per query.')
+
+    def handle(self, *args, **options):
+        with open(options['path'], newline='', encoding='utf-8') as csv_file:
+            rows = ((row['gtin'], row['name'], row.get('brand') or '', row.get('unit_price'))
+                    for row in csv.DictReader(csv_file))
+            imported = catalog.import_rows(rows, options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('{} catalog products imported.'.format(imported)))
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_name_prefix_index(apps, schema_editor):
+    # `text_pattern_ops` lets PostgreSQL answer `name__istartswith` (UPPER(name) LIKE 'Q%') from the index.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX products_product_owner_name_prefix '
+            'ON products_product (owner_id, (UPPER(name::text)) text_pattern_ops)'
+        )
+
+
+def drop_name_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_product_owner_name_prefix')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_auto_20180604_2135'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_name_prefix_index, drop_name_prefix_index),
+    ]
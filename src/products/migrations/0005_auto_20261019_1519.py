@@ -0,0 +1,39 @@
+# Generated by Django 2.0.5 on 2026-10-19 15:19
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_product_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CatalogProduct',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('gtin', models.CharField(max_length=14, unique=True, verbose_name='GTIN')),
+                ('name', models.CharField(db_index=True, max_length=100, verbose_name='Name')),
+                ('brand', models.CharField(blank=True, max_length=50, verbose_name='Brand')),
+                ('unit_price', models.FloatField(default=0, verbose_name='Unit Price')),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AlterField(
+            model_name='product',
+            name='name',
+            field=models.CharField(blank=True, db_index=True, max_length=30, null=True, verbose_name='Title'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='catalog_product',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='products', to='products.CatalogProduct', verbose_name='Catalog product'),
+        ),
+    ]
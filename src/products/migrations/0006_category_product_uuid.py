@@ -0,0 +1,23 @@
+# Generated by Django 2.0.5 on 2026-10-19 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_auto_20261019_1519'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='uuid',
+            field=models.UUIDField(null=True, verbose_name='UUID'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='uuid',
+            field=models.UUIDField(null=True, verbose_name='UUID'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+from django.db import migrations
+
+
+def create_catalog_name_prefix_index(apps, schema_editor):
+    # Serves the catalog name lookup of `DatabasePrefixIndex.search`, like `products_product_owner_name_prefix`.
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX products_catalogproduct_name_prefix '
+            'ON products_catalogproduct ((UPPER(name::text)) text_pattern_ops)'
+        )
+
+
+def drop_catalog_name_prefix_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_catalogproduct_name_prefix')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_unique_uuid'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_catalog_name_prefix_index, drop_catalog_name_prefix_index),
+    ]
@@ -0,0 +1,18 @@
+from django.db import migrations
+
+
+def blank_names_to_null(apps, schema_editor):
+    # A blank name is no override: the catalog name is read, see `Product.save`.
+    Product = apps.get_model('products', 'product')
+    Product.objects.using(schema_editor.connection.alias).filter(name='').update(name=None)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_catalog_name_prefix_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(blank_names_to_null, migrations.RunPython.noop),
+    ]
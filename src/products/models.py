@@ -1,4 +1,8 @@
-from django.db import models
+from uuid import uuid4
+
+from django.db import models, router, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 
 from base.models import BaseModel
@@ -7,6 +11,8 @@ from base.models import BaseModel
 class Category(BaseModel):
     owner = models.ForeignKey('users.User', related_name='owner_categories', verbose_name=_('Owner'),
                               on_delete=models.CASCADE)
+    # Can be chosen by the client, so objects created offline can be referenced before being synced.
+    uuid = models.UUIDField(_('UUID'), default=uuid4, unique=True)
     title = models.CharField(_('Title'), max_length=30, db_index=True)
     description = models.TextField(_('Description'), blank=True)
 
@@ -17,16 +23,83 @@ class Category(BaseModel):
         return self.title
 
 
+class CatalogProduct(BaseModel):
+    """
+    Product shared by every user, identified by its GTIN (EAN-8, UPC-A, EAN-13 or GTIN-14) stored
+    as 14 digits, see `products.catalog.normalize_gtin`.
+    """
+    gtin = models.CharField(_('GTIN'), max_length=14, unique=True)
+    name = models.CharField(_('Name'), max_length=100, db_index=True)
+    brand = models.CharField(_('Brand'), max_length=50, blank=True)
+    unit_price = models.FloatField(_('Unit Price'), default=0)
+
+    class Meta:
+        ordering = ['name', ]
+
+    def __str__(self):
+        return '{} ({})'.format(self.name, self.gtin)
+
+
+def product_name(path=''):
+    """
+    Expression of the name of the product at `path`: its own name when overridden, else the catalog name.
+    """
+    return Coalesce(path + 'name', path + 'catalog_product__name', Value(''))
+
+
+class ProductQuerySet(models.QuerySet):
+
+    def _update_and_notify(self, fields, **changes):
+        from .signals import products_bulk_updated
+        using = self._db or router.db_for_write(self.model, **self._hints)
+        products = self.using(using).order_by()
+        with transaction.atomic(using=using):
+            owner_ids = list(products.values_list('owner_id', flat=True).distinct())
+            updated = products.update(**changes)
+            products_bulk_updated.send(sender=self.model, owner_ids=owner_ids, fields=fields, using=using)
+        return updated
+
+    def reprice(self, percentage):
+        """
+        Changes the unit price of every product by `percentage` percent with a single UPDATE.
+        """
+        return self._update_and_notify(['unit_price'], unit_price=F('unit_price') * (1 + percentage / 100.0))
+
+    def move_to(self, category):
+        return self._update_and_notify(['category'], category=category)
+
+
 class Product(BaseModel):
     owner = models.ForeignKey('users.User', related_name='owner_products', verbose_name=_('Owner'),
                               on_delete=models.CASCADE)
+    uuid = models.UUIDField(_('UUID'), default=uuid4, unique=True)
     category = models.ForeignKey('products.Category', related_name='category_products', verbose_name=_('Category'),
                                  on_delete=models.SET_NULL, null=True, blank=True)
-    name = models.CharField(_('Title'), max_length=30, db_index=True)
+    catalog_product = models.ForeignKey('products.CatalogProduct', related_name='products',
+                                        verbose_name=_('Catalog product'), on_delete=models.SET_NULL,
+                                        null=True, blank=True)
+    # Overrides the catalog name, required for products out of the catalog.
+    name = models.CharField(_('Title'), max_length=30, db_index=True, null=True, blank=True)
     unit_price = models.FloatField(_('Unit Price'), default=0)
 
+    objects = ProductQuerySet.as_manager()
+
+    def _get_display_name(self):
+        if self.name:
+            return self.name
+        if self.catalog_product_id:
+            return self.catalog_product.name
+        return ''
+    display_name = property(_get_display_name)
+
     class Meta:
         ordering = ['name', ]
 
     def __str__(self):
-        return self.name
+        return self.display_name
+
+    def save(self, *args, **kwargs):
+        # A blank name is no override, stored as NULL so the queries reading the catalog name agree.
+        if not self.name:
+            self.name = None
+        super(Product, self).save(*args, **kwargs)
@@ -1,16 +1,45 @@
 from rest_framework import serializers
 
-from .models import Category, Product
+from base.serializers import ClientUUIDModelSerializer
+from .models import Category, Product, CatalogProduct
 
 
-class CategorySerializer(serializers.ModelSerializer):
+class CategorySerializer(ClientUUIDModelSerializer):
     class Meta:
         model = Category
-        fields = ('id', 'title', 'description', 'created_at', 'updated_at')
+        fields = ('id', 'uuid', 'title', 'description', 'created_at', 'updated_at')
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class CatalogProductSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CatalogProduct
+        fields = ('id', 'gtin', 'name', 'brand', 'unit_price')
+
+
+class ProductSerializer(ClientUUIDModelSerializer):
+    """
+    Products of the catalog only store what the user overrides: `name` reads the catalog name unless
+    overridden, `unit_price` defaults to the catalog price.
+    """
+    gtin = serializers.CharField(source='catalog_product.gtin', read_only=True, allow_null=True)
+    unit_price = serializers.FloatField(required=False)
 
     class Meta:
         model = Product
-        fields = ('id', 'category', 'name', 'unit_price', 'created_at', 'updated_at')
+        fields = ('id', 'uuid', 'category', 'catalog_product', 'gtin', 'name', 'unit_price', 'created_at', 'updated_at')
+
+    def validate(self, attrs):
+        catalog_product = attrs.get('catalog_product', getattr(self.instance, 'catalog_product', None))
+        if not attrs.get('name', getattr(self.instance, 'name', None)) and catalog_product is None:
+            raise serializers.ValidationError({'name': ['This field is required for products out of the catalog.']})
+        if 'name' in attrs and not attrs['name']:
+            attrs['name'] = None
+        if self.instance is None and 'unit_price' not in attrs and catalog_product is not None:
+            attrs['unit_price'] = catalog_product.unit_price
+        return attrs
+
+    def to_representation(self, instance):
+        data = super(ProductSerializer, self).to_representation(instance)
+        if 'name' in data:
+            data['name'] = instance.display_name
+        return data
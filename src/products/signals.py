@@ -0,0 +1,37 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver, Signal
+
+from base import sharding
+from .models import CatalogProduct, Product
+from .suggestions import cache
+
+# Sent after `ProductQuerySet` bulk updates, which skip `post_save`, with the owners of the products updated
+# on the `using` database.
+products_bulk_updated = Signal(providing_args=['owner_ids', 'fields', 'using'])
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def product_changed(sender, instance, **kwargs):
+    cache.invalidate(instance.owner_id)
+
+
+@receiver(products_bulk_updated, sender=Product)
+def products_updated(sender, owner_ids, **kwargs):
+    for owner_id in owner_ids:
+        cache.invalidate(owner_id)
+
+
+@receiver(post_save, sender=CatalogProduct)
+def catalog_product_saved(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        for alias in sharding.get_shards()[1:]:
+            sharding.replicate([instance], alias)
+
+
+@receiver(post_delete, sender=CatalogProduct)
+def catalog_product_deleted(sender, instance, using, **kwargs):
+    if using == DEFAULT_DB_ALIAS:
+        for alias in sharding.get_shards()[1:]:
+            CatalogProduct.objects.using(alias).filter(pk=instance.pk).delete()
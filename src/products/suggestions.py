@@ -0,0 +1,117 @@
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+from django.db.models.functions import Upper
+
+from .models import Product, product_name
+
+
+SUGGESTION_FIELDS = ('id', 'display_name', 'unit_price', 'category')
+
+
+def _values(queryset):
+    rows = []
+    for row in queryset.annotate(display_name=product_name()).values(*SUGGESTION_FIELDS):
+        row['name'] = row.pop('display_name')
+        rows.append(row)
+    return rows
+
+
+class PrefixIndex(object):
+    """
+    Sorted array of the owner's products, searched by prefix with a binary search.
+    """
+
+    def __init__(self, owner_id, rows):
+        rows = sorted(rows, key=lambda row: row['name'].upper())
+        self.owner_id = owner_id
+        self.keys = [row['name'].upper() for row in rows]
+        self.rows = rows
+        self.built_at = time.monotonic()
+
+    def search(self, prefix, limit):
+        prefix = prefix.upper()
+        start = bisect_left(self.keys, prefix)
+        results = []
+        for key, row in zip(self.keys[start:start + limit], self.rows[start:start + limit]):
+            if not key.startswith(prefix):
+                break
+            results.append(row)
+        return results
+
+
+class DatabasePrefixIndex(PrefixIndex):
+    """
+    Used for catalogs too big to be kept in memory. The products with their own name are searched with the
+    `(owner, UPPER(name))` prefix index, the others by the prefix of their catalog name, and both merged.
+    """
+
+    def __init__(self, owner_id):
+        self.owner_id = owner_id
+        self.built_at = time.monotonic()
+
+    def search(self, prefix, limit):
+        products = Product.objects.filter(owner_id=self.owner_id)
+        named = products.filter(name__istartswith=prefix).order_by(Upper('name'))[:limit]
+        from_catalog = products.filter(name__isnull=True, catalog_product__name__istartswith=prefix).order_by(
+            Upper('catalog_product__name'))[:limit]
+        rows = _values(named) + _values(from_catalog)
+        return sorted(rows, key=lambda row: row['name'].upper())[:limit]
+
+
+class SuggestionCache(object):
+    """
+    Per-owner `PrefixIndex` cache, bounded in size and in age.
+    """
+
+    def __init__(self, max_owners, max_products, ttl):
+        self.max_owners = max_owners
+        self.max_products = max_products
+        self.ttl = ttl
+        self._indexes = OrderedDict()
+        self._invalidations = 0
+        self._lock = Lock()
+
+    def get(self, owner_id):
+        index = self._indexes.get(owner_id)
+        if index is None or time.monotonic() - index.built_at > self.ttl:
+            invalidations = self._invalidations
+            index = self._build(owner_id)
+            with self._lock:
+                # A write that happened while building may not be in the index, keep it out of the cache.
+                if invalidations != self._invalidations:
+                    return index
+                self._indexes[owner_id] = index
+                while len(self._indexes) > self.max_owners:
+                    self._indexes.popitem(last=False)
+        return index
+
+    def _build(self, owner_id):
+        rows = _values(Product.objects.filter(owner_id=owner_id).order_by()[:self.max_products + 1])
+        if len(rows) > self.max_products:
+            return DatabasePrefixIndex(owner_id)
+        return PrefixIndex(owner_id, rows)
+
+    def invalidate(self, owner_id):
+        with self._lock:
+            self._invalidations += 1
+            self._indexes.pop(owner_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._invalidations += 1
+            self._indexes.clear()
+
+
+cache = SuggestionCache(
+    max_owners=getattr(settings, 'PRODUCT_SUGGEST_CACHE_SIZE', 1000),
+    max_products=getattr(settings, 'PRODUCT_SUGGEST_MAX_INDEXED', 5000),
+    ttl=getattr(settings, 'PRODUCT_SUGGEST_CACHE_TTL', 300),
+)
+
+
+def suggest(owner, prefix, limit):
+    return cache.get(owner.pk).search(prefix, limit)
@@ -1,8 +1,16 @@
+import io
+import os
+import tempfile
+
+from django.core.management import call_command
 from django.urls import reverse
 from rest_framework import status
 
-from base.tests import BaseAPITest
-from products.models import Category, Product
+from base.tests import BaseAPITest, User
+from lists.models import List
+from products import catalog, suggestions
+from products.models import Category, Product, CatalogProduct
+from users.models import ProductSpending
 
 max_page_size = 10
 
@@ -324,3 +332,197 @@ class ProductAPITest(BaseAPITest):
         self.assertEqual(len(results), max_page_size)
         for i, result in enumerate(results):
             self.assertEqual(result['name'], sorted_names[i])
+
+    def test_export_products_with_filter_by_category(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        for name, price, category in self._get_default_list_of_products():
+            Product.objects.create(owner=self.john_lennon, name=name, unit_price=price, category=category)
+        response = self.client.get(reverse('product-export'), {'category': 'Meat'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        rows = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(rows[0], 'id,name,unit_price,category,category_title,created_at,updated_at')
+        self.assertEqual(len(rows), 4)
+
+
+class ProductSuggestAPITest(BaseAPITest):
+    def setUp(self):
+        super(ProductSuggestAPITest, self).setUp()
+        suggestions.cache.clear()
+        for name in ['Milk Type A', 'milk Type B', 'Milkshake', 'Mint', 'Cheese']:
+            Product.objects.create(owner=self.john_lennon, name=name, unit_price=1.00)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _make_request_suggest(self, **kwargs):
+        url_suggest_api = reverse('product-suggest')
+        return self.client.get(url_suggest_api, kwargs, format='json')
+
+    def test_suggest_by_prefix(self):
+        response = self._make_request_suggest(q='mil')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['name'] for row in response.data], ['Milk Type A', 'milk Type B', 'Milkshake'])
+        response = self._make_request_suggest(q='Mi', limit=2)
+        self.assertEqual(len(response.data), 2)
+        response = self._make_request_suggest(q='')
+        self.assertEqual(response.data, [])
+
+    def test_suggest_is_invalidated_on_product_writes(self):
+        self.assertEqual(len(self._make_request_suggest(q='ch').data), 1)
+        Product.objects.create(owner=self.john_lennon, name='Chicken', unit_price=1.00)
+        self.assertEqual(len(self._make_request_suggest(q='ch').data), 2)
+        Product.objects.filter(name='Cheese').get().delete()
+        self.assertEqual([row['name'] for row in self._make_request_suggest(q='ch').data], ['Chicken'])
+
+    def test_suggest_with_other_user_token(self):
+        self._create_paul_mccartney()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.paul_mccartney_token)
+        self.assertEqual(self._make_request_suggest(q='mil').data, [])
+
+    def test_suggest_from_database_for_big_catalogs(self):
+        max_products = suggestions.cache.max_products
+        suggestions.cache.max_products = 2
+        try:
+            response = self._make_request_suggest(q='mil')
+        finally:
+            suggestions.cache.max_products = max_products
+            suggestions.cache.clear()
+        self.assertEqual([row['name'] for row in response.data], ['Milk Type A', 'milk Type B', 'Milkshake'])
+
+
+class CatalogAPITest(BaseAPITest):
+    def setUp(self):
+        super(CatalogAPITest, self).setUp()
+        suggestions.cache.clear()
+        self.milk = CatalogProduct.objects.create(gtin='04006381333931', name='Whole Milk', brand='Farm',
+                                                  unit_price=3.50)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def test_normalize_gtin(self):
+        self.assertEqual(catalog.normalize_gtin('4006381333931'), '04006381333931')
+        self.assertEqual(catalog.normalize_gtin('0360-0029 1452'), '00036000291452')
+        self.assertEqual(catalog.normalize_gtin('96385074'), '00000096385074')
+        self.assertIsNone(catalog.normalize_gtin('4006381333932'))
+        self.assertIsNone(catalog.normalize_gtin('12345'))
+
+    def test_lookup_with_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(catalog.lookup('4006381333931'), self.milk)
+        with self.assertNumQueries(0):
+            self.assertIsNone(catalog.lookup('4006381333932'))
+
+    def test_get_catalog_product_by_gtin(self):
+        response = self.client.get(reverse('catalog-detail', kwargs={'gtin': '4006381333931'}))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['name'], 'Whole Milk')
+        response = self.client.get(reverse('catalog-detail', kwargs={'gtin': '96385074'}))
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_create_product_from_catalog(self):
+        response = self.client.post(reverse('product-list'), {'catalog_product': self.milk.pk}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['name'], 'Whole Milk')
+        self.assertEqual(response.data['unit_price'], 3.50)
+        self.assertEqual(response.data['gtin'], '04006381333931')
+        product = Product.objects.get(pk=response.data['id'])
+        self.assertIsNone(product.name)
+        response = self.client.patch(reverse('product-detail', kwargs={'pk': product.pk}),
+                                     {'name': 'Milk', 'unit_price': 3.00}, format='json')
+        self.assertEqual(response.data['name'], 'Milk')
+        self.assertEqual(response.data['unit_price'], 3.00)
+
+    def test_create_product_from_catalog_with_blank_name(self):
+        response = self.client.post(reverse('product-list'), {'catalog_product': self.milk.pk, 'name': ''},
+                                    format='json')
+        self.assertEqual(response.data['name'], 'Whole Milk')
+        self.assertIsNone(Product.objects.get(pk=response.data['id']).name)
+        response = self.client.get(reverse('product-suggest'), {'q': 'who'})
+        self.assertEqual([row['name'] for row in response.data], ['Whole Milk'])
+
+    def test_create_product_without_name_or_catalog(self):
+        response = self.client.post(reverse('product-list'), {'unit_price': 1.00}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_filter_and_suggest_products_of_the_catalog(self):
+        Product.objects.create(owner=self.john_lennon, catalog_product=self.milk, unit_price=3.50)
+        Product.objects.create(owner=self.john_lennon, name='Mint', unit_price=1.00)
+        response = self.client.get(reverse('product-list'), {'gtin': '4006381333931'})
+        self.assertEqual([row['name'] for row in response.data['results']], ['Whole Milk'])
+        response = self.client.get(reverse('product-suggest'), {'q': 'whole'})
+        self.assertEqual([row['name'] for row in response.data], ['Whole Milk'])
+
+    def test_suggest_products_of_the_catalog_from_database(self):
+        Product.objects.create(owner=self.john_lennon, catalog_product=self.milk, unit_price=3.50)
+        for name in ('Wheat', 'Wine', 'Water'):
+            Product.objects.create(owner=self.john_lennon, name=name, unit_price=1.00)
+        max_products = suggestions.cache.max_products
+        suggestions.cache.max_products = 2
+        try:
+            response = self.client.get(reverse('product-suggest'), {'q': 'w', 'limit': 3})
+        finally:
+            suggestions.cache.max_products = max_products
+            suggestions.cache.clear()
+        self.assertEqual([row['name'] for row in response.data], ['Water', 'Wheat', 'Whole Milk'])
+
+    def test_import_catalog(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False) as csv_file:
+            csv_file.write('gtin,name,brand,unit_price\n4006381333931,Skimmed Milk,Farm,3.00\n'
+                           '036000291452,Rice,,8.90\n12345,Invalid,,1.00\n')
+        try:
+            call_command('import_catalog', csv_file.name, stdout=io.StringIO())
+        finally:
+            os.remove(csv_file.name)
+        self.assertEqual(CatalogProduct.objects.count(), 2)
+        self.assertEqual(CatalogProduct.objects.get(pk=self.milk.pk).name, 'Skimmed Milk')
+        self.assertEqual(CatalogProduct.objects.get(gtin='00036000291452').unit_price, 8.90)
+
+
+class ProductAdminTest(BaseAPITest):
+    def setUp(self):
+        super(ProductAdminTest, self).setUp()
+        self.admin = User.objects.create_superuser('admin', 'admin@thebeatles.com', 'adminpassword',
+                                               hash='ADMINHASH')
+        self.client.force_login(self.admin)
+        self.dairy = Category.objects.create(owner=self.john_lennon, title='Dairy Products')
+        self.milk = Product.objects.create(owner=self.john_lennon, name='Milk', unit_price=2.00)
+        self.cheese = Product.objects.create(owner=self.john_lennon, name='Cheese', unit_price=5.00)
+
+    def _make_request_action(self, action, products, **kwargs):
+        url_changelist = reverse('admin:products_product_changelist')
+        data = dict(kwargs, action=action, _selected_action=[product.pk for product in products])
+        return self.client.post(url_changelist, data)
+
+    def test_changelists(self):
+        for url_name in ['admin:products_product_changelist', 'admin:products_category_changelist',
+                         'admin:lists_list_changelist']:
+            self.assertEqual(self.client.get(reverse(url_name)).status_code, status.HTTP_200_OK)
+        url_category = reverse('admin:products_category_change', args=[self.dairy.pk])
+        self.assertContains(self.client.get(url_category), '?category__id__exact={}'.format(self.dairy.pk))
+
+    def test_reprice_action(self):
+        my_list = List.objects.create(owner=self.john_lennon, name='My List')
+        my_list.add_item(self.milk, 3)
+        suggestions.cache.get(self.john_lennon.pk)
+        response = self._make_request_action('reprice', [self.milk, self.cheese], percentage=10)
+        self.assertEqual(response.status_code, status.HTTP_302_FOUND)
+        self.assertAlmostEqual(Product.objects.get(pk=self.milk.pk).unit_price, 2.20)
+        self.assertAlmostEqual(Product.objects.get(pk=self.cheese.pk).unit_price, 5.50)
+        self.assertAlmostEqual(ProductSpending.objects.get(product=self.milk).total, 6.60)
+        self.assertNotIn(self.john_lennon.pk, suggestions.cache._indexes)
+
+    def test_reprice_all_the_products_of_an_owner(self):
+        Product.objects.bulk_create([Product(owner=self.john_lennon, name='Product {}'.format(i), unit_price=1)
+                                     for i in range(1200)])
+        my_list = List.objects.create(owner=self.john_lennon, name='My List')
+        my_list.add_item(self.milk, 3)
+        # The owners, the products, the lists and the rollups, in a savepoint: no query per product.
+        with self.assertNumQueries(6):
+            self.assertEqual(Product.objects.filter(owner=self.john_lennon).reprice(50), 1202)
+        my_list.refresh_from_db()
+        self.assertAlmostEqual(my_list.remaining_value, 9.00)
+        self.assertAlmostEqual(ProductSpending.objects.get(product=self.milk).total, 9.00)
+
+    def test_move_to_category_action(self):
+        self._create_paul_mccartney()
+        paul_product = Product.objects.create(owner=self.paul_mccartney, name='Milk', unit_price=2.00)
+        self._make_request_action('move_to_category', [self.milk, paul_product], category=self.dairy.pk)
+        self.assertEqual(Product.objects.get(pk=self.milk.pk).category, self.dairy)
+        self.assertIsNone(Product.objects.get(pk=paul_product.pk).category)
@@ -1,8 +1,9 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import CategoryViewSet, ProductViewSet
+from .views import CategoryViewSet, CatalogViewSet, ProductViewSet
 
 router = DefaultRouter()
 router.register(r'categories', CategoryViewSet, base_name='category')
+router.register(r'catalog', CatalogViewSet, base_name='catalog')
 router.register(r'', ProductViewSet, base_name='product')
 urlpatterns = router.urls
@@ -1,11 +1,16 @@
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework import filters
+from rest_framework import filters, viewsets
+from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
+from rest_framework.response import Response
 
+from base.exports import stream_export
 from base.filters import IsOwnerFilterBackend
-from base.viewsets import OwnerModelViewSet
+from base.viewsets import OwnerModelViewSet, SparseFieldsMixin
 from products.filters import ProductFilter
-from .serializers import CategorySerializer, ProductSerializer
-from .models import Category, Product
+from products import catalog, suggestions
+from .serializers import CategorySerializer, ProductSerializer, CatalogProductSerializer
+from .models import Category, Product, CatalogProduct, product_name
 
 
 class CategoryViewSet(OwnerModelViewSet):
@@ -14,9 +19,44 @@ class CategoryViewSet(OwnerModelViewSet):
     filter_backends = (IsOwnerFilterBackend, )
 
 
+class CatalogViewSet(SparseFieldsMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = CatalogProduct.objects.all()
+    serializer_class = CatalogProductSerializer
+    filter_backends = (filters.SearchFilter, )
+    search_fields = ('name', 'brand')
+    lookup_field = 'gtin'
+    lookup_value_regex = '[0-9 -]+'
+
+    def get_object(self):
+        catalog_product = catalog.lookup(self.kwargs['gtin'])
+        if catalog_product is None:
+            raise NotFound()
+        return catalog_product
+
+
 class ProductViewSet(OwnerModelViewSet):
-    queryset = Product.objects.all()
+    queryset = Product.objects.select_related('catalog_product')
     serializer_class = ProductSerializer
     filter_backends = (DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter, IsOwnerFilterBackend)
     filter_class = ProductFilter
-    search_fields = ('name', 'category__title')
+    search_fields = ('name', 'catalog_product__name', 'category__title')
+    suggest_limit = 10
+    max_suggest_limit = 50
+
+    @action(detail=False)
+    def suggest(self, request):
+        prefix = request.query_params.get('q', '').strip()
+        try:
+            limit = min(int(request.query_params.get('limit', self.suggest_limit)), self.max_suggest_limit)
+        except ValueError:
+            limit = self.suggest_limit
+        if not prefix or limit < 1:
+            return Response([])
+        return Response(suggestions.suggest(request.user, prefix, limit))
+
+    @action(detail=False, throttle_scope='aggregate')
+    def export(self, request):
+        columns = (('id', 'id'), ('name', 'display_name'), ('unit_price', 'unit_price'), ('category', 'category_id'),
+                   ('category_title', 'category__title'), ('created_at', 'created_at'), ('updated_at', 'updated_at'))
+        queryset = self.filter_queryset(self.get_queryset()).annotate(display_name=product_name())
+        return stream_export(request, queryset, columns, 'products')
@@ -0,0 +1,100 @@
+"""
+API keys of the scripted integrations. Keys are random, so a single SHA-256 is enough to store them, and
+checking one costs an indexed lookup, or nothing when the key is in the cache of the process, instead of
+the PBKDF2 rounds of a password.
+"""
+import hashlib
+import secrets
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from django.utils import timezone
+
+from .models import ApiKey
+
+
+def _hash(key):
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+class KeyCache(object):
+    """
+    Keys verified by this process for `API_KEY_CACHE_SECONDS`. Revoking a key drops it from the cache of
+    the process doing it; the other processes keep accepting it until their entry expires.
+    """
+    max_keys = 10000
+
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, key_hash):
+        entry = self._keys.get(key_hash)
+        if entry is None or time.monotonic() - entry[1] > getattr(settings, 'API_KEY_CACHE_SECONDS', 60):
+            return None
+        return entry[0]
+
+    def set(self, key_hash, api_key):
+        with self._lock:
+            if len(self._keys) >= self.max_keys:
+                self._keys.clear()
+            self._keys[key_hash] = (api_key, time.monotonic())
+
+    def discard(self, key_hash):
+        self._keys.pop(key_hash, None)
+
+    def clear(self):
+        self._keys.clear()
+
+
+key_cache = KeyCache()
+
+
+def issue(user, name, scopes=(ApiKey.READ, ), expires_at=None):
+    """
+    Creates a key for `user`, returns `(api_key, key)`: the key itself is only known at this point.
+    """
+    prefix = secrets.token_hex(4)
+    key = '{}.{}'.format(prefix, secrets.token_urlsafe(32))
+    api_key = ApiKey.objects.using(DEFAULT_DB_ALIAS).create(user=user, name=name, prefix=prefix,
+                                                            key_hash=_hash(key), scopes=' '.join(scopes),
+                                                            expires_at=expires_at)
+    return api_key, key
+
+
+def verify(key):
+    """
+    Returns the valid `ApiKey` of `key`, with its user, or None.
+    """
+    key_hash = _hash(key)
+    api_key = key_cache.get(key_hash)
+    if api_key is None:
+        api_key = ApiKey.objects.using(DEFAULT_DB_ALIAS).select_related('user').filter(
+            key_hash=key_hash, revoked_at__isnull=True).first()
+        if api_key is None:
+            return None
+        key_cache.set(key_hash, api_key)
+    if (api_key.expires_at and api_key.expires_at <= timezone.now()) or not api_key.user.is_active:
+        return None
+    return api_key
+
+
+def revoke(api_key):
+    ApiKey.objects.using(DEFAULT_DB_ALIAS).filter(pk=api_key.pk).update(revoked_at=timezone.now())
+    key_cache.discard(api_key.key_hash)
+
+
+def rotate(api_key):
+    """
+    Replaces `api_key` by a new key with the same name and scopes. The old key keeps working for
+    `API_KEY_ROTATION_GRACE_SECONDS`, so integrations can switch without downtime. Returns `(api_key, key)`.
+    """
+    new_api_key, key = issue(api_key.user, api_key.name, api_key.scope_list, api_key.expires_at)
+    grace_until = timezone.now() + timedelta(seconds=getattr(settings, 'API_KEY_ROTATION_GRACE_SECONDS', 3600))
+    if api_key.expires_at is None or api_key.expires_at > grace_until:
+        ApiKey.objects.using(DEFAULT_DB_ALIAS).filter(pk=api_key.pk).update(expires_at=grace_until)
+    key_cache.discard(api_key.key_hash)
+    return new_api_key, key
@@ -1,5 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class UsersConfig(AppConfig):
     name = 'users'
+
+    def ready(self):
+        from base import sharding
+        from . import signals  # noqa: F401
+
+        post_migrate.connect(sharding.reserve_id_range, sender=self)
@@ -0,0 +1,30 @@
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, get_authorization_header
+
+from . import api_keys
+
+
+class ApiKeyAuthentication(BaseAuthentication):
+    """
+    `Authorization: Api-Key <key>`, sets `request.auth` to the `ApiKey`, see `users.permissions.HasApiKeyScope`.
+    """
+    keyword = 'Api-Key'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid API key header.'))
+        try:
+            key = auth[1].decode()
+        except UnicodeError:
+            raise exceptions.AuthenticationFailed(_('Invalid API key header.'))
+        api_key = api_keys.verify(key)
+        if api_key is None:
+            raise exceptions.AuthenticationFailed(_('Invalid or expired API key.'))
+        return api_key.user, api_key
+
+    def authenticate_header(self, request):
+        return self.keyword
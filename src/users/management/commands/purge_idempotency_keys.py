@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from base.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = 'Deletes the stored responses of the Idempotency-Keys older than IDEMPOTENCY_KEY_TTL_HOURS.'
+
+    def handle(self, *args, **options):
+        purged = purge_expired_keys()
+        self.stdout.write(self.style.SUCCESS('{} idempotency keys purged.'.format(purged)))
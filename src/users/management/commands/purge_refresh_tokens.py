@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from users.tokens import purge_expired
+
+
+class Command(BaseCommand):
+    help = 'Deletes the expired refresh tokens, rotated and revoked ones included.'
+
+    def handle(self, *args, **options):
+        purged = purge_expired()
+        self.stdout.write(self.style.SUCCESS('{} refresh tokens purged.'.format(purged)))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from base import sharding
+from users import shards
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Moves users between shards, either one user to a given shard or enough users to even out the shards.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help='Username of the user to move.')
+        parser.add_argument('--to', help='Shard the user is moved to.')
+        parser.add_argument('--dry-run', action='store_true', help='Only print the moves.')
+
+    def handle(self, *args, **options):
+        if options['user']:
+            if options['to'] not in sharding.get_shards():
+                raise CommandError('--to must be one of: {}.'.format(', '.join(sharding.get_shards())))
+            try:
+                user = User.objects.get(username=options['user'])
+            except User.DoesNotExist:
+                raise CommandError('Unknown user {}.'.format(options['user']))
+            moves = [(user.pk, options['to'])]
+        else:
+            moves = shards.plan_rebalance()
+        for user_id, target in moves:
+            user = User.objects.get(pk=user_id)
+            source = sharding.shard_for(user_id)
+            if options['dry_run']:
+                self.stdout.write('{}: {} -> {}'.format(user, source, target))
+                continue
+            moved = shards.move_user(user, target)
+            self.stdout.write('{}: {} -> {}, {} rows moved.'.format(user, source, target, moved))
+        self.stdout.write(self.style.SUCCESS('{} users moved.'.format(0 if options['dry_run'] else len(moves))))
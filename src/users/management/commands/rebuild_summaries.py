@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from users import summaries
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the users summary rollups from scratch.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('usernames', nargs='*', help='Only rebuild the rollups of these users.')
+
+    def handle(self, *args, **options):
+        owners = None
+        if options['usernames']:
+            owners = list(User.objects.filter(username__in=options['usernames']))
+        summaries.rebuild(owners)
+        self.stdout.write(self.style.SUCCESS('Summaries rebuilt.'))
@@ -0,0 +1,61 @@
+# Generated by Django 2.0.5 on 2026-10-19 14:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_auto_20180604_2135'),
+        ('users', '0008_auto_20180604_2135'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductSpending',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('month', models.DateField(verbose_name='Month')),
+                ('quantity', models.FloatField(default=0, verbose_name='Quantity')),
+                ('total', models.FloatField(default=0, verbose_name='Total')),
+            ],
+            options={
+                'ordering': ['month'],
+            },
+        ),
+        migrations.CreateModel(
+            name='UserSummary',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('lists_qty', models.IntegerField(default=0, verbose_name='Lists quantity')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddField(
+            model_name='usersummary',
+            name='owner',
+            field=models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='summary', to=settings.AUTH_USER_MODEL, verbose_name='Owner'),
+        ),
+        migrations.AddField(
+            model_name='productspending',
+            name='owner',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='product_spendings', to=settings.AUTH_USER_MODEL, verbose_name='Owner'),
+        ),
+        migrations.AddField(
+            model_name='productspending',
+            name='product',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='spendings', to='products.Product', verbose_name='Product'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='productspending',
+            unique_together={('owner', 'product', 'month')},
+        ),
+    ]
@@ -1,12 +1,130 @@
 import random
+from uuid import uuid4
 
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 
+from base.models import BaseModel
+
 
 class User(AbstractUser):
     hash = models.CharField('Hash', max_length=128, default=random.getrandbits(128), unique=True)
     birthday = models.DateField(_('Birthday'), null=True)
 
 
+class UserSummary(BaseModel):
+    """
+    Rollup of the user's lists, kept up to date on every `List` write.
+    """
+    owner = models.OneToOneField('users.User', related_name='summary', verbose_name=_('Owner'),
+                                 on_delete=models.CASCADE)
+    lists_qty = models.IntegerField(_('Lists quantity'), default=0)
+
+    def __str__(self):
+        return str(self.owner)
+
+
+class ProductSpending(BaseModel):
+    """
+    Rollup of the user's spending by product and month, kept up to date on every `Item` write.
+    """
+    owner = models.ForeignKey('users.User', related_name='product_spendings', verbose_name=_('Owner'),
+                              on_delete=models.CASCADE)
+    product = models.ForeignKey('products.Product', related_name='spendings', verbose_name=_('Product'),
+                                on_delete=models.CASCADE)
+    month = models.DateField(_('Month'))
+    quantity = models.FloatField(_('Quantity'), default=0)
+    total = models.FloatField(_('Total'), default=0)
+
+    class Meta:
+        ordering = ['month', ]
+        unique_together = ('owner', 'product', 'month')
+
+    def __str__(self):
+        return '{} ({:%Y-%m})'.format(self.product, self.month)
+
+
+class RefreshToken(BaseModel):
+    """
+    Long lived token exchanged for new access tokens. Only its SHA-256 hash is stored.
+    """
+    user = models.ForeignKey('users.User', related_name='refresh_tokens', verbose_name=_('User'),
+                             on_delete=models.CASCADE)
+    token_hash = models.CharField(_('Token hash'), max_length=64, unique=True)
+    expires_at = models.DateTimeField(_('Expires at'))
+    revoked_at = models.DateTimeField(_('Revoked at'), null=True, blank=True)
+
+    def __str__(self):
+        return '{} ({:%Y-%m-%d %H:%M})'.format(self.user, self.expires_at)
+
+
+class UserShard(BaseModel):
+    """
+    Directory entry with the shard holding the user's lists and products, see `base.sharding`.
+    """
+    user = models.OneToOneField('users.User', related_name='user_shard', verbose_name=_('User'),
+                                on_delete=models.CASCADE)
+    shard = models.CharField(_('Shard'), max_length=100, db_index=True)
+
+    def __str__(self):
+        return '{} ({})'.format(self.user, self.shard)
+
+
+class IdempotencyKey(BaseModel):
+    """
+    Response to a write sent with an `Idempotency-Key` header, replayed when the client retries it,
+    see `base.idempotency`. `status_code` is empty while the first request runs, `lease_id` tells it from
+    a request that took the key over.
+    """
+    user = models.ForeignKey('users.User', related_name='idempotency_keys', verbose_name=_('User'),
+                             on_delete=models.CASCADE)
+    key = models.CharField(_('Key'), max_length=255)
+    request_hash = models.CharField(_('Request hash'), max_length=64)
+    status_code = models.PositiveSmallIntegerField(_('Status code'), null=True, blank=True)
+    response = models.TextField(_('Response'), blank=True)
+    lease_id = models.UUIDField(_('Lease id'), default=uuid4)
+
+    class Meta:
+        unique_together = ('user', 'key')
+        indexes = [
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return '{} ({})'.format(self.key, self.user)
+
+
+class ApiKey(BaseModel):
+    """
+    Key of a scripted integration, sent as `Authorization: Api-Key <key>`. Only its SHA-256 hash is stored,
+    `prefix` tells the keys apart, see `users.api_keys`.
+    """
+    READ = 'read'
+    WRITE = 'write'
+    SCOPE_CHOICES = (
+        (READ, _('Read')),
+        (WRITE, _('Write')),
+    )
+
+    user = models.ForeignKey('users.User', related_name='api_keys', verbose_name=_('User'), on_delete=models.CASCADE)
+    name = models.CharField(_('Name'), max_length=100)
+    prefix = models.CharField(_('Prefix'), max_length=8)
+    key_hash = models.CharField(_('Key hash'), max_length=64, unique=True)
+    # Space separated.
+    scopes = models.CharField(_('Scopes'), max_length=100, default=READ)
+    expires_at = models.DateTimeField(_('Expires at'), null=True, blank=True)
+    revoked_at = models.DateTimeField(_('Revoked at'), null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at', ]
+
+    def __str__(self):
+        return '{} ({})'.format(self.name, self.prefix)
+
+    def _get_scope_list(self):
+        return self.scopes.split()
+    scope_list = property(_get_scope_list)
+
+    def has_scope(self, scope):
+        return scope in self.scope_list
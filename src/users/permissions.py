@@ -0,0 +1,23 @@
+from rest_framework.permissions import BasePermission, SAFE_METHODS
+
+from .models import ApiKey
+
+
+class HasApiKeyScope(BasePermission):
+    """
+    Requests authenticated with an API key need its `read` scope for safe methods, `write` for the others.
+    """
+
+    def has_permission(self, request, view):
+        if not isinstance(request.auth, ApiKey):
+            return True
+        return request.auth.has_scope(ApiKey.READ if request.method in SAFE_METHODS else ApiKey.WRITE)
+
+
+class IsNotApiKey(BasePermission):
+    """
+    Keeps API keys from managing API keys.
+    """
+
+    def has_permission(self, request, view):
+        return not isinstance(request.auth, ApiKey)
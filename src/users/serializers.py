@@ -0,0 +1,17 @@
+from rest_framework import serializers
+
+from .models import ApiKey
+
+
+class RefreshTokenSerializer(serializers.Serializer):
+    refresh_token = serializers.CharField()
+
+
+class ApiKeySerializer(serializers.ModelSerializer):
+    scopes = serializers.ListField(child=serializers.ChoiceField(choices=ApiKey.SCOPE_CHOICES), source='scope_list',
+                                   allow_empty=False, default=[ApiKey.READ])
+
+    class Meta:
+        model = ApiKey
+        fields = ('id', 'name', 'prefix', 'scopes', 'expires_at', 'created_at')
+        read_only_fields = ('prefix', )
@@ -0,0 +1,86 @@
+from django.db import DEFAULT_DB_ALIAS, transaction
+
+from base import sharding
+from base.models import delete_rows
+from lists.models import List, Item, ArchivedList
+from products.models import Category, Product
+from .models import User, UserShard, UserSummary, ProductSpending
+
+
+def _owner_querysets(user, alias):
+    # Parents first, so the copies never point to rows not copied yet.
+    return [
+        Category.objects.using(alias).filter(owner=user),
+        Product.objects.using(alias).filter(owner=user),
+        List.objects.using(alias).filter(owner=user),
+        Item.objects.using(alias).filter(list__owner=user),
+        ArchivedList.objects.using(alias).filter(owner=user),
+        UserSummary.objects.using(alias).filter(owner=user),
+        ProductSpending.objects.using(alias).filter(owner=user),
+    ]
+
+
+def move_user(user, target):
+    """
+    Copies every owner scoped row of `user` to the `target` shard, points the directory to it and deletes
+    the rows from the previous shard. Rows keep their ids, which are unique across shards.
+    Returns the number of moved rows.
+    """
+    if target not in sharding.get_shards():
+        raise ValueError('Unknown shard {}.'.format(target))
+    source = sharding.shard_for(user.pk)
+    if source == target:
+        return 0
+    sharding.ensure_owner(user.pk, target)
+    querysets = _owner_querysets(user, source)
+    moved = 0
+    # Commits the copies, then the directory, then the deletes: a failure never loses rows.
+    with transaction.atomic(using=source), transaction.atomic(using=DEFAULT_DB_ALIAS), \
+            transaction.atomic(using=target):
+        ids = []
+        for queryset in querysets:
+            rows = list(queryset.select_for_update())
+            queryset.model.objects.using(target).bulk_create(rows)
+            ids.append((queryset.model, [row.pk for row in rows]))
+            moved += len(rows)
+        UserShard.objects.using(DEFAULT_DB_ALIAS).update_or_create(user=user, defaults={'shard': target})
+        # Plain DELETEs: the rows still exist, the rollups and events must not see them go.
+        for model, pks in reversed(ids):
+            delete_rows(model, pks, source)
+    sharding.forget(user.pk)
+    return moved
+
+
+def purge_user(user_id, alias):
+    """
+    Deletes every owner scoped row of the user, and the copy of the user, from the `alias` shard.
+    """
+    with transaction.atomic(using=alias):
+        # Children first, the rows are not loaded and the rollups and events must not see them go.
+        for queryset in reversed(_owner_querysets(user_id, alias)):
+            delete_rows(queryset.model, queryset.values_list('pk', flat=True), alias)
+        delete_rows(User, [user_id], alias)
+    sharding.forget(user_id)
+
+
+def plan_rebalance():
+    """
+    Returns the `(user_id, target)` moves that spread the users evenly across the shards.
+    """
+    shards = sharding.get_shards()
+    for user_id in User.objects.filter(user_shard__isnull=True).values_list('pk', flat=True):
+        sharding.assign(user_id)
+    members = {alias: [] for alias in shards}
+    directory = UserShard.objects.using(DEFAULT_DB_ALIAS).order_by('user_id')
+    for user_id, alias in directory.values_list('user_id', 'shard'):
+        if alias in members:
+            members[alias].append(user_id)
+    moves = []
+    while True:
+        fullest = max(shards, key=lambda alias: len(members[alias]))
+        emptiest = min(shards, key=lambda alias: len(members[alias]))
+        if len(members[fullest]) - len(members[emptiest]) <= 1:
+            return moves
+        user_id = members[fullest].pop()
+        members[emptiest].append(user_id)
+        moves.append((user_id, emptiest))
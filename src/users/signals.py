@@ -0,0 +1,90 @@
+from django.db import DEFAULT_DB_ALIAS
+from django.db.models.signals import post_init, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from base import sharding
+from lists.models import List, Item
+from lists.signals import item_adjusted
+from products.models import Product
+from products.signals import products_bulk_updated
+from . import shards, summaries
+from .models import User, UserShard
+
+
+@receiver(post_save, sender=User)
+def user_created(sender, instance, created, using, raw=False, **kwargs):
+    # Copies of the user made in the shards by `sharding.ensure_owner` are not placed again.
+    if created and not raw and using == DEFAULT_DB_ALIAS and len(sharding.get_shards()) > 1:
+        sharding.assign(instance.pk)
+
+
+@receiver(pre_delete, sender=User)
+def user_deleting(sender, instance, using, **kwargs):
+    # The directory entry is deleted along with the user, the shard has to be read first.
+    if using == DEFAULT_DB_ALIAS and len(sharding.get_shards()) > 1:
+        instance._shard = UserShard.objects.using(DEFAULT_DB_ALIAS).filter(user=instance).values_list(
+            'shard', flat=True).first()
+
+
+@receiver(post_delete, sender=User)
+def user_deleted(sender, instance, using, **kwargs):
+    # The deletion only cascades in `default`, the rows of the user on their shard are purged here.
+    shard = getattr(instance, '_shard', None)
+    if shard and shard != DEFAULT_DB_ALIAS:
+        shards.purge_user(instance.pk, shard)
+
+
+@receiver(post_save, sender=List)
+def list_created(sender, instance, created, **kwargs):
+    if created:
+        summaries.add_lists(instance.owner_id, 1)
+
+
+@receiver(post_delete, sender=List)
+def list_deleted(sender, instance, **kwargs):
+    summaries.add_lists(instance.owner_id, -1)
+
+
+@receiver(post_init, sender=Item)
+def item_loaded(sender, instance, **kwargs):
+    instance._saved_rollup = (instance.product_id, instance.quantity) if instance.pk else (None, 0)
+
+
+@receiver(post_save, sender=Item)
+def item_saved(sender, instance, created, **kwargs):
+    owner_id = instance.list.owner_id
+    product_id, quantity = instance._saved_rollup
+    if product_id != instance.product_id:
+        if product_id is not None:
+            summaries.add_spending(owner_id, Product.objects.get(pk=product_id), instance.created_at, -quantity)
+        quantity = 0
+    summaries.add_spending(owner_id, instance.product, instance.created_at, instance.quantity - quantity)
+    instance._saved_rollup = (instance.product_id, instance.quantity)
+
+
+@receiver(item_adjusted, sender=Item)
+def item_quantity_adjusted(sender, instance, delta, **kwargs):
+    summaries.add_spending(instance.list.owner_id, instance.product, instance.created_at, delta)
+
+
+@receiver(post_delete, sender=Item)
+def item_deleted(sender, instance, **kwargs):
+    product_id, quantity = instance._saved_rollup
+    if product_id is None:
+        return
+    owner_id = List.objects.filter(pk=instance.list_id).values_list('owner_id', flat=True).first()
+    product = Product.objects.filter(pk=product_id).first()
+    if owner_id is not None and product is not None:
+        summaries.add_spending(owner_id, product, instance.created_at, -quantity)
+
+
+@receiver(post_save, sender=Product)
+def product_saved(sender, instance, created, **kwargs):
+    if not created:
+        summaries.reprice_spending(instance)
+
+
+@receiver(products_bulk_updated, sender=Product)
+def products_updated(sender, owner_ids, fields, using, **kwargs):
+    if 'unit_price' in fields:
+        summaries.reprice_spendings(owner_ids, using)
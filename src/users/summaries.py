@@ -0,0 +1,123 @@
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Sum, FloatField, DateField, OuterRef, Subquery
+from django.db.models.functions import TruncMonth
+
+from base import sharding
+from products.models import product_name
+from .models import UserSummary, ProductSpending
+
+TOP_PRODUCTS_QTY = 5
+
+
+def _month_of(value):
+    return date(value.year, value.month, 1)
+
+
+def add_lists(owner_id, delta):
+    updated = UserSummary.objects.filter(owner_id=owner_id).update(lists_qty=F('lists_qty') + delta)
+    if not updated and delta > 0:
+        UserSummary.objects.get_or_create(owner_id=owner_id)
+        UserSummary.objects.filter(owner_id=owner_id).update(lists_qty=F('lists_qty') + delta)
+
+
+def add_spending(owner_id, product, created_at, quantity_delta):
+    """
+    Applies a change of `quantity_delta` units of `product` to the owner's rollups.
+    Rows are only created for positive changes, so removals never resurrect deleted rollups.
+    """
+    if product is None or not quantity_delta:
+        return
+    lookup = {'owner_id': owner_id, 'product_id': product.pk, 'month': _month_of(created_at)}
+    changes = {
+        'quantity': F('quantity') + quantity_delta,
+        'total': (F('quantity') + quantity_delta) * product.unit_price,
+    }
+    updated = ProductSpending.objects.filter(**lookup).update(**changes)
+    if not updated and quantity_delta > 0:
+        ProductSpending.objects.get_or_create(**lookup)
+        ProductSpending.objects.filter(**lookup).update(**changes)
+
+
+def reprice_spending(product):
+    ProductSpending.objects.filter(product=product).update(total=F('quantity') * product.unit_price)
+
+
+def reprice_spendings(owner_ids, using):
+    """
+    Recomputes the totals of the owners' rollups from the current prices of their products.
+    """
+    from products.models import Product
+
+    unit_price = Product.objects.filter(pk=OuterRef('product_id')).values('unit_price')[:1]
+    spendings = ProductSpending.objects.using(using).filter(owner__in=owner_ids)
+    spendings.update(total=F('quantity') * Subquery(unit_price))
+
+
+def rebuild(owners=None):
+    """
+    Recomputes every rollup from scratch, optionally restricted to the given owners.
+    """
+    for alias in sharding.get_shards():
+        shard_owners = None
+        if owners is not None:
+            shard_owners = [owner for owner in owners if sharding.shard_for(owner.pk) == alias]
+            if not shard_owners:
+                continue
+        with sharding.use_shard(alias), transaction.atomic(using=alias):
+            _rebuild(shard_owners)
+
+
+def _rebuild(owners):
+    from lists.models import List, Item
+
+    summaries = UserSummary.objects.all()
+    spendings = ProductSpending.objects.all()
+    lists = List.objects.all()
+    items = Item.objects.filter(product__isnull=False)
+    if owners is not None:
+        summaries = summaries.filter(owner__in=owners)
+        spendings = spendings.filter(owner__in=owners)
+        lists = lists.filter(owner__in=owners)
+        items = items.filter(list__owner__in=owners)
+    summaries.delete()
+    spendings.delete()
+
+    UserSummary.objects.bulk_create(
+        UserSummary(owner_id=row['owner'], lists_qty=row['lists_qty'])
+        for row in lists.order_by().values('owner').annotate(lists_qty=Count('id'))
+    )
+    rows = items.order_by().annotate(
+        month=TruncMonth('created_at', output_field=DateField())
+    ).values('list__owner', 'product', 'month').annotate(
+        total_quantity=Sum('quantity'),
+        total_price=Sum(F('quantity') * F('product__unit_price'), output_field=FloatField()),
+    )
+    ProductSpending.objects.bulk_create(
+        ProductSpending(owner_id=row['list__owner'], product_id=row['product'], month=row['month'],
+                        quantity=row['total_quantity'], total=row['total_price'])
+        for row in rows
+    )
+
+
+def get_summary(user):
+    lists_qty = UserSummary.objects.filter(owner=user).values_list('lists_qty', flat=True).first() or 0
+    active_lists_qty = user.lists.active().count()
+    spendings = ProductSpending.objects.filter(owner=user, quantity__gt=0).order_by()
+    monthly_spending = spendings.values('month').annotate(total=Sum('total')).order_by('month')
+    top_products = spendings.annotate(product_name=product_name('product__')).values(
+        'product', 'product_name').annotate(
+        quantity=Sum('quantity'), total=Sum('total')).order_by('-total')[:TOP_PRODUCTS_QTY]
+    return {
+        'lists_qty': lists_qty,
+        'active_lists_qty': active_lists_qty,
+        'expired_lists_qty': lists_qty - active_lists_qty,
+        'monthly_spending': [
+            {'month': row['month'].strftime('%Y-%m'), 'total': row['total']} for row in monthly_spending
+        ],
+        'top_products': [
+            {'id': row['product'], 'name': row['product_name'], 'quantity': row['quantity'], 'total': row['total']}
+            for row in top_products
+        ],
+    }
@@ -0,0 +1,7 @@
+from jobs.queue import task
+from . import summaries
+
+
+@task('users.rebuild_summaries')
+def rebuild_summaries(owner):
+    summaries.rebuild([owner])
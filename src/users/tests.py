@@ -1,12 +1,24 @@
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
 from django.urls import reverse
+from django.utils.datetime_safe import datetime
 from rest_framework import status
 from rest_framework.test import APITestCase
 
-from .models import User
+from base.tests import BaseAPITest
+from base.throttling import memory_buckets
+from lists.models import List
+from products.models import Product
+from .api_keys import key_cache, verify
+from .models import User, UserSummary, ProductSpending, RefreshToken, ApiKey
 
 
 class UserTests(APITestCase):
     def setUp(self):
+        memory_buckets.clear()
         self.user = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
 
     def test_login_with_valid_credentials(self):
@@ -33,3 +45,172 @@ class UserTests(APITestCase):
         self.assertIsInstance(response.data, dict)
         self.assertTrue(response.data.get('non_field_errors', None) is None)
         self.assertTrue(response.data.get('username', None) is not None)
+
+
+class RefreshTokenTests(APITestCase):
+    def setUp(self):
+        memory_buckets.clear()
+        self.user = User.objects.create_user('john', 'lennon@thebeatles.com', 'johnpassword')
+        response = self.client.post(reverse('login'), {'username': 'john', 'password': 'johnpassword'}, format='json')
+        self.refresh_token = response.data['refresh_token']
+
+    def _make_request_refresh(self, refresh_token):
+        return self.client.post(reverse('refresh-token'), {'refresh_token': refresh_token}, format='json')
+
+    def test_refresh_rotates_tokens(self):
+        response = self._make_request_refresh(self.refresh_token)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response.data['refresh_token'], self.refresh_token)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + response.data['token'])
+        self.assertEqual(self.client.get(reverse('user-summary')).status_code, status.HTTP_200_OK)
+        self.assertEqual(RefreshToken.objects.filter(revoked_at__isnull=True).count(), 1)
+
+    def test_refresh_tokens_are_stored_hashed(self):
+        self.assertFalse(RefreshToken.objects.filter(token_hash=self.refresh_token).exists())
+
+    def test_reused_refresh_token_revokes_all_tokens(self):
+        new_refresh_token = self._make_request_refresh(self.refresh_token).data['refresh_token']
+        response = self._make_request_refresh(self.refresh_token)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self._make_request_refresh(new_refresh_token).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_revoked_refresh_token(self):
+        response = self.client.post(reverse('revoke-token'), {'refresh_token': self.refresh_token}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertEqual(self._make_request_refresh(self.refresh_token).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_expired_refresh_token(self):
+        RefreshToken.objects.update(expires_at=datetime.now() - timedelta(seconds=1))
+        self.assertEqual(self._make_request_refresh(self.refresh_token).status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_invalid_refresh_token(self):
+        self.assertEqual(self._make_request_refresh('invalid').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_purge_expired_refresh_tokens(self):
+        new_refresh_token = self._make_request_refresh(self.refresh_token).data['refresh_token']
+        self._make_request_refresh(new_refresh_token)
+        first = RefreshToken.objects.order_by('pk').first()
+        RefreshToken.objects.filter(pk=first.pk).update(expires_at=datetime.now() - timedelta(seconds=1))
+        call_command('purge_refresh_tokens', stdout=StringIO())
+        self.assertEqual(RefreshToken.objects.count(), 2)
+        # The rotated token that has not expired still detects its reuse.
+        self.assertEqual(self._make_request_refresh(new_refresh_token).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(RefreshToken.objects.filter(revoked_at__isnull=True).exists())
+
+
+class ApiKeyTests(BaseAPITest):
+    def setUp(self):
+        super(ApiKeyTests, self).setUp()
+        key_cache.clear()
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+
+    def _create_api_key(self, **kwargs):
+        return self.client.post(reverse('api-key-list'), dict({'name': 'Script'}, **kwargs), format='json')
+
+    def _use_api_key(self, key):
+        self.client.credentials(HTTP_AUTHORIZATION='Api-Key ' + key)
+
+    def test_create_and_use_api_key(self):
+        response = self._create_api_key(scopes=['read', 'write'])
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        key = response.data['key']
+        self.assertTrue(key.startswith(response.data['prefix']))
+        self.assertFalse(ApiKey.objects.filter(key_hash=key).exists())
+        self._use_api_key(key)
+        response = self.client.post(reverse('list-list'), {'name': 'Scripted'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(List.objects.get().owner, self.john_lennon)
+        with self.assertNumQueries(0):
+            verify(key)
+        self.assertEqual(self.client.get(reverse('api-key-list')).status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_api_key_scopes(self):
+        self._use_api_key(self._create_api_key().data['key'])
+        self.assertEqual(self.client.get(reverse('list-list')).status_code, status.HTTP_200_OK)
+        response = self.client.post(reverse('list-list'), {'name': 'Scripted'}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+    def test_revoked_and_expired_api_keys(self):
+        response = self._create_api_key()
+        key, pk = response.data['key'], response.data['id']
+        self.assertEqual(self.client.delete(reverse('api-key-detail', kwargs={'pk': pk})).status_code,
+                         status.HTTP_204_NO_CONTENT)
+        self._use_api_key(key)
+        self.assertEqual(self.client.get(reverse('list-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        key = self._create_api_key(expires_at=datetime.now() - timedelta(seconds=1)).data['key']
+        self._use_api_key(key)
+        self.assertEqual(self.client.get(reverse('list-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+    def test_rotate_api_key(self):
+        response = self._create_api_key(scopes=['read', 'write'])
+        old_key = response.data['key']
+        response = self.client.post(reverse('api-key-rotate', kwargs={'pk': response.data['id']}))
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['scopes'], ['read', 'write'])
+        for key in (old_key, response.data['key']):
+            self._use_api_key(key)
+            self.assertEqual(self.client.get(reverse('list-list')).status_code, status.HTTP_200_OK)
+        with override_settings(API_KEY_ROTATION_GRACE_SECONDS=0):
+            self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+            self.client.post(reverse('api-key-rotate', kwargs={'pk': response.data['id']}))
+        self._use_api_key(response.data['key'])
+        self.assertEqual(self.client.get(reverse('list-list')).status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+class SummaryAPITest(BaseAPITest):
+    def setUp(self):
+        super(SummaryAPITest, self).setUp()
+        self.milk = Product.objects.create(owner=self.john_lennon, name='Milk', unit_price=2.00)
+        self.cheese = Product.objects.create(owner=self.john_lennon, name='Cheese', unit_price=5.00)
+        self.active_list = List.objects.create(owner=self.john_lennon, name='Active List',
+                                               valid_at=datetime.now() + timedelta(days=1))
+        self.expired_list = List.objects.create(owner=self.john_lennon, name='Expired List',
+                                                valid_at=datetime.now() - timedelta(days=1))
+
+    def _make_request_get_summary(self):
+        self.client.credentials(HTTP_AUTHORIZATION='JWT ' + self.john_lennon_token)
+        return self.client.get(reverse('user-summary'), format='json')
+
+    def test_summary_counts_lists(self):
+        List.objects.create(owner=self.john_lennon, name='List Without Validity')
+        response = self._make_request_get_summary()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['lists_qty'], 3)
+        self.assertEqual(response.data['active_lists_qty'], 2)
+        self.assertEqual(response.data['expired_lists_qty'], 1)
+        self.expired_list.delete()
+        response = self._make_request_get_summary()
+        self.assertEqual(response.data['lists_qty'], 2)
+        self.assertEqual(response.data['expired_lists_qty'], 0)
+
+    def test_summary_follows_item_writes(self):
+        milk_item = self.active_list.add_item(self.milk, 3)
+        self.expired_list.add_item(self.milk, 1)
+        cheese_item = self.active_list.add_item(self.cheese, 2)
+        response = self._make_request_get_summary()
+        self.assertEqual(response.data['top_products'][0]['name'], 'Cheese')
+        self.assertEqual(response.data['top_products'][1]['quantity'], 4)
+        self.assertEqual(response.data['monthly_spending'][0]['total'], 18.00)
+
+        milk_item.quantity = 10
+        milk_item.save()
+        cheese_item.delete()
+        response = self._make_request_get_summary()
+        self.assertEqual(len(response.data['top_products']), 1)
+        self.assertEqual(response.data['top_products'][0]['quantity'], 11)
+        self.assertEqual(response.data['monthly_spending'][0]['total'], 22.00)
+
+        self.milk.unit_price = 1.00
+        self.milk.save()
+        response = self._make_request_get_summary()
+        self.assertEqual(response.data['monthly_spending'][0]['total'], 11.00)
+
+    def test_rebuild_summaries(self):
+        self.active_list.add_item(self.milk, 3)
+        self.active_list.add_item(self.cheese, 2)
+        expected = self._make_request_get_summary().data
+        UserSummary.objects.all().delete()
+        ProductSpending.objects.all().delete()
+        call_command('rebuild_summaries', stdout=StringIO())
+        self.assertEqual(self._make_request_get_summary().data, expected)
@@ -0,0 +1,68 @@
+import hashlib
+import secrets
+
+from django.conf import settings
+from django.utils import timezone
+from rest_framework_jwt.settings import api_settings
+
+from .models import RefreshToken
+
+
+class InvalidRefreshToken(Exception):
+    pass
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def issue_refresh_token(user):
+    token = secrets.token_urlsafe(32)
+    RefreshToken.objects.create(user=user, token_hash=_hash(token),
+                                expires_at=timezone.now() + settings.REFRESH_TOKEN_EXPIRATION_DELTA)
+    return token
+
+
+def issue_access_token(user):
+    return api_settings.JWT_ENCODE_HANDLER(api_settings.JWT_PAYLOAD_HANDLER(user))
+
+
+def jwt_response_payload_handler(token, user=None, request=None):
+    """
+    Login response: the short lived access token plus a refresh token to renew it without the password.
+    """
+    return {'token': token, 'refresh_token': issue_refresh_token(user)}
+
+
+def rotate(token):
+    """
+    Exchanges a refresh token for a new pair of tokens with one indexed lookup and no password hashing.
+    A refresh token can only be used once; presenting a used one revokes every token of its user,
+    as it means the token leaked.
+    """
+    now = timezone.now()
+    refresh_token = RefreshToken.objects.select_related('user').filter(token_hash=_hash(token)).first()
+    if refresh_token is None or refresh_token.expires_at <= now or not refresh_token.user.is_active:
+        raise InvalidRefreshToken()
+    if not RefreshToken.objects.filter(pk=refresh_token.pk, revoked_at__isnull=True).update(revoked_at=now):
+        revoke_all(refresh_token.user)
+        raise InvalidRefreshToken()
+    user = refresh_token.user
+    return {'token': issue_access_token(user), 'refresh_token': issue_refresh_token(user)}
+
+
+def revoke(token):
+    return RefreshToken.objects.filter(token_hash=_hash(token), revoked_at__isnull=True).update(
+        revoked_at=timezone.now())
+
+
+def revoke_all(user):
+    return RefreshToken.objects.filter(user=user, revoked_at__isnull=True).update(revoked_at=timezone.now())
+
+
+def purge_expired():
+    """
+    Deletes the expired refresh tokens, returns how many were deleted. The revoked tokens that have not
+    expired yet are kept: presenting one of them again still revokes every token of its user.
+    """
+    return RefreshToken.objects.filter(expires_at__lte=timezone.now()).delete()[0]
@@ -1,6 +1,16 @@
 from django.urls import path
 from rest_framework_jwt.views import obtain_jwt_token
 
+from .views import (SummaryView, SummaryRebuildView, RefreshTokenView, RevokeTokenView, ApiKeyListView,
+                    ApiKeyDetailView, ApiKeyRotateView)
+
 urlpatterns = [
-    path('auth/', obtain_jwt_token, name='login')
+    path('auth/', obtain_jwt_token, name='login'),
+    path('auth/refresh/', RefreshTokenView.as_view(), name='refresh-token'),
+    path('auth/revoke/', RevokeTokenView.as_view(), name='revoke-token'),
+    path('me/api-keys/', ApiKeyListView.as_view(), name='api-key-list'),
+    path('me/api-keys/<int:pk>/', ApiKeyDetailView.as_view(), name='api-key-detail'),
+    path('me/api-keys/<int:pk>/rotate/', ApiKeyRotateView.as_view(), name='api-key-rotate'),
+    path('me/summary/', SummaryView.as_view(), name='user-summary'),
+    path('me/summary/rebuild/', SummaryRebuildView.as_view(), name='user-summary-rebuild'),
 ]
@@ -1,3 +1,90 @@
-from django.shortcuts import render
+from django.db import DEFAULT_DB_ALIAS
+from django.http import Http404
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from rest_framework.views import APIView
 
-# Create your views here.
+from jobs import queue
+from jobs.views import accepted_response
+from . import api_keys, summaries, tokens
+from .models import ApiKey
+from .permissions import IsNotApiKey
+from .serializers import ApiKeySerializer, RefreshTokenSerializer
+
+
+class SummaryView(APIView):
+    throttle_scope = 'aggregate'
+
+    def get(self, request):
+        return Response(summaries.get_summary(request.user))
+
+
+class SummaryRebuildView(APIView):
+    throttle_scope = 'aggregate'
+
+    def post(self, request):
+        return accepted_response(request, queue.enqueue(request.user, 'users.rebuild_summaries'))
+
+
+class RefreshTokenView(APIView):
+    permission_classes = ()
+    authentication_classes = ()
+
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            return Response(tokens.rotate(serializer.validated_data['refresh_token']))
+        except tokens.InvalidRefreshToken:
+            raise ValidationError({'non_field_errors': ['Invalid or expired refresh token.']})
+
+
+class RevokeTokenView(APIView):
+    permission_classes = ()
+    authentication_classes = ()
+
+    def post(self, request):
+        serializer = RefreshTokenSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        tokens.revoke(serializer.validated_data['refresh_token'])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ApiKeyListView(APIView):
+    permission_classes = (IsAuthenticated, IsNotApiKey)
+
+    def get(self, request):
+        keys = ApiKey.objects.using(DEFAULT_DB_ALIAS).filter(user=request.user, revoked_at__isnull=True)
+        return Response(ApiKeySerializer(keys, many=True).data)
+
+    def post(self, request):
+        serializer = ApiKeySerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        api_key, key = api_keys.issue(request.user, serializer.validated_data['name'],
+                                      serializer.validated_data['scope_list'],
+                                      serializer.validated_data.get('expires_at'))
+        return Response(dict(ApiKeySerializer(api_key).data, key=key), status=status.HTTP_201_CREATED)
+
+
+class ApiKeyDetailView(APIView):
+    permission_classes = (IsAuthenticated, IsNotApiKey)
+
+    def get_object(self, request, pk):
+        keys = ApiKey.objects.using(DEFAULT_DB_ALIAS).filter(user=request.user, revoked_at__isnull=True)
+        api_key = keys.filter(pk=pk).first()
+        if api_key is None:
+            raise Http404
+        return api_key
+
+    def delete(self, request, pk):
+        api_keys.revoke(self.get_object(request, pk))
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class ApiKeyRotateView(ApiKeyDetailView):
+
+    def post(self, request, pk):
+        api_key, key = api_keys.rotate(self.get_object(request, pk))
+        return Response(dict(ApiKeySerializer(api_key).data, key=key), status=status.HTTP_201_CREATED)